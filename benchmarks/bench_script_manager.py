@@ -0,0 +1,148 @@
+"""Benchmark of ScriptManager's table operations against the row-by-row versions they replaced.
+
+Times shot renumbering, unique name/place extraction, adding missing subjects and approving proposed
+subjects on synthetic shot lists and writes the timings and speedups as JSON.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_script_manager --rows 1000 5000 10000 --output bench_results/script_manager.json
+"""
+import argparse
+import json
+import os
+import platform
+import time
+from typing import Any, Callable, Dict, List
+import pandas as pd
+from page2prompt.utils.script_manager import ScriptManager
+
+COLUMNS = ["Timestamp", "Scene", "Shot", "Script Reference", "Shot Description", "Shot Size", "People", "Places"]
+
+def build_shot_list(rows: int, shots_per_scene: int, cast: int) -> pd.DataFrame:
+    return pd.DataFrame({
+        "Timestamp": ["00:00"] * rows,
+        "Scene": [str(row // shots_per_scene + 1) for row in range(rows)],
+        "Shot": ["0"] * rows,
+        "Script Reference": [f"Line {row}" for row in range(rows)],
+        "Shot Description": [f"Description {row}" for row in range(rows)],
+        "Shot Size": ["Medium Shot"] * rows,
+        "People": [f"Person {row % cast}, Person {(row * 7) % cast}" for row in range(rows)],
+        "Places": [f"Place {row % (cast // 2 or 1)}" for row in range(rows)]
+    }, columns=COLUMNS)
+
+# The pre-vectorization implementations, kept here as the baseline
+def legacy_renumber(df: pd.DataFrame) -> pd.DataFrame:
+    df = df[COLUMNS].copy()
+    if not df.empty:
+        shot_number = 1
+        current_scene = df.iloc[0]["Scene"]
+        for i, row in df.iterrows():
+            if row["Scene"] != current_scene:
+                shot_number = 1
+                current_scene = row["Scene"]
+            df.at[i, "Shot"] = shot_number
+            shot_number += 1
+    return df.astype(str)
+
+def legacy_unique(shot_list: pd.DataFrame, column: str) -> List[str]:
+    return list(set(shot_list[column].dropna().str.split(',').explode().str.strip()))
+
+def legacy_ensure_included(subjects_df: pd.DataFrame, unique_names: List[str], unique_places: List[str]) -> pd.DataFrame:
+    existing_names = set(subjects_df[subjects_df['Type'] == 'person']['Name'])
+    for name in set(unique_names) - existing_names:
+        subjects_df = pd.concat([subjects_df, pd.DataFrame({
+            'Name': [name], 'Description': ['Character mentioned in the shot list'], 'Type': ['person']
+        })], ignore_index=True)
+    existing_places = set(subjects_df[subjects_df['Type'] == 'place']['Name'])
+    for place in set(unique_places) - existing_places:
+        subjects_df = pd.concat([subjects_df, pd.DataFrame({
+            'Name': [place], 'Description': ['Location mentioned in the shot list'], 'Type': ['place']
+        })], ignore_index=True)
+    return subjects_df
+
+def legacy_approve(shot_list: pd.DataFrame, proposed_subjects: pd.DataFrame) -> pd.DataFrame:
+    all_people = set()
+    for _, row in shot_list.iterrows():
+        all_people.update(person.strip() for person in row['People'].split(',') if person.strip())
+    for person in all_people:
+        if person not in proposed_subjects['Name'].values:
+            proposed_subjects = pd.concat([proposed_subjects, pd.DataFrame({
+                'Name': [person], 'Description': ['Description pending based on script analysis.'], 'Type': ['person']
+            })], ignore_index=True)
+    return proposed_subjects
+
+def _time(function: Callable[[], Any], repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+def run(rows: int, args: argparse.Namespace) -> Dict[str, Any]:
+    script_manager = ScriptManager(meta_chain=None)
+    shot_list = build_shot_list(rows, args.shots_per_scene, args.cast)
+    empty_subjects = pd.DataFrame(columns=["Name", "Description", "Type"])
+    names = script_manager.extract_unique_names(shot_list)
+    places = script_manager.extract_unique_places(shot_list)
+
+    def approve():
+        script_manager.shot_list = shot_list
+        script_manager.proposed_subjects = empty_subjects
+        return script_manager.approve_proposed_subjects()
+
+    cases = {
+        "renumber_shots": (lambda: legacy_renumber(shot_list), lambda: script_manager._normalize_shot_list(shot_list.copy())),
+        "extract_unique_names": (lambda: legacy_unique(shot_list, "People"), lambda: script_manager.extract_unique_names(shot_list)),
+        "extract_unique_places": (lambda: legacy_unique(shot_list, "Places"), lambda: script_manager.extract_unique_places(shot_list)),
+        "ensure_all_names_and_places_included": (
+            lambda: legacy_ensure_included(empty_subjects, names, places),
+            lambda: script_manager.ensure_all_names_and_places_included(empty_subjects, names, places)
+        ),
+        "approve_proposed_subjects": (lambda: legacy_approve(shot_list, empty_subjects), approve)
+    }
+    results = {}
+    for name, (legacy, current) in cases.items():
+        legacy_seconds = _time(legacy, args.repeat)
+        current_seconds = _time(current, args.repeat)
+        results[name] = {
+            "legacy_seconds": legacy_seconds,
+            "vectorized_seconds": current_seconds,
+            "speedup": legacy_seconds / current_seconds if current_seconds else 0.0
+        }
+    return {"rows": rows, "names": len(names), "places": len(places), "operations": results}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1000, 5000, 10000])
+    parser.add_argument("--shots-per-scene", type=int, default=10)
+    parser.add_argument("--cast", type=int, default=500, help="Distinct people in the synthetic shot list")
+    parser.add_argument("--repeat", type=int, default=3, help="Runs per measurement; the best is kept")
+    parser.add_argument("--output", default="bench_results/script_manager.json")
+    args = parser.parse_args()
+
+    results = []
+    for rows in args.rows:
+        result = run(rows, args)
+        results.append(result)
+        print(f"{rows:>6} rows: " + ", ".join(
+            f"{name} {timing['speedup']:.1f}x" for name, timing in result["operations"].items()
+        ))
+
+    report = {
+        "benchmark": "script_manager",
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": results
+    }
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
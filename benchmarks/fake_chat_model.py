@@ -0,0 +1,64 @@
+"""Deterministic stand-in for ChatOpenAI that answers each pipeline prompt in the format its parser expects."""
+import asyncio
+import hashlib
+import json
+import re
+import time
+from typing import Any, List, Optional
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+WORDS = ("rain", "neon", "window", "glance", "shadow", "coffee", "street", "light", "door", "smile",
+         "table", "city", "hand", "silence", "reflection", "crowd", "corner", "morning", "car", "echo")
+
+class FakePipelineChatModel(BaseChatModel):
+    """Sleeps for `latency` seconds per call and returns `words`-word texts derived from the prompt hash."""
+
+    latency: float = 0.05
+    words: int = 40
+    shots_per_scene: int = 10
+    model_name: str = "fake-pipeline"
+    temperature: float = 0.0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-pipeline"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        time.sleep(self.latency)
+        return self._result(messages)
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._result(messages)
+
+    def _result(self, messages: List[BaseMessage]) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=self.respond(messages[-1].content)))])
+
+    def _text(self, seed: str, words: Optional[int] = None) -> str:
+        digest = hashlib.sha256(seed.encode("utf-8")).digest()
+        return " ".join(WORDS[digest[i % len(digest)] % len(WORDS)] for i in range(words or self.words))
+
+    def respond(self, prompt: str) -> str:
+        if "generate a proposed detailed shot list" in prompt:
+            heading = re.search(r"^\s*((?:INT|EXT)\..*)$", prompt, re.MULTILINE)
+            reference = heading.group(1).strip() if heading else "Untitled"
+            return "\n".join(
+                f"00:{shot:02d}|1|{shot}|{reference}|{self._text(f'{prompt}{shot}')}|Medium Shot|Sarah, Mike|Coffee Shop"
+                for shot in range(1, self.shots_per_scene + 1)
+            )
+        if "provide a brief description for each" in prompt:
+            subjects = re.findall(r"^\s*(.+?) \((person|place)\)\s*$", prompt, re.MULTILINE)
+            return json.dumps([{"name": name, "description": self._text(name, 20), "type": kind} for name, kind in subjects])
+        if "### Shot ID:" in prompt and "Answer with one block per shot" in prompt:
+            shot_ids = re.findall(r"^\s*### Shot ID: (\S+)\s*$", prompt.split("Shots:", 1)[-1], re.MULTILINE)
+            return "\n\n".join(f"### Shot ID: {shot_id}\n{self._prompt_versions(prompt + shot_id)}" for shot_id in shot_ids)
+        if "Generate three versions of a prompt" in prompt:
+            return self._prompt_versions(prompt)
+        return self._text(prompt)
+
+    def _prompt_versions(self, seed: str) -> str:
+        return (f"Concise Prompt: {self._text(seed + 'c', max(self.words // 4, 1))}\n"
+                f"Medium Prompt: {self._text(seed + 'm', max(self.words // 2, 1))}\n"
+                f"Detailed Prompt: {self._text(seed + 'd')}")
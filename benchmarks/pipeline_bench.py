@@ -0,0 +1,133 @@
+"""End-to-end benchmark of the generation pipeline against a fake chat model (no API key or network needed).
+
+Runs generate_proposed_shot_list -> extract_proposed_subjects -> generate_bulk_directors_notes ->
+generate_bulk_prompts for each shot count and writes per-stage timings and per-call latencies as JSON.
+
+Run from the repository root:
+
+    python -m benchmarks.pipeline_bench --shots 10 100 1000 --latency 0.05 --output bench_results/pipeline.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import platform
+import statistics
+import tempfile
+import time
+from typing import Any, Dict, List
+from benchmarks.fake_chat_model import FakePipelineChatModel
+from page2prompt.components.director_assistant import DirectorAssistant
+from page2prompt.components.meta_chain import MetaChain
+from page2prompt.components.shot_list_meta_chain import ShotListMetaChain
+from page2prompt.utils.style_manager import StyleManager
+from page2prompt.utils.subject_manager import SubjectManager
+from page2prompt.utils.telemetry import telemetry
+
+PACKAGE_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "page2prompt")
+
+def build_script(scenes: int) -> str:
+    return "\n\n".join(
+        f"INT. LOCATION {number} - DAY\nSarah meets Mike at table {number}. They talk quietly while the rain falls."
+        for number in range(1, scenes + 1)
+    )
+
+def _percentile(values: List[float], percentile: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(round(percentile * (len(ordered) - 1))))]
+
+def _call_latencies() -> Dict[str, Dict[str, float]]:
+    by_site: Dict[str, List[float]] = {}
+    for record in telemetry.records:
+        by_site.setdefault(record.call_site, []).append(record.latency)
+    return {
+        call_site: {
+            "calls": len(latencies),
+            "p50": statistics.median(latencies),
+            "p95": _percentile(latencies, 0.95),
+            "max": max(latencies)
+        }
+        for call_site, latencies in by_site.items()
+    }
+
+async def run_pipeline(shots: int, args: argparse.Namespace, subjects_file: str) -> Dict[str, Any]:
+    llm = FakePipelineChatModel(latency=args.latency, words=args.words, shots_per_scene=args.shots_per_scene)
+    meta_chain = MetaChain(llm=llm)
+    style_manager = StyleManager(os.path.join(PACKAGE_DIR, "styles.csv"))
+    director_assistant = DirectorAssistant(os.path.join(PACKAGE_DIR, "director_styles.csv"))
+    subject_manager = SubjectManager(subjects_file)
+    shot_list_meta_chain = ShotListMetaChain("", subject_manager, style_manager, director_assistant,
+                                             max_concurrency=args.concurrency, llm=llm)
+    style = (style_manager.get_styles() or [""])[0]
+    director = next(iter(director_assistant.directors), "No Director")
+    script = build_script(-(-shots // args.shots_per_scene))
+
+    telemetry.reset()
+    stages = {}
+    start = time.perf_counter()
+
+    stage_start = time.perf_counter()
+    shot_list = await meta_chain.generate_proposed_shot_list(script, use_cache=False, by_scene=True, max_concurrency=args.concurrency)
+    shot_list = shot_list.head(shots).reset_index(drop=True)
+    stages["generate_proposed_shot_list"] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    subjects = await meta_chain.extract_proposed_subjects(script, shot_list, use_cache=False)
+    stages["extract_proposed_subjects"] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    shot_list = await shot_list_meta_chain.generate_bulk_directors_notes(script, shot_list, style, director)
+    stages["generate_bulk_directors_notes"] = time.perf_counter() - stage_start
+
+    stage_start = time.perf_counter()
+    shot_list = await shot_list_meta_chain.generate_bulk_prompts(shot_list, style, batch_size=args.batch_size)
+    stages["generate_bulk_prompts"] = time.perf_counter() - stage_start
+
+    total = time.perf_counter() - start
+    return {
+        "shots": len(shot_list),
+        "subjects": len(subjects),
+        "total_seconds": total,
+        "shots_per_second": len(shot_list) / total if total else 0.0,
+        "stages_seconds": stages,
+        "llm_calls": _call_latencies()
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--shots", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds the fake model sleeps per call")
+    parser.add_argument("--words", type=int, default=40, help="Words per generated text")
+    parser.add_argument("--shots-per-scene", type=int, default=10)
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=1, help="Shots per request in generate_bulk_prompts")
+    parser.add_argument("--output", default="bench_results/pipeline.json")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        for shots in args.shots:
+            result = asyncio.run(run_pipeline(shots, args, os.path.join(temp_dir, f"subjects_{shots}.csv")))
+            results.append(result)
+            print(f"{result['shots']:>5} shots: {result['total_seconds']:8.2f}s total, "
+                  f"{result['shots_per_second']:7.1f} shots/s, "
+                  + ", ".join(f"{stage} {seconds:.2f}s" for stage, seconds in result["stages_seconds"].items()))
+
+    report = {
+        "benchmark": "pipeline",
+        "timestamp": time.time(),
+        "python": platform.python_version(),
+        "config": {key: value for key, value in vars(args).items() if key != "output"},
+        "results": results
+    }
+    directory = os.path.dirname(args.output)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"Results written to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,8 @@
-from openai import OpenAI
-import os
+from page2prompt.utils.llm_client import llm_clients
 
 class AudioTranscriber:
     def __init__(self):
-        self.client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+        self.client = llm_clients.openai_client()
 
     def transcribe_audio(self, audio_file, include_timestamps=False):
         if audio_file is None:
@@ -1,27 +1,28 @@
-import os
 import logging
 from typing import Dict, Optional, List
-from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
-from langchain_core.runnables import RunnableSequence
 from langchain_community.callbacks.manager import get_openai_callback
 from page2prompt.components.style_management import StyleManager
 from page2prompt.api.subject_management import SubjectManager
 from page2prompt.models.prompt import Prompt
+from page2prompt.components.chain_registry import chain_registry
+from page2prompt.utils.llm_client import LLMClientFactory, llm_clients
+from page2prompt.utils.llm_scheduler import INTERACTIVE, estimate_tokens, scheduler
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 class PromptGenerator:
-    def __init__(self, style_manager: StyleManager, subject_manager: SubjectManager):
-        self.api_key = os.environ.get("OPENAI_API_KEY")
+    def __init__(self, style_manager: StyleManager, subject_manager: SubjectManager, clients: Optional[LLMClientFactory] = None):
+        clients = clients or llm_clients
+        self.api_key = clients.api_key
         if not self.api_key:
             logger.error("OpenAI API key not found in environment variables")
             raise ValueError("OpenAI API key not found in environment variables")
         logger.info("API key found and set")
         
         try:
-            self.llm = ChatOpenAI(temperature=0.7, model_name="gpt-4-0125-preview", openai_api_key=self.api_key)
+            self.llm = clients.chat_model("gpt-4-0125-preview", api_key=self.api_key)
             self.style_manager = style_manager
             self.subject_manager = subject_manager
             logger.info("PromptGenerator initialized successfully")
@@ -30,6 +31,9 @@ class PromptGenerator:
             raise
 
     def _get_prompt_template(self) -> PromptTemplate:
+        return chain_registry.get_template("prompt_generator.prompts", self._build_prompt_template)
+
+    def _build_prompt_template(self) -> PromptTemplate:
         base_template = """
         Generate three prompts (concise, normal, and detailed) based on the following information:
 
@@ -114,15 +118,11 @@ class PromptGenerator:
             return Prompt("", "", "")
 
     async def _generate_prompt(self, **kwargs) -> Dict[str, str]:
-        prompt_template = self._get_prompt_template()
+        chain = chain_registry.get_chain("prompt_generator.prompts", self.llm, self._build_prompt_template)
 
         try:
             with get_openai_callback() as cb:
-                chain = RunnableSequence(
-                    prompt_template,
-                    self.llm
-                )
-                result = await chain.ainvoke(kwargs)
+                result = await scheduler.run(lambda: chain.ainvoke(kwargs), estimate_tokens(*map(str, kwargs.values())), INTERACTIVE)
                 
             content = result.content
             prompts = content.split('\n\n')
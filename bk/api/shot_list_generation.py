@@ -1,21 +1,22 @@
 import pandas as pd
 from typing import List, Dict, Any, Optional
 from page2prompt.models.shot import Shot
-from langchain_openai import ChatOpenAI
 from langchain.prompts import PromptTemplate
-from langchain_core.runnables import RunnableSequence
 from langchain_community.callbacks.manager import get_openai_callback
+from page2prompt.components.chain_registry import chain_registry
+from page2prompt.utils.llm_client import LLMClientFactory, llm_clients
+from page2prompt.utils.llm_scheduler import estimate_tokens, scheduler
 
 class ShotListGenerator:
-    def __init__(self, api_key: str, subject_manager, style_manager, director_assistant):
+    def __init__(self, api_key: str, subject_manager, style_manager, director_assistant, clients: Optional[LLMClientFactory] = None):
         self.api_key = api_key
         self.subject_manager = subject_manager
         self.style_manager = style_manager
         self.director_assistant = director_assistant
-        self.llm = ChatOpenAI(temperature=0.7, model_name="gpt-4-0125-preview", openai_api_key=self.api_key)
+        self.llm = (clients or llm_clients).chat_model("gpt-4-0125-preview", api_key=self.api_key)
 
-    async def generate_shot_list(self, script: str) -> List[Shot]:
-        prompt = f"""
+    def _get_shot_list_template(self) -> PromptTemplate:
+        template = """
         Given the following script, generate a proposed detailed shot list. 
         Include the following information for each shot, separated by pipe characters (|):
         1. Timestamp
@@ -41,14 +42,13 @@ class ShotListGenerator:
 
         Please generate the shot list in this format, ensuring that the Reference column contains exact quotes from the provided script.
         """
+        return PromptTemplate(template=template, input_variables=["script"])
 
+    async def generate_shot_list(self, script: str) -> List[Shot]:
+        chain = chain_registry.get_chain("shot_list_generator.shot_list", self.llm, self._get_shot_list_template)
         try:
             with get_openai_callback() as cb:
-                chain = RunnableSequence(
-                    PromptTemplate(template=prompt, input_variables=[]),
-                    self.llm
-                )
-                result = await chain.ainvoke({})
+                result = await scheduler.run(lambda: chain.ainvoke({"script": script}), estimate_tokens(script))
         
             content = result.content
             shot_list = self.parse_shot_list(content)
@@ -57,34 +57,41 @@ class ShotListGenerator:
             print(f"Error generating shot list: {str(e)}")
             return []
 
+    def _get_directors_notes_template(self) -> PromptTemplate:
+        template = """
+        Given the following script excerpt and shot description, generate detailed director's notes.
+        Consider the visual style '{style}' and the director's style '{director_style}'.
+
+        Script Excerpt: {script_reference}
+        Shot Description: {shot_description}
+        Shot Size: {shot_size}
+        People: {people}
+
+        Director's Notes:
+        """
+        return PromptTemplate(template=template, input_variables=["style", "director_style", "script_reference", "shot_description", "shot_size", "people"])
+
     async def generate_bulk_directors_notes(self, full_script: str, master_shot_list: pd.DataFrame, style: str, director_style: str, progress_callback=None) -> pd.DataFrame:
         notes_df = master_shot_list.copy()
         notes_df['Director\'s Notes'] = ''
 
+        chain = chain_registry.get_chain("shot_list_generator.directors_notes", self.llm, self._get_directors_notes_template)
         total_shots = len(notes_df)
         for index, row in notes_df.iterrows():
             if progress_callback:
                 progress_callback((index + 1) / total_shots)
 
-            prompt = f"""
-            Given the following script excerpt and shot description, generate detailed director's notes.
-            Consider the visual style '{style}' and the director's style '{director_style}'.
-
-            Script Excerpt: {row['Script Reference']}
-            Shot Description: {row['Shot Description']}
-            Shot Size: {row['Shot Size']}
-            People: {row['People']}
-
-            Director's Notes:
-            """
-
             try:
+                inputs = {
+                    "style": style,
+                    "director_style": director_style,
+                    "script_reference": row['Script Reference'],
+                    "shot_description": row['Shot Description'],
+                    "shot_size": row['Shot Size'],
+                    "people": row['People']
+                }
                 with get_openai_callback() as cb:
-                    chain = RunnableSequence(
-                        PromptTemplate(template=prompt, input_variables=[]),
-                        self.llm
-                    )
-                    result = await chain.ainvoke({})
+                    result = await scheduler.run(lambda: chain.ainvoke(inputs), estimate_tokens(*map(str, inputs.values())))
                 notes_df.at[index, 'Director\'s Notes'] = result.content.strip()
             except Exception as e:
                 print(f"Error generating director's notes for shot {index + 1}: {str(e)}")
@@ -110,33 +117,40 @@ class ShotListGenerator:
                 shots.append(shot)
         return shots
 
+    def _get_prompts_template(self) -> PromptTemplate:
+        template = """
+        Generate three prompts (concise, medium, and detailed) for the following shot:
+        
+        Shot Description: {shot_description}
+        Shot Size: {shot_size}
+        People: {people}
+        Places: {places}
+        
+        Consider the visual style '{style}' and the director's style '{director_style}'.
+        
+        Prompts:
+        """
+        return PromptTemplate(template=template, input_variables=["style", "director_style", "shot_description", "shot_size", "people", "places"])
+
     async def generate_bulk_prompts(self, shot_list_df: pd.DataFrame, style: str, director_style: str) -> pd.DataFrame:
         prompts_df = shot_list_df.copy()
         prompts_df['Concise Prompt'] = ''
         prompts_df['Medium Prompt'] = ''
         prompts_df['Detailed Prompt'] = ''
 
+        chain = chain_registry.get_chain("shot_list_generator.prompts", self.llm, self._get_prompts_template)
         for index, row in prompts_df.iterrows():
-            prompt = f"""
-            Generate three prompts (concise, medium, and detailed) for the following shot:
-            
-            Shot Description: {row['Shot Description']}
-            Shot Size: {row['Shot Size']}
-            People: {row['People']}
-            Places: {row['Places']}
-            
-            Consider the visual style '{style}' and the director's style '{director_style}'.
-            
-            Prompts:
-            """
-
             try:
+                inputs = {
+                    "style": style,
+                    "director_style": director_style,
+                    "shot_description": row['Shot Description'],
+                    "shot_size": row['Shot Size'],
+                    "people": row['People'],
+                    "places": row['Places']
+                }
                 with get_openai_callback() as cb:
-                    chain = RunnableSequence(
-                        PromptTemplate(template=prompt, input_variables=[]),
-                        self.llm
-                    )
-                    result = await chain.ainvoke({})
+                    result = await scheduler.run(lambda: chain.ainvoke(inputs), estimate_tokens(*map(str, inputs.values())))
                 
                 prompts = result.content.strip().split('\n\n')
                 prompts_df.at[index, 'Concise Prompt'] = prompts[0] if len(prompts) > 0 else ''
@@ -0,0 +1,57 @@
+import threading
+from typing import Any, Callable, Dict, Tuple
+from langchain.prompts import PromptTemplate
+from langchain_core.runnables import RunnableSequence
+
+def _runnable_sequence(prompt: PromptTemplate, llm: Any) -> Any:
+    return RunnableSequence(prompt, llm)
+
+class ChainRegistry:
+    """Compiles each prompt template and chain once and hands out the shared instance on later calls.
+
+    Templates are keyed by name; chains by (template name, model, temperature, LLM instance).
+    """
+
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+        self._chains: Dict[Tuple, Tuple[Any, Any]] = {}
+        self._lock = threading.Lock()
+        self.builds = 0
+        self.hits = 0
+
+    def get_template(self, name: str, factory: Callable[[], PromptTemplate]) -> PromptTemplate:
+        """Returns the template registered under name, building it with factory on first use."""
+        template = self._templates.get(name)
+        if template is not None:
+            return template
+        with self._lock:
+            if name not in self._templates:
+                self._templates[name] = factory()
+            return self._templates[name]
+
+    def get_chain(self, name: str, llm: Any, template_factory: Callable[[], PromptTemplate],
+                  chain_factory: Callable[[PromptTemplate, Any], Any] = _runnable_sequence) -> Any:
+        """Returns the chain for name bound to llm, building it on first use.
+
+        The LLM object is kept alongside the chain so its id() cannot be reused while the entry exists.
+        """
+        key = (name, getattr(llm, "model_name", None), getattr(llm, "temperature", None), id(llm))
+        entry = self._chains.get(key)
+        if entry is not None:
+            self.hits += 1
+            return entry[1]
+        template = self.get_template(name, template_factory)
+        with self._lock:
+            if key not in self._chains:
+                self._chains[key] = (llm, chain_factory(template, llm))
+                self.builds += 1
+            return self._chains[key][1]
+
+    def clear(self) -> None:
+        """Drops every compiled template and chain."""
+        with self._lock:
+            self._templates.clear()
+            self._chains.clear()
+
+# Shared by every generator in the process so identical chains are compiled once
+chain_registry = ChainRegistry()
@@ -1,11 +1,15 @@
 import csv
 import os
-from typing import Dict, Optional
+from typing import Dict, List, Optional
 
 class DirectorAssistant:
-    def __init__(self, styles_csv_path: str):
+    def __init__(self, styles_csv_path: str, styles: Optional[List[Dict[str, str]]] = None):
         self.directors: Dict[str, Dict[str, str]] = {}
-        self.load_director_styles(styles_csv_path)
+        if styles is None:
+            self.load_director_styles(styles_csv_path)
+        else:
+            # Rows already parsed from styles_csv_path (e.g. the shared reference data) aren't read again
+            self.directors = {row['name']: row for row in styles}
 
     def load_director_styles(self, csv_path: str):
         with open(csv_path, 'r') as file:
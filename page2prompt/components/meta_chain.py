@@ -1,45 +1,74 @@
-import os
 import json
+import asyncio
 import pandas as pd
 import logging
 import json
-from typing import Dict, Any, List, Optional
-from langchain_openai import ChatOpenAI
+from typing import Dict, Any, List, Optional, Callable, Awaitable, AsyncIterator, Tuple
 from langchain_community.callbacks.manager import get_openai_callback
 from langchain.prompts import PromptTemplate
-from langchain_core.runnables import RunnableSequence
+from page2prompt.components.chain_registry import chain_registry
+from page2prompt.utils.llm_cache import LLMCache
+from page2prompt.utils.llm_client import LLMClientFactory, llm_clients
+from page2prompt.utils.llm_scheduler import BULK, INTERACTIVE, estimate_tokens, scheduler
+from page2prompt.utils.scene_splitter import Scene, split_scenes
+from page2prompt.utils.shot_list_parser import SHOT_LIST_COLUMNS, ShotListParser
+from page2prompt.utils.telemetry import telemetry
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 class MetaChain:
-    def __init__(self):
-        self.api_key = os.environ.get("OPENAI_API_KEY")
-        if not self.api_key:
+    def __init__(self, cache: Optional[LLMCache] = None, llm: Optional[Any] = None, clients: Optional[LLMClientFactory] = None):
+        # An injected chat model (e.g. a fake one in benchmarks) needs no API key
+        clients = clients or llm_clients
+        self.api_key = clients.api_key
+        if llm is None and not self.api_key:
             raise ValueError("OpenAI API key not found in environment variables")
-        self.llm = ChatOpenAI(temperature=0.7, model_name="gpt-4o-mini", openai_api_key=self.api_key)
+        self.llm = llm or clients.chat_model("gpt-4o-mini")
+        self.cache = cache
+
+    async def _complete(self, rendered_prompt: str, invoke: Callable[[], Awaitable[Any]], call_site: str, use_cache: bool = True, priority: str = BULK) -> str:
+        """Returns the LLM completion for rendered_prompt, serving repeats from the cache.
+
+        use_cache=False skips the lookup and forces a fresh completion, which then replaces the cached one.
+        Every call, cached or not, is recorded in telemetry under call_site. Live calls go through the shared
+        scheduler, which paces them against the rate limits and retries 429s and server errors; priority picks
+        the scheduler lane.
+        """
+        cached = await self._cache_lookup(rendered_prompt, use_cache, call_site)
+        if cached is not None:
+            return cached
+
+        with telemetry.track(call_site, self.llm.model_name) as tracker, get_openai_callback() as cb:
+            result = await scheduler.run(invoke, estimate_tokens(rendered_prompt), priority)
+            tracker.set_usage(cb)
+
+        content = result.content
+        await self._cache_store(rendered_prompt, content)
+        return content
+
+    async def _cache_lookup(self, rendered_prompt: str, use_cache: bool, call_site: str) -> Optional[str]:
+        if not (self.cache and use_cache):
+            return None
+        # The cache is SQLite (and commits on reads to record access times), so it stays off the event loop
+        cached = await asyncio.to_thread(self.cache.get, rendered_prompt, self.llm.model_name, self.llm.temperature)
+        if cached is not None:
+            logger.info("Serving LLM response from cache")
+            telemetry.record(call_site, self.llm.model_name, cache_hit=True)
+        return cached
+
+    async def _cache_store(self, rendered_prompt: str, content: str) -> None:
+        if self.cache:
+            await asyncio.to_thread(self.cache.set, rendered_prompt, self.llm.model_name, self.llm.temperature, content)
 
     def _get_prompt_template(self) -> PromptTemplate:
-        base_template = """
-        Generate three prompts (concise, normal, and detailed) based on the following information:
+        return chain_registry.get_template("meta_chain.generate_prompt", self._build_prompt_template)
 
-        Subjects: {subject_info}
-        Shot Description: {shot_description}
-        Director's Notes: {directors_notes}
-        Highlighted Script: {highlighted_text}
-        Full Script: {full_script}
-        End Parameters: {end_parameters}
-        Style: {style}
-        Style Prefix: {style_prefix}
-        Director's Style: {director_style}
-        Camera Shot: {camera_shot}
-        Camera Move: {camera_move}
-        Camera Size: {camera_size}
-        Framing: {camera_framing}
-        Depth of Field: {camera_depth_of_field}
-        Camera Type: {camera_type}
-        Camera Name: {camera_name}
-        Lens Type: {camera_lens_type}
+    def _build_prompt_template(self) -> PromptTemplate:
+        # The rules come first and contain no variables, so every request shares the same prefix and
+        # providers with automatic prefix caching can reuse it; the per-shot details come last.
+        base_template = """
+        Generate three prompts (concise, normal, and detailed) based on the shot details given at the end.
 
         Important:
         1. Integrate Camera Work Seamlessly: Incorporate the camera work description seamlessly into the scene description.
@@ -76,9 +105,9 @@ class MetaChain:
         8. Ensure Consistency Across Prompts: Prioritize the most important visual elements for each shot type to maintain consistency across the three prompt lengths.
         9. Balance Elements in Each Prompt: For each prompt length, maintain a balance between character details, setting description, and action appropriate to the shot type and framing.
         10. Include Relevant Subject Details: Incorporate descriptions of active subjects provided in the 'Subjects' field into the prompts, but only include details visible in the current shot type.
-        11. Script Adherence: {script_adherence}
+        11. Script Adherence: Follow the Script Adherence instruction given in the shot details.
         12. Avoid Unnecessary Phrases: Do not include meta-commentary or evaluative statements about the composition, such as "The overall composition captures...". Focus on directly describing the scene.
-        13. Position of Camera Name: Place the camera name at the end of the normal and detailed prompts ONLY if it is included. It is not a priority item like shot size and should not be included in the concise prompt unless essential. It should be worded "Shot on a {camera_name}"
+        13. Position of Camera Name: Place the camera name at the end of the normal and detailed prompts ONLY if it is included. It is not a priority item like shot size and should not be included in the concise prompt unless essential. It should be worded "Shot on a" followed by the camera name.
         14. Describing Multiple Subjects:
            - Clearly identify each subject in the scene.
            - For close-ups and medium shots, focus on the interaction between subjects, their expressions, and body language.
@@ -116,6 +145,26 @@ class MetaChain:
         - Include technical details: Incorporate camera angles, lighting conditions, or other technical aspects to further guide the image generation.
         - Add modifiers: Include adjectives and descriptive phrases to refine the image's appearance, mood, and style. Do not add style elements that is handled in the Style and Style Prefix only. The key is to provide clear, descriptive information about what you want to see in the image.
 
+        Shot Details:
+        Subjects: {subject_info}
+        Shot Description: {shot_description}
+        Director's Notes: {directors_notes}
+        Highlighted Script: {highlighted_text}
+        Full Script: {full_script}
+        End Parameters: {end_parameters}
+        Style: {style}
+        Style Prefix: {style_prefix}
+        Director's Style: {director_style}
+        Camera Shot: {camera_shot}
+        Camera Move: {camera_move}
+        Camera Size: {camera_size}
+        Framing: {camera_framing}
+        Depth of Field: {camera_depth_of_field}
+        Camera Type: {camera_type}
+        Camera Name: {camera_name}
+        Lens Type: {camera_lens_type}
+        Script Adherence: {script_adherence}
+
         Prompts:
         """
         return PromptTemplate(
@@ -129,9 +178,7 @@ class MetaChain:
             template=base_template
         )
 
-    async def generate_prompt(self, style: Optional[str], highlighted_text: Optional[str], shot_description: str, directors_notes: str, script: Optional[str], stick_to_script: bool, end_parameters: str, active_subjects: Optional[List[Dict[str, Any]]] = None, full_script: str = "", shot_configuration: Optional[Dict[str, str]] = None, director_style: Optional[str] = None, style_prefix: Optional[str] = None) -> Dict[str, str]:
-        prompt_template = self._get_prompt_template()
-        
+    def _build_prompt_inputs(self, style: Optional[str], highlighted_text: Optional[str], shot_description: str, directors_notes: str, stick_to_script: bool, end_parameters: str, active_subjects: Optional[List[Dict[str, Any]]], full_script: str, shot_configuration: Optional[Dict[str, str]], director_style: Optional[str], style_prefix: Optional[str]) -> Dict[str, str]:
         shot_config = shot_configuration or {}
         camera_settings = {
             "camera_shot": shot_config.get("shot", ""),
@@ -146,7 +193,7 @@ class MetaChain:
         subject_info = ", ".join([f"{s.get('Name', '')}: {s.get('Description', '')}" for s in (active_subjects or [])])
         script_adherence = "Strictly adhere to the script content." if stick_to_script else "You can be creative with the script content while maintaining its essence."
 
-        input_dict = {
+        return {
             "style": style or "",
             "style_prefix": style_prefix or "",
             "highlighted_text": highlighted_text or "",
@@ -160,35 +207,76 @@ class MetaChain:
             **camera_settings
         }
 
+    def _split_prompts(self, content: str) -> Dict[str, str]:
+        # The template asks for three paragraphs: concise, normal and detailed
+        prompts = content.split('\n\n')
+        return {
+            "concise": prompts[0] if len(prompts) > 0 else "",
+            "normal": prompts[1] if len(prompts) > 1 else "",
+            "detailed": prompts[2] if len(prompts) > 2 else "",
+            "structured": content
+        }
+
+    def _error_prompts(self, error: Exception) -> Dict[str, str]:
+        error_message = f"Error generating prompt: {str(error)}"
+        print(error_message)
+        return {
+            "concise": error_message,
+            "normal": error_message,
+            "detailed": error_message,
+            "structured": error_message
+        }
+
+    async def generate_prompt(self, style: Optional[str], highlighted_text: Optional[str], shot_description: str, directors_notes: str, script: Optional[str], stick_to_script: bool, end_parameters: str, active_subjects: Optional[List[Dict[str, Any]]] = None, full_script: str = "", shot_configuration: Optional[Dict[str, str]] = None, director_style: Optional[str] = None, style_prefix: Optional[str] = None, use_cache: bool = True) -> Dict[str, str]:
+        prompt_template = self._get_prompt_template()
+        input_dict = self._build_prompt_inputs(style, highlighted_text, shot_description, directors_notes, stick_to_script, end_parameters, active_subjects, full_script, shot_configuration, director_style, style_prefix)
+
         try:
-            with get_openai_callback() as cb:
-                chain = RunnableSequence(
-                    prompt_template,
-                    self.llm
-                )
-                result = await chain.ainvoke(input_dict)
-                
-            content = result.content
-            prompts = content.split('\n\n')
-            
-            return {
-                "concise": prompts[0] if len(prompts) > 0 else "",
-                "normal": prompts[1] if len(prompts) > 1 else "",
-                "detailed": prompts[2] if len(prompts) > 2 else "",
-                "structured": content
-            }
+            chain = chain_registry.get_chain("meta_chain.generate_prompt", self.llm, self._build_prompt_template)
+            content = await self._complete(
+                prompt_template.format(**input_dict),
+                lambda: chain.ainvoke(input_dict),
+                "generate_prompt",
+                use_cache=use_cache,
+                priority=INTERACTIVE
+            )
+            return self._split_prompts(content)
         except Exception as e:
-            error_message = f"Error generating prompt: {str(e)}"
-            print(error_message)
-            return {
-                "concise": error_message,
-                "normal": error_message,
-                "detailed": error_message,
-                "structured": error_message
-            }
-
-    async def generate_proposed_shot_list(self, script: str) -> pd.DataFrame:
-        prompt = f"""
+            return self._error_prompts(e)
+
+    async def stream_prompt(self, style: Optional[str], highlighted_text: Optional[str], shot_description: str, directors_notes: str, script: Optional[str], stick_to_script: bool, end_parameters: str, active_subjects: Optional[List[Dict[str, Any]]] = None, full_script: str = "", shot_configuration: Optional[Dict[str, str]] = None, director_style: Optional[str] = None, style_prefix: Optional[str] = None, use_cache: bool = True) -> AsyncIterator[Dict[str, str]]:
+        """Streams generate_prompt: each yield holds the concise/normal/detailed text received so far."""
+        prompt_template = self._get_prompt_template()
+        input_dict = self._build_prompt_inputs(style, highlighted_text, shot_description, directors_notes, stick_to_script, end_parameters, active_subjects, full_script, shot_configuration, director_style, style_prefix)
+        rendered_prompt = prompt_template.format(**input_dict)
+
+        cached = await self._cache_lookup(rendered_prompt, use_cache, "generate_prompt")
+        if cached is not None:
+            yield self._split_prompts(cached)
+            return
+
+        content = ""
+        try:
+            chain = chain_registry.get_chain("meta_chain.generate_prompt", self.llm, self._build_prompt_template)
+            # A stream is not retried once text has been shown, so it only waits for budget up front
+            await scheduler.throttle(estimate_tokens(rendered_prompt), INTERACTIVE)
+            with scheduler.outcome(), telemetry.track("generate_prompt", self.llm.model_name) as tracker, get_openai_callback() as cb:
+                async for chunk in chain.astream(input_dict):
+                    content += chunk.content
+                    yield self._split_prompts(content)
+                tracker.set_usage(cb)
+        except Exception as e:
+            yield self._error_prompts(e)
+            return
+
+        await self._cache_store(rendered_prompt, content)
+
+    async def generate_shot_list(self, prompt: str, use_cache: bool = True) -> str:
+        """Returns the raw completion for a free-form shot list prompt (used by the Music Lab)."""
+        return await self._complete(prompt, lambda: self.llm.ainvoke(prompt), "music_video_shot_list", use_cache=use_cache)
+
+    def _build_shot_list_template(self) -> PromptTemplate:
+        template = """
         Given the following script, generate a proposed detailed shot list. 
         Include the following information for each shot, separated by pipe characters (|):
         1. Timestamp
@@ -200,9 +288,6 @@ class MetaChain:
         7. People
         8. Places
 
-        Script:
-        {script}
-
         Important instructions:
         - Do not include any headers, labels, or titles in the output.
         - Start each new line with the timestamp.
@@ -218,27 +303,128 @@ class MetaChain:
         00:30|1|3|A man waves from the corner. Sarah's face lights up with recognition.|Sarah spots a man waving at her from a corner table. Her expression shifts from anxiety to relief and excitement.|Medium Shot|Sarah, Man|Coffee Shop
 
         Please generate the shot list in this format, ensuring that the Reference column contains exact quotes from the provided script.
+
+        Script:
+        {script}
         """
+        return PromptTemplate(template=template, input_variables=["script"])
+
+    async def generate_proposed_shot_list(self, script: str, use_cache: bool = True, by_scene: bool = False, max_concurrency: int = 4) -> pd.DataFrame:
+        if by_scene:
+            scenes = split_scenes(script)
+            if scenes:
+                return await self._generate_shot_list_by_scene(scenes, use_cache, max_concurrency)
 
         try:
-            with get_openai_callback() as cb:
-                chain = RunnableSequence(
-                    PromptTemplate(template=prompt, input_variables=[]),
-                    self.llm
-                )
-                result = await chain.ainvoke({})
-        
-            content = result.content
-            df = pd.DataFrame([row.split('|') for row in content.strip().split('\n')],
-                              columns=["Timestamp", "Scene", "Shot", "Script Reference", "Shot Description", "Shot Size", "People", "Places"])
-            
-            return df
+            prompt_template = chain_registry.get_template("meta_chain.proposed_shot_list", self._build_shot_list_template)
+            chain = chain_registry.get_chain("meta_chain.proposed_shot_list", self.llm, self._build_shot_list_template)
+            input_dict = {"script": script}
+            content = await self._complete(prompt_template.format(**input_dict), lambda: chain.ainvoke(input_dict), "shot_list", use_cache=use_cache)
+            return pd.DataFrame(ShotListParser().parse(content), columns=SHOT_LIST_COLUMNS)
         except Exception as e:
             error_message = f"Error generating proposed shot list: {str(e)}"
             print(error_message)
             return pd.DataFrame()
 
-    async def extract_proposed_subjects(self, script: str, shot_list: pd.DataFrame) -> List[Dict[str, str]]:
+    async def stream_proposed_shot_list(self, script: str, use_cache: bool = True) -> AsyncIterator[Tuple[pd.DataFrame, ShotListParser]]:
+        """Streams generate_proposed_shot_list: yields the rows parsed so far each time a row completes.
+
+        The parser is yielded alongside so callers can report repaired and quarantined lines. If the
+        stream fails part-way, the rows received until then are kept and the error is logged.
+        """
+        prompt_template = chain_registry.get_template("meta_chain.proposed_shot_list", self._build_shot_list_template)
+        input_dict = {"script": script}
+        rendered_prompt = prompt_template.format(**input_dict)
+        parser = ShotListParser()
+
+        cached = await self._cache_lookup(rendered_prompt, use_cache, "shot_list")
+        if cached is not None:
+            yield pd.DataFrame(parser.parse(cached), columns=SHOT_LIST_COLUMNS), parser
+            return
+
+        content = ""
+        try:
+            chain = chain_registry.get_chain("meta_chain.proposed_shot_list", self.llm, self._build_shot_list_template)
+            await scheduler.throttle(estimate_tokens(rendered_prompt))
+            with scheduler.outcome(), telemetry.track("shot_list", self.llm.model_name) as tracker, get_openai_callback() as cb:
+                async for chunk in chain.astream(input_dict):
+                    content += chunk.content
+                    if parser.feed(chunk.content):
+                        yield pd.DataFrame(parser.rows, columns=SHOT_LIST_COLUMNS), parser
+                tracker.set_usage(cb)
+        except Exception as e:
+            logger.error(f"Shot list stream failed after {len(parser.rows)} rows: {str(e)}")
+            parser.close()
+            yield pd.DataFrame(parser.rows, columns=SHOT_LIST_COLUMNS), parser
+            return
+
+        parser.close()
+        yield pd.DataFrame(parser.rows, columns=SHOT_LIST_COLUMNS), parser
+        await self._cache_store(rendered_prompt, content)
+
+    async def generate_scene_shot_list(self, scene: Scene, use_cache: bool = True) -> pd.DataFrame:
+        """Generates the shot list for a single scene, numbering every row with the scene's number."""
+        df = await self.generate_proposed_shot_list(scene.text, use_cache=use_cache)
+        if df.empty:
+            logger.warning(f"No shots generated for scene {scene.number} ({scene.heading or 'untitled'})")
+        else:
+            df["Scene"] = str(scene.number)
+        return df
+
+    async def generate_scene_shot_lists(self, scenes: List[Scene], use_cache: bool = True, max_concurrency: int = 4) -> List[pd.DataFrame]:
+        """Generates the shot lists for several scenes concurrently, returned in the order of scenes."""
+        # Each scene is its own completion, so latency is bounded by the longest scene rather than the whole script
+        semaphore = asyncio.Semaphore(max_concurrency)
+
+        async def generate(scene: Scene) -> pd.DataFrame:
+            async with semaphore:
+                return await self.generate_scene_shot_list(scene, use_cache=use_cache)
+
+        return list(await asyncio.gather(*(generate(scene) for scene in scenes)))
+
+    async def _generate_shot_list_by_scene(self, scenes: List[Scene], use_cache: bool, max_concurrency: int) -> pd.DataFrame:
+        frames = [df for df in await self.generate_scene_shot_lists(scenes, use_cache, max_concurrency) if not df.empty]
+        if not frames:
+            return pd.DataFrame()
+        return pd.concat(frames, ignore_index=True)
+
+    def _build_subject_descriptions_template(self) -> PromptTemplate:
+        template = """
+        Given the following list of subjects extracted from a script and shot list, provide a brief description for each.
+        For people, focus on their physical appearance, clothing, accessories, and hairstyle.
+        For locations, describe their general appearance and atmosphere.
+        Do not include information about their role in the story or personality traits.
+
+        For each subject, provide a description in the following JSON format:
+        {{
+            "name": "Subject Name",
+            "description": "Description",
+            "type": "person/place"
+        }}
+
+        Example:
+        {{
+            "name": "John",
+            "description": "A man in his mid-40s with salt-and-pepper hair, wearing a worn leather jacket and carrying a notepad.",
+            "type": "person"
+        }}
+        {{
+            "name": "City Park",
+            "description": "A lush green space with winding paths, dotted with colorful flower beds and a central fountain.",
+            "type": "place"
+        }}
+
+        Provide descriptions for all subjects in the list below.
+
+        Script:
+        {script_excerpt}...  # Truncated for brevity
+
+        Subjects:
+        {subjects_list}
+        """
+        return PromptTemplate(template=template, input_variables=["script_excerpt", "subjects_list"])
+
+    async def extract_proposed_subjects(self, script: str, shot_list: pd.DataFrame, use_cache: bool = True) -> List[Dict[str, str]]:
         logger.info("Starting subject extraction process")
         subjects = []
 
@@ -271,44 +457,15 @@ class MetaChain:
             # Use LLM to generate descriptions for subjects
             if subjects:
                 subjects_list = "\n".join([f"{s['name']} ({s['type']})" for s in subjects])
-                prompt = f"""
-                Given the following list of subjects extracted from a script and shot list, provide a brief description for each.
-                For people, focus on their physical appearance, clothing, accessories, and hairstyle.
-                For locations, describe their general appearance and atmosphere.
-                Do not include information about their role in the story or personality traits.
-
-                Script:
-                {script[:500]}...  # Truncated for brevity
-
-                Subjects:
-                {subjects_list}
-
-                For each subject, provide a description in the following JSON format:
-                {{
-                    "name": "Subject Name",
-                    "description": "Description",
-                    "type": "person/place"
-                }}
-
-                Example:
-                {{
-                    "name": "John",
-                    "description": "A man in his mid-40s with salt-and-pepper hair, wearing a worn leather jacket and carrying a notepad.",
-                    "type": "person"
-                }}
-                {{
-                    "name": "City Park",
-                    "description": "A lush green space with winding paths, dotted with colorful flower beds and a central fountain.",
-                    "type": "place"
-                }}
-
-                Provide descriptions for all subjects in the list above.
-                """
+
+                prompt_template = chain_registry.get_template("meta_chain.subject_descriptions", self._build_subject_descriptions_template)
+                chain = chain_registry.get_chain("meta_chain.subject_descriptions", self.llm, self._build_subject_descriptions_template)
+                input_dict = {"script_excerpt": script[:500], "subjects_list": subjects_list}
 
                 logger.info("Sending prompt to LLM for subject descriptions")
                 try:
-                    response = await self.llm.ainvoke(prompt)
-                    content = response.content.strip()
+                    content = await self._complete(prompt_template.format(**input_dict), lambda: chain.ainvoke(input_dict), "subject_extraction", use_cache=use_cache)
+                    content = content.strip()
                     
                     logger.info("Received response from LLM")
                     logger.debug(f"Raw LLM response: {content[:500]}...")  # Log first 500 characters of the response
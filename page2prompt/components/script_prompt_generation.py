@@ -1,14 +1,17 @@
 import asyncio
-from typing import Dict, List, Optional, Tuple
+from typing import AsyncIterator, Dict, List, Optional, Tuple
+from page2prompt.utils.context_selector import ContextSelector
 from page2prompt.utils.style_manager import StyleManager
 from page2prompt.utils.subject_manager import SubjectManager
 from page2prompt.components.meta_chain import MetaChain
 
 class ScriptPromptGenerator:
-    def __init__(self, style_manager: StyleManager, subject_manager: SubjectManager, meta_chain: MetaChain):
+    def __init__(self, style_manager: StyleManager, subject_manager: SubjectManager, meta_chain: MetaChain,
+                 context_selector: Optional[ContextSelector] = None):
         self.style_manager = style_manager
         self.subject_manager = subject_manager
         self.meta_chain = meta_chain
+        self.context_selector = context_selector or ContextSelector()
 
     async def generate_prompts(
         self,
@@ -33,6 +36,61 @@ class ScriptPromptGenerator:
         full_script: Optional[str] = None,
         active_subjects: List[str] = []
     ) -> Tuple[str, str, str, str, str, str]:
+        # 1. Get active subjects from SubjectManager
+        active_subject_objects = self._get_active_subject_objects(active_subjects)
+
+        # 2. Generate prompts using MetaChain (interacting with the LLM)
+        prompts = await self.meta_chain.generate_prompt(**self._meta_chain_request(
+            script_excerpt, shot_description, directors_notes, style, director_style, shot, move, size, framing,
+            depth_of_field, camera_type, camera_name, lens_type, end_parameters, stick_to_script,
+            highlighted_text, full_script, active_subject_objects
+        ))
+
+        # 3. Apply prefix/suffix and aliases, then format the prompts
+        return self._format_prompts(prompts, active_subject_objects, active_subjects, style_prefix, style_suffix, end_parameters, "Prompts generated successfully")
+
+    async def stream_prompts(
+        self,
+        script_excerpt: str,
+        shot_description: str,
+        directors_notes: str,
+        style: Optional[str] = None,
+        style_prefix: Optional[str] = None,
+        style_suffix: Optional[str] = None,
+        director_style: Optional[str] = None,
+        shot: Optional[str] = None,
+        move: Optional[str] = None,
+        size: Optional[str] = None,
+        framing: Optional[str] = None,
+        depth_of_field: Optional[str] = None,
+        camera_type: Optional[str] = None,
+        camera_name: Optional[str] = None,
+        lens_type: Optional[str] = None,
+        end_parameters: Optional[str] = None,
+        stick_to_script: bool = False,
+        highlighted_text: Optional[str] = None,
+        full_script: Optional[str] = None,
+        active_subjects: List[str] = []
+    ) -> AsyncIterator[Tuple[str, str, str, str, str, str]]:
+        """Same as generate_prompts, but yields the formatted prompts as the LLM streams them."""
+        active_subject_objects = self._get_active_subject_objects(active_subjects)
+        request = self._meta_chain_request(
+            script_excerpt, shot_description, directors_notes, style, director_style, shot, move, size, framing,
+            depth_of_field, camera_type, camera_name, lens_type, end_parameters, stick_to_script,
+            highlighted_text, full_script, active_subject_objects
+        )
+
+        prompts = {}
+        async for prompts in self.meta_chain.stream_prompt(**request):
+            yield self._format_prompts(prompts, active_subject_objects, active_subjects, style_prefix, style_suffix, end_parameters, "Generating prompts...")
+        yield self._format_prompts(prompts, active_subject_objects, active_subjects, style_prefix, style_suffix, end_parameters, "Prompts generated successfully")
+
+    def _get_active_subject_objects(self, active_subjects: List[str]) -> list:
+        return [s for s in self.subject_manager.get_subjects() if s.name in active_subjects]
+
+    def _meta_chain_request(self, script_excerpt, shot_description, directors_notes, style, director_style, shot, move, size, framing,
+                            depth_of_field, camera_type, camera_name, lens_type, end_parameters, stick_to_script,
+                            highlighted_text, full_script, active_subject_objects) -> Dict:
         # Create camera_settings dictionary
         camera_settings = {
             "shot": shot or "",
@@ -44,45 +102,43 @@ class ScriptPromptGenerator:
             "camera_name": camera_name or "",
             "lens_type": lens_type or ""
         }
-
-        # 1. Get active subjects from SubjectManager
-        active_subject_objects = [s for s in self.subject_manager.get_subjects() if s.name in active_subjects]
-
-        # 2. Generate prompts using MetaChain (interacting with the LLM)
-        prompts = await self.meta_chain.generate_prompt(
+        # Only the scenes around the highlighted text (or else the excerpt, e.g. the shot's script
+        # reference) are sent, not the whole script
+        fallback_anchor = script_excerpt if full_script and script_excerpt != full_script else None
+        script_context = (self.context_selector.select(full_script or script_excerpt, highlighted_text, fallback_anchor)
+                          if stick_to_script else None)
+        return dict(
             style=style,
             highlighted_text=highlighted_text,
             shot_description=shot_description,
             directors_notes=directors_notes,
-            script=script_excerpt if stick_to_script else None,
+            script=script_context,
             stick_to_script=stick_to_script,
             end_parameters=end_parameters,
             active_subjects=[{"Name": s.name, "Description": s.description, "Alias": s.alias, "Type": s.type, "Prefix": s.prefix, "Suffix": s.suffix, "Active": s.active} for s in active_subject_objects],
-            full_script=full_script if stick_to_script else None,
+            full_script=script_context,
             shot_configuration=camera_settings,
             director_style=director_style
         )
 
-        # 3. Apply prefix/suffix and aliases, then format the prompts
+    def _format_prompts(self, prompts: Dict[str, str], active_subject_objects: list, active_subjects: List[str],
+                        style_prefix: Optional[str], style_suffix: Optional[str], end_parameters: Optional[str],
+                        message: str) -> Tuple[str, str, str, str, str, str]:
         formatted_prompts = {}
+        subject_prefix, subject_suffix = self.subject_manager.get_subject_prefix_suffix(active_subjects)
+        # Cached by the subject manager until the subjects change
+        alias_replacer = self.subject_manager.get_alias_replacer(active_subjects)
         for prompt_type, prompt in prompts.items():
-            print("Active subjects:")
-            for subject in active_subject_objects:
-                print(f"Name: {subject.name}, Alias: {subject.alias}")
-            print(f"Original prompt: {prompt}")
-            
-            for subject in active_subject_objects:
-                if subject.name != subject.alias:
-                    prompt = prompt.replace(subject.name, subject.alias)
-            
-            print(f"Prompt after alias replacement: {prompt}")
-            
-            subject_prefix, subject_suffix = self.subject_manager.get_subject_prefix_suffix(active_subjects)
+            if not prompt.strip():
+                # Nothing received yet for this prompt (e.g. while streaming), so don't show a bare prefix
+                formatted_prompts[prompt_type] = ""
+                continue
+            prompt = alias_replacer.replace(prompt)
+
             formatted_prompt = f"{subject_prefix.strip() + ' ' if subject_prefix else ''}{style_prefix.strip() + ' ' if style_prefix else ''}{prompt.strip()}{' ' + style_suffix.strip() if style_suffix else ''}{' ' + subject_suffix.strip() if subject_suffix else ''}"
             if end_parameters:
                 formatted_prompt += f" {end_parameters.strip()}"
             formatted_prompts[prompt_type] = formatted_prompt
-            print(f"Final formatted prompt: {formatted_prompt}")
 
         # 4. Prepare the output tuple
         return (
@@ -90,6 +146,6 @@ class ScriptPromptGenerator:
             formatted_prompts.get("normal", ""),
             formatted_prompts.get("detailed", ""),
             formatted_prompts.get("structured", ""),
-            "Prompts generated successfully",
+            message,
             ", ".join([subject.name for subject in active_subject_objects])
         )
@@ -1,39 +1,81 @@
 from langchain import PromptTemplate, LLMChain
-from langchain.chat_models import ChatOpenAI
+from langchain_community.callbacks.manager import get_openai_callback
 import pandas as pd
-from typing import List, Dict, Optional, Tuple
+from typing import Any, Awaitable, Callable, List, Dict, Optional, Tuple
 import asyncio
+import re
+from page2prompt.components.chain_registry import chain_registry
+from page2prompt.utils import bulk_jobs
+from page2prompt.utils.bulk_jobs import BulkJobStore
+from page2prompt.utils.llm_client import LLMClientFactory, llm_clients
+from page2prompt.utils.llm_scheduler import estimate_tokens, scheduler
+from page2prompt.utils.telemetry import telemetry
+
+# Awaited with (row index, generated columns) as soon as a row is done, e.g. to checkpoint it
+RowCallback = Callable[[Any, Dict[str, str]], Awaitable[None]]
+
+def _llm_chain(prompt: PromptTemplate, llm) -> LLMChain:
+    return LLMChain(llm=llm, prompt=prompt)
 
 class ShotListMetaChain:
-    def __init__(self, api_key: str, subject_manager, style_manager, director_assistant):
-        self.llm = ChatOpenAI(temperature=0.7, model_name="gpt-3.5-turbo", openai_api_key=api_key)
+    def __init__(self, api_key: str, subject_manager, style_manager, director_assistant, max_concurrency: int = 5, llm=None,
+                 clients: Optional[LLMClientFactory] = None):
+        self.llm = llm or (clients or llm_clients).chat_model("gpt-3.5-turbo", api_key=api_key)
         self.subject_manager = subject_manager
         self.style_manager = style_manager
         self.director_assistant = director_assistant
+        self.max_concurrency = max_concurrency
 
-    async def generate_bulk_directors_notes(self, script: str, shot_list_df: pd.DataFrame, visual_style: str, director_style_name: str, progress_callback=None) -> pd.DataFrame:
+    async def generate_bulk_directors_notes(self, script: str, shot_list_df: pd.DataFrame, visual_style: str, director_style_name: str, progress_callback=None, max_concurrency: Optional[int] = None,
+                                            row_callback: Optional[RowCallback] = None) -> pd.DataFrame:
         director_style = self.director_assistant.get_director_style(director_style_name)
         visual_style_desc = self.style_manager.get_full_style_description(visual_style)
-        
+
+        # At most max_concurrency shots are in flight with the LLM at any time
+        semaphore = asyncio.Semaphore(max_concurrency or self.max_concurrency)
         total_shots = len(shot_list_df)
-        for index, row in shot_list_df.iterrows():
-            script_excerpt = row.get('Script Reference', '')
-            subjects = self.subject_manager.get_subjects_for_shot(row.get('People', ''))
-            notes = await self.generate_directors_notes(
-                script_excerpt, 
-                row.get('Shot Description', ''), 
-                visual_style_desc,
-                director_style['notes'], 
-                subjects,
-                row.get('Scene', ''),
-                row.get('Shot', ''),
-                row.get('Shot Size', ''),
-                ''  # Location is not present in the DataFrame
-            )
-            shot_list_df.at[index, 'Director\'s Notes'] = notes
+        completed = 0
+        # Set when a row fails, so rows still queued on the semaphore don't start (and get checkpointed)
+        failed = asyncio.Event()
+
+        async def generate_row_notes(index, row: pd.Series) -> str:
+            nonlocal completed
+            async with semaphore:
+                if failed.is_set():
+                    raise asyncio.CancelledError()
+                try:
+                    notes = await self.generate_directors_notes(
+                        row.get('Script Reference', ''),
+                        row.get('Shot Description', ''),
+                        visual_style_desc,
+                        director_style['notes'],
+                        self.subject_manager.get_subjects_for_shot(row.get('People', '')),
+                        row.get('Scene', ''),
+                        row.get('Shot', ''),
+                        row.get('Shot Size', ''),
+                        ''  # Location is not present in the DataFrame
+                    )
+                except BaseException:
+                    failed.set()
+                    raise
+            if row_callback:
+                await row_callback(index, {'Director\'s Notes': notes})
+            # Shots finish out of order, so progress counts completions rather than row positions
+            completed += 1
             if progress_callback:
-                progress_callback((index + 1) / total_shots)
-            await asyncio.sleep(0)  # Allow other tasks to run
+                progress_callback(completed / total_shots)
+            return notes
+
+        # gather() returns results in submission order, so notes line up with the original rows
+        tasks = [asyncio.ensure_future(generate_row_notes(index, row)) for index, row in shot_list_df.iterrows()]
+        try:
+            notes = await asyncio.gather(*tasks)
+        except BaseException:
+            # Don't keep paying for the remaining shots once the run has failed
+            for task in tasks:
+                task.cancel()
+            raise
+        shot_list_df['Director\'s Notes'] = list(notes)
 
         # Add 'Setting' column if it doesn't exist
         if 'Setting' not in shot_list_df.columns:
@@ -42,19 +84,21 @@ class ShotListMetaChain:
         return shot_list_df
 
     async def generate_directors_notes(self, script_excerpt: str, shot_description: str, visual_style: str, director_style: str, subjects: str, scene: str, shot: str, shot_size: str, location: str) -> str:
-        prompt = self._get_directors_notes_prompt()
-        chain = LLMChain(llm=self.llm, prompt=prompt)
-        response = await chain.arun(
-            script_excerpt=script_excerpt,
-            shot_description=shot_description,
-            visual_style=visual_style,
-            director_style=director_style,
-            subjects=subjects,
-            scene=scene,
-            shot=shot,
-            shot_size=shot_size,
-            location=location
-        )
+        chain = chain_registry.get_chain("shot_list_meta_chain.directors_notes", self.llm, self._get_directors_notes_prompt, _llm_chain)
+        inputs = {
+            "script_excerpt": script_excerpt,
+            "shot_description": shot_description,
+            "visual_style": visual_style,
+            "director_style": director_style,
+            "subjects": subjects,
+            "scene": scene,
+            "shot": shot,
+            "shot_size": shot_size,
+            "location": location
+        }
+        with telemetry.track("bulk_notes", self.llm.model_name) as tracker, get_openai_callback() as cb:
+            response = await scheduler.run(lambda: chain.arun(**inputs), estimate_tokens(chain.prompt.template, *map(str, inputs.values())))
+            tracker.set_usage(cb)
         return response.strip()
 
     def _get_directors_notes_prompt(self) -> PromptTemplate:
@@ -62,23 +106,27 @@ class ShotListMetaChain:
         As an experienced film director, provide detailed notes for the following shot, considering all the provided information. Keep in mind the overall visual style of the film, but don't explicitly mention it in your notes.
 
         Visual Style of the Film: {visual_style}
+        Director's Style: {director_style}
         Scene: {scene}
         Shot: {shot}
         Shot Size: {shot_size}
         Location: {location}
         Script Excerpt: {script_excerpt}
         Shot Description: {shot_description}
-        Director's Style: {director_style}
         Subjects: {subjects}
 
         Director's Notes:
         """
         return PromptTemplate(template=template, input_variables=["visual_style", "scene", "shot", "shot_size", "location", "script_excerpt", "shot_description", "director_style", "subjects"])
 
-    async def generate_bulk_prompts(self, shot_list_df: pd.DataFrame, visual_style: str, progress_callback=None) -> pd.DataFrame:
+    async def generate_bulk_prompts(self, shot_list_df: pd.DataFrame, visual_style: str, progress_callback=None, batch_size: int = 1,
+                                    row_callback: Optional[RowCallback] = None) -> pd.DataFrame:
         visual_style_prefix, visual_style_suffix = self.style_manager.get_style_prefix_suffix(visual_style)
+        if batch_size > 1:
+            return await self._generate_batched_bulk_prompts(shot_list_df, visual_style_prefix, visual_style_suffix, batch_size, progress_callback, row_callback)
+
         total_shots = len(shot_list_df)
-        for index, row in shot_list_df.iterrows():
+        for completed, (index, row) in enumerate(shot_list_df.iterrows(), start=1):
             prompts = await self.generate_prompts(
                 row['Script Reference'],
                 row['Shot Description'],
@@ -91,35 +139,137 @@ class ShotListMetaChain:
             shot_list_df.at[index, 'Concise Prompt'] = prompts['concise']
             shot_list_df.at[index, 'Medium Prompt'] = prompts['medium']
             shot_list_df.at[index, 'Detailed Prompt'] = prompts['detailed']
+            if row_callback:
+                await row_callback(index, self._prompt_columns(prompts))
             if progress_callback:
-                progress_callback((index + 1) / total_shots)
+                progress_callback(completed / total_shots)
             await asyncio.sleep(0)  # Allow other tasks to run
 
         return shot_list_df
 
+    async def _generate_batched_bulk_prompts(self, shot_list_df: pd.DataFrame, visual_style_prefix: str, visual_style_suffix: str,
+                                             batch_size: int, progress_callback=None, row_callback: Optional[RowCallback] = None) -> pd.DataFrame:
+        # Shot IDs are row positions, so they stay unique even when Scene/Shot numbers repeat
+        shots = [(str(position + 1), index, row) for position, (index, row) in enumerate(shot_list_df.iterrows())]
+        total_shots = len(shots)
+        completed = 0
+        for start in range(0, total_shots, batch_size):
+            batch = shots[start:start + batch_size]
+            batch_prompts = await self.generate_batched_prompts(
+                [(shot_id, row) for shot_id, _, row in batch],
+                visual_style_prefix,
+                visual_style_suffix
+            )
+            for shot_id, index, _ in batch:
+                prompts = batch_prompts[shot_id]
+                shot_list_df.at[index, 'Concise Prompt'] = prompts['concise']
+                shot_list_df.at[index, 'Medium Prompt'] = prompts['medium']
+                shot_list_df.at[index, 'Detailed Prompt'] = prompts['detailed']
+                if row_callback:
+                    await row_callback(index, self._prompt_columns(prompts))
+            completed += len(batch)
+            if progress_callback:
+                progress_callback(completed / total_shots)
+
+        return shot_list_df
+
+    @staticmethod
+    def _prompt_columns(prompts: Dict[str, str]) -> Dict[str, str]:
+        return {'Concise Prompt': prompts['concise'], 'Medium Prompt': prompts['medium'], 'Detailed Prompt': prompts['detailed']}
+
+    async def run_bulk_job(self, jobs: BulkJobStore, job_id: str, progress_callback=None) -> pd.DataFrame:
+        """Runs or resumes a stored bulk job, checkpointing each row; rows finished earlier are skipped."""
+        # The job store commits on every write, so its calls run off the event loop
+        job = await asyncio.to_thread(jobs.get_job, job_id)
+        if job is None:
+            raise ValueError(f"Unknown bulk job: {job_id}")
+        shot_list_df = pd.DataFrame(await asyncio.to_thread(jobs.load_rows, job_id))
+        pending_df = shot_list_df.drop(index=await asyncio.to_thread(jobs.completed_positions, job_id))
+        done = len(shot_list_df) - len(pending_df)
+
+        async def checkpoint(index, columns: Dict[str, str]) -> None:
+            await asyncio.to_thread(jobs.checkpoint, job_id, int(index), columns)
+
+        def report(fraction: float) -> None:
+            if progress_callback:
+                progress_callback((done + fraction * len(pending_df)) / max(len(shot_list_df), 1))
+
+        params = job["params"]
+        await asyncio.to_thread(jobs.set_status, job_id, bulk_jobs.RUNNING)
+        try:
+            if not pending_df.empty:
+                if job["kind"] == bulk_jobs.DIRECTORS_NOTES:
+                    await self.generate_bulk_directors_notes(params.get("script", ""), pending_df, params["visual_style"],
+                                                             params["director_style"], report, row_callback=checkpoint)
+                else:
+                    await self.generate_bulk_prompts(pending_df, params["visual_style"], report,
+                                                     batch_size=params.get("batch_size", 1), row_callback=checkpoint)
+        except BaseException as e:
+            # Cancellation (e.g. the browser went away) leaves the job resumable rather than failed
+            await asyncio.to_thread(jobs.set_status, job_id, bulk_jobs.FAILED if isinstance(e, Exception) else bulk_jobs.INTERRUPTED, str(e))
+            raise
+        await asyncio.to_thread(jobs.set_status, job_id, bulk_jobs.COMPLETED)
+        return pd.DataFrame(await asyncio.to_thread(jobs.load_rows, job_id))
+
+    async def generate_batched_prompts(self, shots: List[Tuple[str, pd.Series]], visual_style_prefix: str, visual_style_suffix: str) -> Dict[str, Dict[str, str]]:
+        """Generates prompts for several shots in one request, keyed by shot ID.
+
+        Shots whose block is missing or incomplete in the reply are retried on their own.
+        """
+        chain = chain_registry.get_chain("shot_list_meta_chain.batched_prompts", self.llm, self._get_batched_prompt_generation_template, _llm_chain)
+        try:
+            with telemetry.track("bulk_prompts", self.llm.model_name) as tracker, get_openai_callback() as cb:
+                formatted_shots = "\n\n".join(self._format_batched_shot(shot_id, row) for shot_id, row in shots)
+                response = await scheduler.run(lambda: chain.arun(shots=formatted_shots), estimate_tokens(chain.prompt.template, formatted_shots))
+                tracker.set_usage(cb)
+            parsed = self._parse_batched_prompt_response(response)
+        except Exception as e:
+            print(f"Error generating batched prompts, retrying shots individually: {str(e)}")
+            parsed = {}
+
+        results = {}
+        for shot_id, row in shots:
+            prompts = parsed.get(shot_id)
+            if prompts is None:
+                results[shot_id] = await self.generate_prompts(
+                    row['Script Reference'],
+                    row['Shot Description'],
+                    row['Director\'s Notes'],
+                    visual_style_prefix,
+                    visual_style_suffix,
+                    row['Shot Size'],
+                    row['People']
+                )
+            else:
+                results[shot_id] = self._apply_visual_style(prompts, visual_style_prefix, visual_style_suffix)
+        return results
+
     async def generate_prompts(self, script_reference: str, shot_description: str, directors_notes: str, 
                                visual_style_prefix: str, visual_style_suffix: str, shot_size: str, people: str) -> Dict[str, str]:
-        prompt = self._get_prompt_generation_template()
-        chain = LLMChain(llm=self.llm, prompt=prompt)
-        response = await chain.arun(
-            script_reference=script_reference,
-            shot_description=shot_description,
-            directors_notes=directors_notes,
-            shot_size=shot_size,
-            people=people
-        )
+        chain = chain_registry.get_chain("shot_list_meta_chain.prompts", self.llm, self._get_prompt_generation_template, _llm_chain)
+        inputs = {
+            "script_reference": script_reference,
+            "shot_description": shot_description,
+            "directors_notes": directors_notes,
+            "shot_size": shot_size,
+            "people": people
+        }
+        with telemetry.track("bulk_prompts", self.llm.model_name) as tracker, get_openai_callback() as cb:
+            response = await scheduler.run(lambda: chain.arun(**inputs), estimate_tokens(chain.prompt.template, *map(str, inputs.values())))
+            tracker.set_usage(cb)
         # Parse the response to extract concise, medium, and detailed prompts
         prompts = self._parse_prompt_response(response)
-        
+        return self._apply_visual_style(prompts, visual_style_prefix, visual_style_suffix)
+
+    def _apply_visual_style(self, prompts: Dict[str, str], visual_style_prefix: str, visual_style_suffix: str) -> Dict[str, str]:
         # Add visual style prefix and suffix to each prompt
-        for key in prompts:
-            prompts[key] = f"{visual_style_prefix} {prompts[key]} {visual_style_suffix}".strip()
-        
-        return prompts
+        return {key: f"{visual_style_prefix} {value} {visual_style_suffix}".strip() for key, value in prompts.items()}
 
     def _get_prompt_generation_template(self) -> PromptTemplate:
         template = """
-        Generate three versions of a prompt (concise, medium, and detailed) for an image generation AI based on the following information:
+        Generate three versions of a prompt (concise, medium, and detailed) for an image generation AI based on the shot information below.
+
+        The prompts should capture the essence of the shot and the director's vision. Do not include the visual style in your generated prompts.
 
         Script Reference: {script_reference}
         Shot Description: {shot_description}
@@ -127,28 +277,69 @@ class ShotListMetaChain:
         Shot Size: {shot_size}
         People: {people}
 
-        The prompts should capture the essence of the shot and the director's vision. Do not include the visual style in your generated prompts.
-
         Concise Prompt:
         Medium Prompt:
         Detailed Prompt:
         """
         return PromptTemplate(template=template, input_variables=["script_reference", "shot_description", "directors_notes", "shot_size", "people"])
 
+    def _get_batched_prompt_generation_template(self) -> PromptTemplate:
+        template = """
+        Generate three versions of a prompt (concise, medium, and detailed) for an image generation AI for each of the shots below.
+
+        The prompts should capture the essence of each shot and the director's vision. Do not include the visual style in your generated prompts.
+
+        Answer with one block per shot, in the same order as the shots, using exactly this format:
+
+        ### Shot ID: <shot id>
+        Concise Prompt: <prompt>
+        Medium Prompt: <prompt>
+        Detailed Prompt: <prompt>
+
+        Shots:
+
+        {shots}
+        """
+        return PromptTemplate(template=template, input_variables=["shots"])
+
+    def _format_batched_shot(self, shot_id: str, row: pd.Series) -> str:
+        directors_notes = row['Director\'s Notes']
+        return (
+            f"### Shot ID: {shot_id}\n"
+            f"Script Reference: {row['Script Reference']}\n"
+            f"Shot Description: {row['Shot Description']}\n"
+            f"Director's Notes: {directors_notes}\n"
+            f"Shot Size: {row['Shot Size']}\n"
+            f"People: {row['People']}"
+        )
+
+    def _parse_batched_prompt_response(self, response: str) -> Dict[str, Dict[str, str]]:
+        """Splits a batched reply into per-shot prompts, dropping blocks that lack any of the three prompts."""
+        blocks = re.split(r'^\s*#*\s*Shot ID:\s*', response, flags=re.MULTILINE)
+        parsed = {}
+        for block in blocks[1:]:
+            shot_id, _, body = block.partition('\n')
+            prompts = self._parse_prompt_response(body)
+            if all(prompts.get(key) for key in ('concise', 'medium', 'detailed')):
+                parsed[shot_id.strip()] = prompts
+        return parsed
+
     def _parse_prompt_response(self, response: str) -> Dict[str, str]:
         lines = response.strip().split('\n')
         prompts = {}
         current_prompt = None
         for line in lines:
+            line = line.strip()
+            # Keep any text that follows the label on the same line
             if line.startswith('Concise Prompt:'):
                 current_prompt = 'concise'
-                prompts[current_prompt] = ''
+                prompts[current_prompt] = line[len('Concise Prompt:'):].strip() + ' '
             elif line.startswith('Medium Prompt:'):
                 current_prompt = 'medium'
-                prompts[current_prompt] = ''
+                prompts[current_prompt] = line[len('Medium Prompt:'):].strip() + ' '
             elif line.startswith('Detailed Prompt:'):
                 current_prompt = 'detailed'
-                prompts[current_prompt] = ''
+                prompts[current_prompt] = line[len('Detailed Prompt:'):].strip() + ' '
             elif current_prompt:
                 prompts[current_prompt] += line.strip() + ' '
         return {k: v.strip() for k, v in prompts.items()}
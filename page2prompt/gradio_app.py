@@ -4,86 +4,143 @@ import csv
 import os
 import pandas as pd
 import json
-from datetime import datetime
 import logging
+import sqlite3
 import aiofiles
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse, Response
 
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
 def get_initial_subjects_data():
-    return subject_manager.get_subjects_dataframe()
+    return services.subject_manager.get_subjects_dataframe()
 
 # Add these function definitions at the top of the file
 async def list_projects():
-    projects = []
-    for file in os.listdir():
-        if file.endswith(".json"):
-            try:
-                async with aiofiles.open(file, "r") as f:
-                    project_data = json.loads(await f.read())
-                    projects.append({
-                        "Project Name": project_data.get("name", "Unknown"),
-                        "Last Modified": project_data.get("last_modified", "Unknown")
-                    })
-            except (json.JSONDecodeError, IOError) as e:
-                print(f"Error reading project file {file}: {str(e)}")
-    return pd.DataFrame(projects)
+    # Only the projects index is read; shot lists and scripts stay on disk until a project is loaded
+    projects = [
+        {"Project Name": project["name"], "Last Modified": project["last_modified"]}
+        for project in await asyncio.to_thread(services.project_store.list_projects)
+    ]
+    return pd.DataFrame(projects, columns=["Project Name", "Last Modified"])
 
 async def save_project(project_name, full_script, shot_list, subjects, generated_prompts):
     if not project_name:
-        return "Please enter a project name.", None, generated_prompts
+        return "Please enter a project name.", None
 
     # Convert DataFrames to dict if they're not already
     shot_list_dict = shot_list.to_dict('records') if isinstance(shot_list, pd.DataFrame) else []
     subjects_dict = subjects.to_dict('records') if isinstance(subjects, pd.DataFrame) else []
 
-    project_data = {
-        "name": project_name,
-        "full_script": full_script,
-        "shot_list": shot_list_dict,
-        "subjects": subjects_dict,
-        "prompts": generated_prompts,
-        "last_modified": datetime.now().isoformat()
-    }
-    
     try:
-        with open(f"{project_name}.json", "w") as f:
-            json.dump(project_data, f)
-        return f"Project '{project_name}' saved successfully.", await list_projects(), generated_prompts
-    except IOError as e:
-        return f"Error saving project: {str(e)}", None, generated_prompts
+        # Journal the edits first so the snapshot written by compact() includes them
+        await asyncio.to_thread(services.project_journal.record, project_name, full_script, shot_list_dict, subjects_dict, generated_prompts or [])
+        await asyncio.to_thread(services.project_journal.compact, project_name)
+        telemetry.set_project(project_name)
+        return f"Project '{project_name}' saved successfully.", await list_projects()
+    except (sqlite3.Error, IOError) as e:
+        return f"Error saving project: {str(e)}", None
+
+async def autosave_project(project_name, full_script, shot_list, subjects):
+    """Journals the edits since the last autosave; only the changed rows are written."""
+    if not project_name:
+        return
+    shot_list_dict = shot_list.to_dict('records') if isinstance(shot_list, pd.DataFrame) else []
+    subjects_dict = subjects.to_dict('records') if isinstance(subjects, pd.DataFrame) else []
+    try:
+        await asyncio.to_thread(services.project_journal.record, project_name, full_script, shot_list_dict, subjects_dict, list(generated_prompts))
+    except (sqlite3.Error, IOError) as e:
+        logger.error(f"Error autosaving project '{project_name}': {str(e)}")
+
+def _load_legacy_project(project_name):
+    """Imports a project saved as <name>.json by older versions into the project store."""
+    legacy_path = f"{project_name}.json"
+    if not os.path.exists(legacy_path):
+        return None
+    with open(legacy_path, "r") as f:
+        project_data = json.load(f)
+    services.project_store.save_project(
+        project_name,
+        project_data.get("full_script", ""),
+        project_data.get("shot_list", []),
+        project_data.get("subjects", []),
+        project_data.get("prompts", [])
+    )
+    return services.project_store.load_project(project_name)
 
 async def load_project(project_name):
     try:
-        async with aiofiles.open(f"{project_name}.json", "r") as f:
-            project_data = json.loads(await f.read())
-        
+        # Replays autosaved edits that were journaled after the last full save
+        project_data = (await asyncio.to_thread(services.project_journal.recover, project_name)
+                        or await asyncio.to_thread(_load_legacy_project, project_name))
+        if project_data is None:
+            return None, None, None, None, f"Project '{project_name}' not found."
+
         full_script = project_data.get("full_script", "")
         shot_list = pd.DataFrame(project_data.get("shot_list", []))
         subjects = pd.DataFrame(project_data.get("subjects", []))
         prompts = project_data.get("prompts", [])
         
         # Update the subject_manager with the loaded subjects
-        subject_manager.set_subjects(subjects)
+        services.subject_manager.set_subjects(subjects)
+        telemetry.set_project(project_name)
         
         return full_script, shot_list, subjects, prompts, f"Project '{project_name}' loaded successfully."
-    except FileNotFoundError:
-        return None, None, None, None, f"Project '{project_name}' not found."
     except json.JSONDecodeError:
         return None, None, None, None, f"Error reading project file for '{project_name}'. The file may be corrupted."
-    except IOError as e:
+    except (sqlite3.Error, IOError) as e:
         return None, None, None, None, f"Error loading project: {str(e)}"
 
 async def delete_project(project_name):
     try:
-        os.remove(f"{project_name}.json")
-        return f"Project '{project_name}' deleted successfully.", await list_projects()
-    except FileNotFoundError:
+        deleted = await asyncio.to_thread(services.project_store.delete_project, project_name)
+        await asyncio.to_thread(services.project_journal.discard, project_name)
+        if deleted:
+            return f"Project '{project_name}' deleted successfully.", await list_projects()
         return f"Project '{project_name}' not found.", await list_projects()
-    except IOError as e:
+    except sqlite3.Error as e:
         return f"Error deleting project: {str(e)}", await list_projects()
 
+def create_metrics_app() -> FastAPI:
+    """Returns a FastAPI app exposing LLM telemetry; the Gradio UI is mounted on it at /."""
+    app = FastAPI()
+
+    @app.get("/metrics", response_class=PlainTextResponse)
+    def metrics():
+        return telemetry.to_prometheus()
+
+    @app.get("/metrics.json")
+    def metrics_json():
+        return Response(telemetry.to_json(), media_type="application/json")
+
+    return app
+
+def get_usage_summary():
+    columns = ["project", "call_site", "model", "calls", "cache_hits", "errors", "prompt_tokens", "cached_tokens", "cached_ratio", "completion_tokens", "cost", "avg_latency"]
+    summary = pd.DataFrame(telemetry.summary(("project", "call_site", "model")), columns=columns)
+    summary["cost"] = summary["cost"].round(4)
+    summary["avg_latency"] = summary["avg_latency"].round(2)
+    summary["cached_ratio"] = summary["cached_ratio"].round(2)
+    totals = telemetry.summary(("session",))
+    if totals:
+        total = totals[0]
+        message = (f"Session {telemetry.session}: {total['calls']} calls ({total['cache_hits']} cached), "
+                   f"{total['prompt_tokens'] + total['completion_tokens']} tokens "
+                   f"({total['cached_tokens']} prompt tokens from the provider cache), ${total['cost']:.4f}")
+    else:
+        message = "No LLM calls yet this session."
+    return summary, message
+
+def get_bulk_jobs():
+    columns = ["Job ID", "Kind", "Status", "Progress", "Updated", "Error"]
+    jobs = [
+        [job["id"], job["kind"], job["status"], f"{job['completed']}/{job['total']}", job["updated"], job["error"] or ""]
+        for job in services.bulk_job_store.list_jobs()
+    ]
+    return pd.DataFrame(jobs, columns=columns)
+
 async def export_prompts(prompts, project_name):
     if not project_name:
         return "Please enter a project name."
@@ -128,14 +185,14 @@ def export_styles_to_csv(filename):
         with open(full_path, 'w', newline='') as csvfile:
             writer = csv.DictWriter(csvfile, fieldnames=["name", "prefix", "suffix"])
             writer.writeheader()
-            for style in style_manager.get_styles():
-                style_data = style_manager.get_style(style)
+            for style in services.style_manager.get_styles():
+                style_data = services.style_manager.get_style(style)
                 writer.writerow({
                     "name": style,
                     "prefix": style_data.get("Prefix", ""),
                     "suffix": style_data.get("Suffix", "")
                 })
-        return f"Styles exported successfully to {full_path}", gr.update(choices=style_manager.get_styles())
+        return f"Styles exported successfully to {full_path}", gr.update(choices=services.style_manager.get_styles())
     except Exception as e:
         return f"Error exporting styles: {str(e)}", gr.update()
 
@@ -146,12 +203,12 @@ def import_styles_from_csv(file):
         content = file.read().decode('utf-8')
         reader = csv.DictReader(content.splitlines())
         for row in reader:
-            style_manager.add_style({
+            services.style_manager.add_style({
                 "name": row["name"],
                 "prefix": row["prefix"],
                 "suffix": row["suffix"]
             })
-        return "Styles imported successfully from the uploaded file", gr.update(choices=style_manager.get_styles())
+        return "Styles imported successfully from the uploaded file", gr.update(choices=services.style_manager.get_styles())
     except Exception as e:
         return f"Error importing styles: {str(e)}", gr.update()
 
@@ -191,119 +248,34 @@ def import_proposed_subjects_from_csv(file):
 
 # Add a function to update the styles dropdown
 def update_styles_dropdown():
-    return gr.update(choices=style_manager.get_styles())
+    return gr.update(choices=services.style_manager.get_styles())
 
 def update_subject_checkboxes():
     return {
-        people: gr.update(choices=subject_manager.get_people()),
-        places: gr.update(choices=subject_manager.get_places()),
-        props: gr.update(choices=subject_manager.get_props())
+        people: gr.update(choices=services.subject_manager.get_people()),
+        places: gr.update(choices=services.subject_manager.get_places()),
+        props: gr.update(choices=services.subject_manager.get_props())
     }
 
-from page2prompt.components.script_prompt_generation import ScriptPromptGenerator
-from page2prompt.utils.subject_manager import SubjectManager
 from page2prompt.utils.subject import Subject
-from page2prompt.utils.style_manager import StyleManager
-from page2prompt.components.meta_chain import MetaChain
-from page2prompt.utils.shot_list_generator import generate_shot_list
+from page2prompt.utils.shot_list_generator import generate_shot_list as generate_music_video_shot_list_df
 from typing import Dict, Any
-from page2prompt.components.director_assistant import DirectorAssistant
 from page2prompt.music_lab import transcribe_audio, search_and_replace_lyrics
-from page2prompt.utils.script_manager import ScriptManager
-from page2prompt.components.shot_list_meta_chain import ShotListMetaChain
+from page2prompt.utils.llm_client import llm_clients
+from page2prompt.utils import bulk_jobs
+from page2prompt.utils.telemetry import telemetry
+from page2prompt.services import services
 
-# Add debug print statements
-print("Current working directory:", os.getcwd())
-print("Files in current directory:", os.listdir())
-
-api_key = os.environ.get("OPENAI_API_KEY")
-if not api_key:
+# A local OpenAI-compatible endpoint (OPENAI_BASE_URL) works without a key
+if not llm_clients.api_key:
     raise ValueError("OpenAI API key not found in environment variables")
 
-# Define data directory
-DATA_DIR = os.path.dirname(__file__)
-
-# Define data directory
-DATA_DIR = os.path.dirname(__file__)
-
-# Initialize components with error handling
-try:
-    style_manager = StyleManager(os.path.join(DATA_DIR, "styles.csv"))
-    print("StyleManager initialized. Printing styles:")
-    style_manager.print_styles()
-    print(f"Available styles: {style_manager.get_styles()}")
-except Exception as e:
-    print(f"Error initializing StyleManager: {str(e)}")
-    style_manager = None
-
-try:
-    subject_manager = SubjectManager(os.path.join(DATA_DIR, "subjects.csv"))
-except Exception as e:
-    print(f"Error loading subjects: {str(e)}")
-    subject_manager = None
-
-try:
-    director_assistant = DirectorAssistant(os.path.join(DATA_DIR, "director_styles.csv"))
-except Exception as e:
-    print(f"Error loading director styles: {str(e)}")
-    director_assistant = None
-
-if style_manager and subject_manager and director_assistant:
-    shot_list_meta_chain = ShotListMetaChain(api_key, subject_manager, style_manager, director_assistant)
-else:
-    print("Error: Unable to initialize ShotListMetaChain due to missing components.")
-    shot_list_meta_chain = None
-
-try:
-    subject_manager = SubjectManager(os.path.join(DATA_DIR, "subjects.csv"))
-except Exception as e:
-    print(f"Error loading subjects: {str(e)}")
-meta_chain = MetaChain()
-script_prompt_generator = ScriptPromptGenerator(style_manager, subject_manager, meta_chain)
-director_assistant = DirectorAssistant(os.path.join(DATA_DIR, "director_styles.csv"))
-script_manager = ScriptManager(meta_chain)
-
 async def handle_conversation(user_input, concept, genre, descriptors, lyrics, chat_history):
     # Placeholder function for handling conversation
     # You should implement the actual conversation logic here
     updated_history = chat_history + [("User", user_input), ("Assistant", "This is a placeholder response.")]
     return updated_history, updated_history
 
-# Load camera settings from CSV
-def load_camera_settings(csv_file):
-    settings = {}
-    file_path = os.path.join(DATA_DIR, csv_file)
-    print(f"Attempting to load camera settings from: {file_path}")
-    try:
-        with open(file_path, 'r') as file:
-            reader = csv.DictReader(file)
-            for row in reader:
-                if row['type'] not in settings:
-                    settings[row['type']] = []
-                settings[row['type']].append(row['display'])
-        print(f"Successfully loaded camera settings")
-    except Exception as e:
-        print(f"Error loading camera settings: {str(e)}")
-    return settings
-
-camera_settings = load_camera_settings("camera_settings.csv")
-
-# Load director styles from CSV
-def load_director_styles(csv_file):
-    styles = []
-    file_path = os.path.join(DATA_DIR, csv_file)
-    print(f"Attempting to load director styles from: {file_path}")
-    try:
-        with open(file_path, 'r') as file:
-            reader = csv.DictReader(file)
-            styles = list(reader)
-        print(f"Successfully loaded director styles")
-    except Exception as e:
-        print(f"Error loading director styles: {str(e)}")
-    return styles
-
-director_styles = load_director_styles("director_styles.csv")
-
 # Transcribe audio function
 def transcribe_audio_wrapper(audio_file, include_timestamps):
     if audio_file is None:
@@ -313,7 +285,7 @@ def transcribe_audio_wrapper(audio_file, include_timestamps):
 # Gradio interface setup
 with gr.Blocks() as demo:
     with gr.Accordion("🎬 Script & Director Style", open=True):
-        director_style_input = gr.Dropdown(label="🎬 Director Style", choices=["No Director"] + [style['name'] for style in director_styles])
+        director_style_input = gr.Dropdown(label="🎬 Director Style", choices=["No Director"] + [style['name'] for style in services.director_styles])
         with gr.Accordion("📜 Full Script", open=False):
             with gr.Row():
                 full_script_input = gr.Textbox(label="📚 Full Script", lines=10)
@@ -343,20 +315,20 @@ with gr.Blocks() as demo:
                     with gr.Accordion("👥 Subjects", open=False):
                         with gr.Row():
                             with gr.Column():
-                                people = gr.CheckboxGroup(label="People", choices=subject_manager.get_people(), value=[])
+                                people = gr.CheckboxGroup(label="People", choices=services.subject_manager.get_people(), value=[])
                             with gr.Column():
-                                places = gr.CheckboxGroup(label="Places", choices=subject_manager.get_places(), value=[])
+                                places = gr.CheckboxGroup(label="Places", choices=services.subject_manager.get_places(), value=[])
                             with gr.Column():
-                                props = gr.CheckboxGroup(label="Props", choices=subject_manager.get_props(), value=[])
+                                props = gr.CheckboxGroup(label="Props", choices=services.subject_manager.get_props(), value=[])
 
                     with gr.Accordion("🎨 Style", open=False):
                         with gr.Row():
-                            style_input = gr.Dropdown(label="Style", choices=style_manager.get_styles() if style_manager else [])
+                            style_input = gr.Dropdown(label="Style", choices=services.style_manager.get_styles() if services.style_manager else [])
                             style_prefix_input = gr.Textbox(label="Prefix")
                             style_suffix_input = gr.Textbox(label="Suffix")
                         
                         def update_styles_dropdown():
-                            return gr.update(choices=style_manager.get_styles() if style_manager else [])
+                            return gr.update(choices=services.style_manager.get_styles() if services.style_manager else [])
                         
                         with gr.Row():
                             save_style_btn = gr.Button("💾 Save Style")
@@ -367,8 +339,8 @@ with gr.Blocks() as demo:
                         end_parameters_input = gr.Textbox(label="🔚 End Parameters")
 
                         def update_style_fields(style_name):
-                            if style_manager:
-                                style = style_manager.get_style(style_name)
+                            if services.style_manager:
+                                style = services.style_manager.get_style(style_name)
                                 return style.get("Prefix", ""), style.get("Suffix", "")
                             return "", ""
 
@@ -380,16 +352,16 @@ with gr.Blocks() as demo:
 
                     with gr.Accordion("📷 Camera Settings", open=False):
                         with gr.Row():
-                            shot = gr.Dropdown(label="Shot", choices=["AI Suggest"] + camera_settings.get('shot', []))
-                            move = gr.Dropdown(label="Move", choices=["AI Suggest"] + camera_settings.get('move', []))
-                            size = gr.Dropdown(label="Size", choices=["AI Suggest"] + camera_settings.get('size', []))
+                            shot = gr.Dropdown(label="Shot", choices=["AI Suggest"] + services.camera_settings.get('shot', []))
+                            move = gr.Dropdown(label="Move", choices=["AI Suggest"] + services.camera_settings.get('move', []))
+                            size = gr.Dropdown(label="Size", choices=["AI Suggest"] + services.camera_settings.get('size', []))
                         with gr.Row():
-                            framing = gr.Dropdown(label="Framing", choices=["AI Suggest"] + camera_settings.get('framing', []))
-                            depth_of_field = gr.Dropdown(label="Depth of Field", choices=["AI Suggest"] + camera_settings.get('depth_of_field', []))
-                            camera_type = gr.Dropdown(label="Camera Type", choices=["AI Suggest"] + camera_settings.get('camera_type', []))
+                            framing = gr.Dropdown(label="Framing", choices=["AI Suggest"] + services.camera_settings.get('framing', []))
+                            depth_of_field = gr.Dropdown(label="Depth of Field", choices=["AI Suggest"] + services.camera_settings.get('depth_of_field', []))
+                            camera_type = gr.Dropdown(label="Camera Type", choices=["AI Suggest"] + services.camera_settings.get('camera_type', []))
                         with gr.Row():
-                            camera_name = gr.Dropdown(label="Camera Name", choices=["AI Suggest"] + camera_settings.get('camera_name', []))
-                            lens_type = gr.Dropdown(label="Lens Type", choices=["AI Suggest"] + camera_settings.get('lens_type', []))
+                            camera_name = gr.Dropdown(label="Camera Name", choices=["AI Suggest"] + services.camera_settings.get('camera_name', []))
+                            lens_type = gr.Dropdown(label="Lens Type", choices=["AI Suggest"] + services.camera_settings.get('lens_type', []))
 
                     generate_button = gr.Button("🚀 Generate Prompts")
 
@@ -449,8 +421,8 @@ with gr.Blocks() as demo:
                 update_bulk_shot_list_btn = gr.Button("Update Bulk Shot List")
 
             with gr.Accordion("Bulk Director's Notes Generation", open=True):
-                visual_style_dropdown = gr.Dropdown(label="Visual Style", choices=style_manager.get_styles())
-                director_style_dropdown = gr.Dropdown(label="Director Style", choices=[style['name'] for style in director_styles])
+                visual_style_dropdown = gr.Dropdown(label="Visual Style", choices=services.style_manager.get_styles())
+                director_style_dropdown = gr.Dropdown(label="Director Style", choices=[style['name'] for style in services.director_styles])
                 generate_bulk_notes_btn = gr.Button("Generate Bulk Director's Notes")
                 bulk_notes_output = gr.DataFrame(
                     headers=["Scene", "Shot", "Script Reference", "Director's Notes", "Shot Description", "Shot Size", "People"],
@@ -459,6 +431,8 @@ with gr.Blocks() as demo:
                 )
             
             with gr.Accordion("Bulk Prompt Generation", open=True):
+                # Several shots share one request (and its instructions); 1 sends each shot on its own
+                bulk_batch_size_input = gr.Slider(label="Shots per Request", minimum=1, maximum=20, step=1, value=5)
                 generate_bulk_prompts_btn = gr.Button("Generate Bulk Prompts")
                 bulk_prompts_output = gr.DataFrame(
                     headers=["Scene", "Shot", "Concise Prompt", "Medium Prompt", "Detailed Prompt"],
@@ -470,6 +444,18 @@ with gr.Blocks() as demo:
             progress_bar = gr.Progress()
             status_message = gr.Textbox(label="Status", interactive=False)
 
+            with gr.Accordion("🧾 Bulk Jobs", open=False):
+                bulk_jobs_df = gr.DataFrame(
+                    headers=["Job ID", "Kind", "Status", "Progress", "Updated", "Error"],
+                    label="Recent Bulk Jobs",
+                    interactive=False,
+                    value=get_bulk_jobs
+                )
+                with gr.Row():
+                    bulk_job_id_input = gr.Textbox(label="Job ID")
+                    refresh_bulk_jobs_btn = gr.Button("🔄 Refresh Jobs")
+                    resume_bulk_job_btn = gr.Button("▶️ Resume Job")
+
             with gr.Accordion("Director's Clipboard 🎬"):
                 directors_clipboard = gr.TextArea(label="Collected Prompts 📝", lines=10, interactive=True)
                 with gr.Row():
@@ -500,6 +486,12 @@ with gr.Blocks() as demo:
         
                 generated_prompts_state = gr.State([])
 
+            with gr.Accordion("📈 LLM Usage", open=False):
+                usage_summary_text = gr.Textbox(label="Session Totals", interactive=False)
+                usage_summary_df = gr.DataFrame(label="Usage by Project and Call Site", interactive=False)
+                refresh_usage_btn = gr.Button("🔄 Refresh Usage")
+                refresh_usage_btn.click(get_usage_summary, outputs=[usage_summary_df, usage_summary_text])
+
             with gr.Accordion("📊 CSV Operations", open=True):
                 with gr.Row():
                     export_styles_btn = gr.Button("Export Styles to CSV")
@@ -514,7 +506,7 @@ with gr.Blocks() as demo:
                     import_subjects_btn = gr.Button("Import Proposed Subjects from CSV")
                     import_subjects_file = gr.File(label="Import Subjects CSV File", file_types=[".csv"])
                 csv_feedback = gr.Textbox(label="CSV Operation Feedback", interactive=False)
-                styles_dropdown = gr.Dropdown(label="Available Styles", choices=style_manager.get_styles())
+                styles_dropdown = gr.Dropdown(label="Available Styles", choices=services.style_manager.get_styles())
 
                 def update_prompts_display(prompts):
                     return "\n\n".join(prompts)
@@ -553,30 +545,37 @@ with gr.Blocks() as demo:
                 outputs=[feedback_box]
             )
 
+            # Autosave edits to the open project as small journal entries. The script is saved when the
+            # editor loses focus rather than on every keystroke; table edits are saved as they happen.
+            autosave_inputs = [project_name_input, full_script_input, master_shot_list_df, subjects_df]
+            full_script_input.blur(autosave_project, inputs=autosave_inputs, outputs=None)
+            for component in (master_shot_list_df, subjects_df):
+                component.change(autosave_project, inputs=autosave_inputs, outputs=None)
+
             # Initialize the projects list when the app starts
             demo.load(list_projects, outputs=[projects_df])
 
             def add_subject(name, description, alias, type, prefix, suffix):
                 new_subject = Subject(name, description, alias, type, prefix, suffix, active=True)
-                subject_manager.add_subject(new_subject)
-                return subject_manager.get_subjects_dataframe()
+                services.subject_manager.add_subject(new_subject)
+                return services.subject_manager.get_subjects_dataframe()
 
             def update_subject(name, description, alias, type, prefix, suffix):
                 updated_subject = Subject(name, description, alias, type, prefix, suffix)
-                subject_manager.update_subject(updated_subject)
-                return subject_manager.get_subjects_dataframe()
+                services.subject_manager.update_subject(updated_subject)
+                return services.subject_manager.get_subjects_dataframe()
 
             def delete_subject(name):
-                subject_manager.delete_subject(name)
-                return subject_manager.get_subjects_dataframe()
+                services.subject_manager.delete_subject(name)
+                return services.subject_manager.get_subjects_dataframe()
 
             def import_subjects(file):
                 if file is not None:
-                    subject_manager.import_subjects(file.name)
-                return subject_manager.get_subjects_dataframe()
+                    services.subject_manager.import_subjects(file.name)
+                return services.subject_manager.get_subjects_dataframe()
 
             def export_subjects():
-                subject_manager.export_subjects("exported_subjects.csv")
+                services.subject_manager.export_subjects("exported_subjects.csv")
                 return "Subjects exported to exported_subjects.csv"
 
             add_subject_btn.click(
@@ -618,7 +617,7 @@ with gr.Blocks() as demo:
             )
 
             # Load initial subjects
-            subjects_df.value = subject_manager.get_subjects_dataframe()
+            subjects_df.value = services.subject_manager.get_subjects_dataframe()
 
         with gr.TabItem("🎵 Music Lab"):
             # Project Context
@@ -718,11 +717,11 @@ with gr.Blocks() as demo:
                         "lyrics": lyrics
                     }
                     chat_history_str = "\n".join([f"{speaker}: {message}" for speaker, message in chat_history])
-                    treatment = await director_assistant.generate_video_treatment(chat_history_str, project_context)
+                    treatment = await services.director_assistant.generate_video_treatment(chat_history_str, project_context)
                     return treatment
 
                 generate_treatment_button.click(
-                    lambda *args: asyncio.run(generate_treatment(*args)),
+                    generate_treatment,
                     inputs=[concept_input, genre_input, descriptors_input, lyrics_textbox, chat_history],
                     outputs=video_treatment_output
                 )
@@ -760,8 +759,13 @@ with gr.Blocks() as demo:
                         update_subject_music_lab_btn = gr.Button("Update Subject")
                         delete_subject_music_lab_btn = gr.Button("Delete Subject")
 
+                async def generate_music_video_shot_list(concept, genre, descriptors, lyrics, chat_history, approved_treatment, characters):
+                    return await generate_music_video_shot_list_df(
+                        concept, genre, descriptors, lyrics, chat_history, approved_treatment, characters, meta_chain=services.meta_chain
+                    )
+
                 generate_shot_list_button.click(
-                    lambda *args: asyncio.run(generate_shot_list(*args)),
+                    generate_music_video_shot_list,
                     inputs=[concept_input, genre_input, descriptors_input, lyrics_textbox, chat_history, video_treatment_output, subjects_df_music_lab],
                     outputs=proposed_shot_list_music_lab
                 )
@@ -809,7 +813,10 @@ with gr.Blocks() as demo:
                     label="Proposed Shot List",
                     interactive=True
                 )
-                generate_shot_list_btn = gr.Button("🎥 Generate Shot List")
+                with gr.Row():
+                    generate_shot_list_btn = gr.Button("🎥 Generate Shot List")
+                    regenerate_shot_list_btn = gr.Button("♻️ Regenerate Changed Scenes")
+                    generate_by_scene_input = gr.Checkbox(label="🎬 Generate Scenes in Parallel", value=True)
 
                 with gr.Row():
                     new_row_btn = gr.Button("➕ New Row")
@@ -895,10 +902,10 @@ with gr.Blocks() as demo:
         }
 
     def generate_random_style():
-        if style_manager:
+        if services.style_manager:
             new_style = create_random_style()
-            style_manager.add_style(new_style)
-            return f"Generated new style: {new_style['Style Name']}", gr.update(choices=style_manager.get_styles())
+            services.style_manager.add_style(new_style)
+            return f"Generated new style: {new_style['Style Name']}", gr.update(choices=services.style_manager.get_styles())
         return "Error: StyleManager not initialized", gr.update()
 
     def generate_style_details():
@@ -920,19 +927,60 @@ with gr.Blocks() as demo:
     copy_detailed_btn.click(lambda: copy_to_clipboard(detailed_prompt.value))
     send_prompts_btn.click(send_prompts)
 
+    async def run_bulk_job(job_id: str) -> pd.DataFrame:
+        return await services.shot_list_meta_chain.run_bulk_job(services.bulk_job_store, job_id, progress_callback=progress_bar)
+
     async def generate_bulk_notes(full_script: str, master_shot_list: pd.DataFrame, style: str, director_style: str) -> Dict[str, Any]:
+        job_id = await asyncio.to_thread(services.bulk_job_store.create_job, bulk_jobs.DIRECTORS_NOTES, master_shot_list.to_dict('records'), {
+            "script": full_script, "visual_style": style, "director_style": director_style
+        })
         try:
-            notes_df = await shot_list_meta_chain.generate_bulk_directors_notes(
-                full_script, master_shot_list, style, director_style, 
-                progress_callback=progress_bar
-            )
+            notes_df = await run_bulk_job(job_id)
             return {
                 bulk_notes_output: notes_df,
-                status_message: "Bulk director's notes generated successfully."
+                status_message: f"Bulk director's notes generated successfully (job {job_id}).",
+                bulk_jobs_df: await asyncio.to_thread(get_bulk_jobs)
+            }
+        except Exception as e:
+            return {
+                status_message: f"Error generating bulk director's notes: {str(e)}. Resume job {job_id} to finish the remaining shots.",
+                bulk_jobs_df: await asyncio.to_thread(get_bulk_jobs)
+            }
+
+    async def generate_bulk_prompts(notes_df: pd.DataFrame, style: str, batch_size: float) -> Dict[str, Any]:
+        job_id = await asyncio.to_thread(services.bulk_job_store.create_job, bulk_jobs.PROMPTS, notes_df.to_dict('records'), {
+            "visual_style": style, "batch_size": max(int(batch_size or 1), 1)
+        })
+        try:
+            prompts_df = await run_bulk_job(job_id)
+            return {
+                bulk_prompts_output: prompts_df,
+                status_message: f"Bulk prompts generated successfully (job {job_id}).",
+                bulk_jobs_df: await asyncio.to_thread(get_bulk_jobs)
             }
         except Exception as e:
             return {
-                status_message: f"Error generating bulk director's notes: {str(e)}"
+                status_message: f"Error generating bulk prompts: {str(e)}. Resume job {job_id} to finish the remaining shots.",
+                bulk_jobs_df: await asyncio.to_thread(get_bulk_jobs)
+            }
+
+    async def resume_bulk_job(job_id: str) -> Dict[str, Any]:
+        job_id = (job_id or "").strip()
+        job = await asyncio.to_thread(services.bulk_job_store.get_job, job_id)
+        if job is None:
+            return {status_message: f"Error: no bulk job with ID '{job_id}'."}
+        try:
+            result_df = await run_bulk_job(job_id)
+            output = bulk_notes_output if job["kind"] == bulk_jobs.DIRECTORS_NOTES else bulk_prompts_output
+            return {
+                output: result_df,
+                status_message: f"Job {job_id} completed.",
+                bulk_jobs_df: await asyncio.to_thread(get_bulk_jobs)
+            }
+        except Exception as e:
+            return {
+                status_message: f"Error resuming job {job_id}: {str(e)}",
+                bulk_jobs_df: await asyncio.to_thread(get_bulk_jobs)
             }
 
     def export_to_csv(df: pd.DataFrame) -> str:
@@ -949,9 +997,23 @@ with gr.Blocks() as demo:
             visual_style_dropdown,
             director_style_dropdown
         ],
-        outputs=[bulk_notes_output, status_message]
+        outputs=[bulk_notes_output, status_message, bulk_jobs_df]
+    )
+
+    generate_bulk_prompts_btn.click(
+        generate_bulk_prompts,
+        inputs=[bulk_notes_output, visual_style_dropdown, bulk_batch_size_input],
+        outputs=[bulk_prompts_output, status_message, bulk_jobs_df]
+    )
+
+    resume_bulk_job_btn.click(
+        resume_bulk_job,
+        inputs=[bulk_job_id_input],
+        outputs=[bulk_notes_output, bulk_prompts_output, status_message, bulk_jobs_df]
     )
 
+    refresh_bulk_jobs_btn.click(get_bulk_jobs, outputs=[bulk_jobs_df])
+
     export_btn.click(
         export_to_csv,
         inputs=[bulk_notes_output],
@@ -959,15 +1021,29 @@ with gr.Blocks() as demo:
     )
 
     # Script Management event handlers
-    async def generate_shot_list(full_script):
+    async def generate_shot_list(full_script, by_scene=False):
         try:
-            response = await script_manager.generate_proposed_shot_list(full_script)
-            if isinstance(response, pd.DataFrame):
-                return response, "Shot list generated successfully."
-            else:
-                return None, f"Error generating shot list: Unexpected response type"
+            if by_scene:
+                response = await services.script_manager.generate_proposed_shot_list(full_script, by_scene=True)
+                yield response, "Shot list generated successfully."
+                return
+            # Shots appear as the model writes them rather than after the whole list is done
+            df, parser = None, None
+            async for df, parser in services.script_manager.stream_proposed_shot_list(full_script):
+                yield df, f"Generating shot list... {len(df)} shots so far."
+            message = f"Shot list generated successfully ({len(df)} shots)."
+            if parser.repaired or parser.quarantined:
+                message += f" Repaired {parser.repaired} malformed rows, skipped {len(parser.quarantined)} unreadable lines."
+            yield df, message
         except Exception as e:
-            return None, f"Error generating shot list: {str(e)}"
+            yield None, f"Error generating shot list: {str(e)}"
+
+    async def regenerate_shot_list(full_script, current_shot_list):
+        try:
+            response = await services.script_manager.regenerate_proposed_shot_list(full_script, current_shot_list)
+            return response, "Shot list updated for the changed scenes."
+        except Exception as e:
+            return None, f"Error regenerating shot list: {str(e)}"
 
     def save_shot_list(shot_list, project_name):
         if not project_name:
@@ -1012,7 +1088,7 @@ with gr.Blocks() as demo:
 
     async def extract_proposed_subjects(full_script, shot_list):
         try:
-            subjects_dict = await script_manager.extract_proposed_subjects(full_script, shot_list)
+            subjects_dict = await services.script_manager.extract_proposed_subjects(full_script, shot_list)
             subjects_df = subjects_dict['subjects']
             feedback = "Subjects extracted successfully."
             return subjects_df, feedback
@@ -1023,12 +1099,12 @@ with gr.Blocks() as demo:
 
     def add_proposed_subject(name, description, subject_type, current_df):
         new_subject = pd.DataFrame([[name, description, subject_type]], columns=["Name", "Description", "Type"])
-        updated_df = script_manager.merge_subjects(current_df, new_subject)
+        updated_df = services.script_manager.merge_subjects(current_df, new_subject)
         return updated_df
 
     def update_proposed_subject(df, name, description, subject_type):
         updated_subject = pd.DataFrame([[name, description, subject_type]], columns=["Name", "Description", "Type"])
-        return script_manager.merge_subjects(df, updated_subject)
+        return services.script_manager.merge_subjects(df, updated_subject)
 
     def delete_proposed_subject(df, name):
         return df[df['Name'] != name].reset_index(drop=True)
@@ -1039,8 +1115,14 @@ with gr.Blocks() as demo:
         return "All subjects sent to Subject Management successfully."
 
     generate_shot_list_btn.click(
-        lambda x: asyncio.run(generate_shot_list(x)),
-        inputs=[full_script_input],
+        generate_shot_list,
+        inputs=[full_script_input, generate_by_scene_input],
+        outputs=[shot_list_df, feedback_box]
+    )
+
+    regenerate_shot_list_btn.click(
+        regenerate_shot_list,
+        inputs=[full_script_input, shot_list_df],
         outputs=[shot_list_df, feedback_box]
     )
 
@@ -1136,7 +1218,7 @@ with gr.Blocks() as demo:
     )
 
     export_proposed_subjects_btn.click(
-        lambda df: script_manager.export_proposed_subjects(df, "proposed_subjects.csv"),
+        lambda df: services.script_manager.export_proposed_subjects(df, "proposed_subjects.csv"),
         inputs=[subjects_df],
         outputs=[feedback_box]
     )
@@ -1211,12 +1293,37 @@ with gr.Blocks() as demo:
         outputs=[directors_clipboard]
     )
 
+    def select_shot(shot_list, full_script, evt: gr.SelectData):
+        # Fills the shot details from the clicked row and highlights the script passage it came from
+        if shot_list is None or shot_list.empty or evt is None or evt.index is None:
+            return "", ""
+        position = evt.index[0]
+        row = shot_list.iloc[position]
+        reference = str(row.get("Script Reference", ""))
+        index = services.script_manager.alignment
+        index.update_script(full_script)
+        # The index already resolved the aligned shot list in order, so repeated lines map to the right
+        # occurrence; search the script only for rows that aren't in the aligned list
+        aligned = position < len(index.references) and index.references[position] == reference
+        alignment = (aligned and index.shot_span(position)) or index.locate(reference)
+        highlighted_text = full_script[alignment.start:alignment.end] if alignment else ""
+        return row.get("Shot Description", ""), highlighted_text
+
     master_shot_list_df.select(
-        select_shot_and_populate,
-        None,
-        shot_description_input
+        select_shot,
+        inputs=[master_shot_list_df, full_script_input],
+        outputs=[shot_description_input, highlighted_text_input]
     )
 
+    # Keep the shot-to-script alignment current as the script and proposed shot list are edited
+    for component in (full_script_input, shot_list_df):
+        component.change(
+            # Looked up per event so the script manager (and its LLM client) is only built once it's needed
+            lambda full_script, shot_list: services.script_manager.align_shot_list(full_script, shot_list),
+            inputs=[full_script_input, shot_list_df],
+            outputs=None
+        )
+
     select_shot_btn.click(
         select_shot_and_populate,
         inputs=[master_shot_list_df],
@@ -1241,11 +1348,18 @@ with gr.Blocks() as demo:
         shot_description, directors_notes, style, style_prefix, style_suffix,
         director_style, shot, move, size, framing, depth_of_field, camera_type,
         camera_name, lens_type, end_parameters, stick_to_script, highlighted_text,
-        full_script, people, places, props
+        full_script, people, places, props, master_shot_list
     ):
         active_subjects = people + places + props
-        return await script_prompt_generator.generate_prompts(
-            script_excerpt=full_script,
+        # Without highlighted text, the script context is anchored on the matching shot's script reference
+        script_excerpt = full_script
+        if isinstance(master_shot_list, pd.DataFrame) and {"Shot Description", "Script Reference"} <= set(master_shot_list.columns):
+            matches = master_shot_list.loc[master_shot_list["Shot Description"] == shot_description, "Script Reference"]
+            if not matches.empty and str(matches.iloc[0]).strip():
+                script_excerpt = str(matches.iloc[0])
+        # Stream so the prompt textboxes fill in as tokens arrive
+        async for result in services.script_prompt_generator.stream_prompts(
+            script_excerpt=script_excerpt,
             shot_description=shot_description,
             directors_notes=directors_notes,
             style=style,
@@ -1265,7 +1379,8 @@ with gr.Blocks() as demo:
             highlighted_text=highlighted_text,
             full_script=full_script,
             active_subjects=active_subjects
-        )
+        ):
+            yield result
 
     generate_button.click(
         fn=generate_prompts_wrapper,
@@ -1290,7 +1405,8 @@ with gr.Blocks() as demo:
             full_script_input,
             people,
             places,
-            props
+            props,
+            master_shot_list_df
         ],
         outputs=[
             concise_prompt,
@@ -1303,11 +1419,11 @@ with gr.Blocks() as demo:
     )
 
     def update_subject_checkboxes():
-        if subject_manager:
+        if services.subject_manager:
             return {
-                people: gr.update(choices=subject_manager.get_people()),
-                places: gr.update(choices=subject_manager.get_places()),
-                props: gr.update(choices=subject_manager.get_props())
+                people: gr.update(choices=services.subject_manager.get_people()),
+                places: gr.update(choices=services.subject_manager.get_places()),
+                props: gr.update(choices=services.subject_manager.get_props())
             }
         return {
             people: gr.update(choices=[]),
@@ -1323,14 +1439,14 @@ with gr.Blocks() as demo:
     def receive_proposed_subjects(_):
         try:
             # Get the current proposed subjects from the script_manager
-            proposed_subjects_df = script_manager.get_proposed_subjects()
+            proposed_subjects_df = services.script_manager.get_proposed_subjects()
             if proposed_subjects_df.empty:
                 return None, "No proposed subjects available."
         
             # Merge the proposed subjects with the existing subjects in the Subject Management tab
-            existing_df = subject_manager.get_subjects_dataframe()
-            updated_df = subject_manager.merge_subjects(existing_df, proposed_subjects_df)
-            subject_manager.set_subjects(updated_df)
+            existing_df = services.subject_manager.get_subjects_dataframe()
+            updated_df = services.subject_manager.merge_subjects(existing_df, proposed_subjects_df)
+            services.subject_manager.set_subjects(updated_df)
             return updated_df, "Subjects received and merged successfully."
         except Exception as e:
             error_message = f"Error receiving proposed subjects: {str(e)}"
@@ -1389,277 +1505,9 @@ if __name__ == "__main__":
         # Update styles dropdown when the app starts
         demo.load(update_styles_dropdown, outputs=[style_input])
     
-    demo.launch()
-
-# Add these imports at the top of the file
-import json
-import os
-from datetime import datetime
-
-# Add or update these functions at the end of the file
-
-import asyncio
-import os
-import json
-from datetime import datetime
-
-def save_project(project_name, full_script, shot_list_df, subjects_df, generated_prompts):
-    if not project_name:
-        return "Please enter a project name.", None
-
-    # Create a directory for the project
-    project_dir = f"{project_name}_project"
-    os.makedirs(project_dir, exist_ok=True)
-
-    # Save full script
-    script_path = os.path.join(project_dir, "script.txt")
-    with open(script_path, "w", encoding="utf-8") as f:
-        f.write(full_script)
-
-    # Save DataFrames as CSVs
-    shot_list_path = os.path.join(project_dir, "shot_list.csv")
-    subjects_path = os.path.join(project_dir, "subjects.csv")
-    shot_list_df.to_csv(shot_list_path, index=False)
-    subjects_df.to_csv(subjects_path, index=False)
-
-    # Create project info JSON
-    project_info = {
-        "name": project_name,
-        "script_file": "script.txt",
-        "shot_list_file": "shot_list.csv",
-        "subjects_file": "subjects.csv",
-        "prompts": generated_prompts,
-        "last_modified": datetime.now().isoformat()
-    }
+    # Only the services the UI needed to render have been built; the rest are built on first use
+    logger.info(f"Service startup times:\n{services.startup_report()}")
 
-    info_path = os.path.join(project_dir, "project_info.json")
-    with open(info_path, "w", encoding="utf-8") as f:
-        json.dump(project_info, f, indent=2)
-
-    return f"Project '{project_name}' saved successfully.", list_projects()
-
-def load_project(project_name):
-    project_dir = f"{project_name}_project"
-    
-    try:
-        # Load project info
-        info_path = os.path.join(project_dir, "project_info.json")
-        with open(info_path, "r", encoding="utf-8") as f:
-            project_info = json.load(f)
-
-        # Load script
-        script_path = os.path.join(project_dir, project_info["script_file"])
-        with open(script_path, "r", encoding="utf-8") as f:
-            full_script = f.read()
-
-        # Load DataFrames
-        shot_list_path = os.path.join(project_dir, project_info["shot_list_file"])
-        subjects_path = os.path.join(project_dir, project_info["subjects_file"])
-        shot_list_df = pd.read_csv(shot_list_path)
-        subjects_df = pd.read_csv(subjects_path)
-
-        prompts = project_info.get("prompts", [])
-
-        # Update the subject_manager with the loaded subjects
-        subject_manager.set_subjects(subjects_df)
-
-        return full_script, shot_list_df, subjects_df, prompts, f"Project '{project_name}' loaded successfully."
-    except Exception as e:
-        return None, None, None, None, f"Error loading project: {str(e)}"
-
-def delete_project(project_name):
-    project_dir = f"{project_name}_project"
-    try:
-        shutil.rmtree(project_dir)
-        return f"Project '{project_name}' deleted successfully.", list_projects()
-    except FileNotFoundError:
-        return f"Project '{project_name}' not found.", list_projects()
-    except Exception as e:
-        return f"Error deleting project: {str(e)}", list_projects()
-
-def list_projects():
-    projects = []
-    for item in os.listdir():
-        if item.endswith("_project") and os.path.isdir(item):
-            try:
-                info_path = os.path.join(item, "project_info.json")
-                with open(info_path, "r", encoding="utf-8") as f:
-                    project_info = json.load(f)
-                projects.append({
-                    "Project Name": project_info["name"],
-                    "Last Modified": project_info["last_modified"]
-                })
-            except Exception as e:
-                print(f"Error reading project {item}: {str(e)}")
-    return pd.DataFrame(projects)
-
-def export_prompts(prompts, project_name):
-    if not project_name:
-        return "Please enter a project name."
-    try:
-        with open(f"{project_name}_prompts.txt", "w", encoding="utf-8") as f:
-            f.write("\n\n".join(prompts))
-        return f"Prompts exported to '{project_name}_prompts.txt'"
-    except IOError as e:
-        return f"Error exporting prompts: {str(e)}"
-
-# Global variable to store generated prompts
-generated_prompts = []
-
-from typing import List
-from .utils.subject import Subject
-
-# Modify the generate_prompts_wrapper function to append prompts
-def apply_alias(text: str, subjects: List[Subject]) -> str:
-    logger.debug(f"Applying aliases to text: {text[:50]}...")  # Log first 50 chars of text
-    for subject in subjects:
-        if subject.alias and subject.name in text:
-            logger.debug(f"Replacing '{subject.name}' with alias '{subject.alias}'")
-            text = text.replace(subject.name, subject.alias)
-            logger.debug(f"Text after replacement: {text[:50]}...")
-        else:
-            logger.debug(f"No replacement for subject '{subject.name}'")
-    return text
-
-async def generate_prompts_wrapper(
-    shot_description, directors_notes, style, style_prefix, style_suffix,
-    director_style, shot, move, size, framing, depth_of_field, camera_type,
-    camera_name, lens_type, end_parameters, stick_to_script, highlighted_text,
-    full_script, people, places, props
-):
-    active_subjects = people + places + props
-    result = await script_prompt_generator.generate_prompts(
-        script_excerpt=full_script,
-        shot_description=shot_description,
-        directors_notes=directors_notes,
-        style=style,
-        style_prefix=style_prefix,
-        style_suffix=style_suffix,
-        director_style=director_style,
-        shot=shot,
-        move=move,
-        size=size,
-        framing=framing,
-        depth_of_field=depth_of_field,
-        camera_type=camera_type,
-        camera_name=camera_name,
-        lens_type=lens_type,
-        end_parameters=end_parameters,
-        stick_to_script=stick_to_script,
-        highlighted_text=highlighted_text,
-        full_script=full_script,
-        active_subjects=active_subjects
-    )
-    
-    name_alias_pairs = subject_manager.get_name_alias_pairs()
-    
-    def apply_aliases(text):
-        for name, alias in name_alias_pairs:
-            text = text.replace(name, alias)
-        return text
-    
-    concise = apply_aliases(result.get("concise", ""))
-    normal = apply_aliases(result.get("normal", ""))
-    detailed = apply_aliases(result.get("detailed", ""))
-    structured = apply_aliases(result.get("structured", ""))
-
-    return concise, normal, detailed, structured, "Prompts generated and aliases applied.", ", ".join(active_subjects)
-
-
-def wrapped_function(original_function):
-    def wrapper(*args, **kwargs):
-        try:
-            return original_function(*args, **kwargs)
-        except Exception as e:
-            error_message = f"An error occurred: {str(e)}"
-            print(error_message)  # This will print to the console/terminal
-            return None, error_message
-    return wrapper
-
-# Apply this wrapper to all your UI interaction functions
-save_project = wrapped_function(save_project)
-save_shot_list = wrapped_function(save_shot_list)
-export_to_csv = wrapped_function(export_to_csv)
-generate_shot_list = wrapped_function(generate_shot_list)
-def safe_populate_subject_fields(evt, df):
-    try:
-        if df is None or df.empty or evt is None or evt.index is None:
-            return "", "", ""
-        row = df.iloc[evt.index[0]]
-        return (
-            row.get('Name', ''),
-            row.get('Description', ''),
-            row.get('Type', '')
-        )
-    except Exception as e:
-        print(f"Error in populate_subject_fields: {str(e)}")
-        return "", "", ""
-def delete_selected_row(df):
-    if df is not None and not df.empty:
-        selected_indices = df.index[df.index.isin(df.index)]
-        if len(selected_indices) > 0:
-            return df.drop(index=selected_indices).reset_index(drop=True)
-    return df
-
-async def extract_proposed_subjects(full_script, shot_list):
-    try:
-        subjects_dict = await script_manager.extract_proposed_subjects(full_script, shot_list)
-        subjects_df = subjects_dict['subjects']
-        feedback = "Subjects extracted successfully."
-        return subjects_df, feedback
-    except Exception as e:
-        error_message = f"Error extracting subjects: {str(e)}"
-        print(error_message)
-        return pd.DataFrame(columns=["Name", "Description", "Type"]), error_message
-
-def add_proposed_subject(name, description, subject_type, current_df):
-    new_subject = pd.DataFrame([[name, description, subject_type]], columns=["Name", "Description", "Type"])
-    updated_df = pd.concat([current_df, new_subject], ignore_index=True)
-    return updated_df
-
-# Add these event handlers after the existing ones in your script
-extract_subjects_btn.click(
-    lambda x, y: asyncio.run(extract_proposed_subjects(x, y)),
-    inputs=[full_script_input, shot_list_df],
-    outputs=[subjects_df, feedback_box]
-)
-
-new_subject_btn.click(
-    add_proposed_subject,
-    inputs=[subject_name_input, subject_description_input, subject_type_input, subjects_df],
-    outputs=[subjects_df]
-)
-
-delete_subject_btn.click(
-    delete_selected_row,
-    inputs=[subjects_df],
-    outputs=[subjects_df]
-)
-
-select_shot_btn.click(
-    select_shot_and_populate,
-    inputs=[master_shot_list_df],
-    outputs=[shot_description_input]
-)
-
-subjects_df.select(
-    lambda evt, df: safe_populate_subject_fields(evt, df),
-    inputs=[subjects_df],
-    outputs=[subject_name_input, subject_description_input, subject_type_input]
-)
-import shutil
-from typing import List, Dict
-
-def replace_names_with_aliases(text, name_alias_pairs):
-    for name, alias in name_alias_pairs:
-        text = text.replace(name, alias)
-    return text
-
-def post_process_prompt(prompt: str, subjects: List[Subject]) -> str:
-    print(f"Original prompt: {prompt[:100]}...")  # Print first 100 chars
-    for subject in subjects:
-        if subject.alias and subject.alias != subject.name:
-            print(f"Replacing '{subject.name}' with '{subject.alias}'")
-            prompt = prompt.replace(subject.name, subject.alias)
-    print(f"Processed prompt: {prompt[:100]}...")  # Print first 100 chars
-    return prompt
+    # Serve Prometheus/JSON metrics next to the UI
+    app = gr.mount_gradio_app(create_metrics_app(), demo, path="/")
+    uvicorn.run(app, host="127.0.0.1", port=7860)
@@ -1,19 +1,21 @@
-from openai import OpenAI
-import os
-
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+from page2prompt.utils.llm_client import llm_clients
+from page2prompt.utils.llm_scheduler import INTERACTIVE, scheduler
 
 def transcribe_audio(audio_file, include_timestamps=False):
     if audio_file is None:
         return "Please upload an MP3 file."
 
     try:
-        with open(audio_file.name, "rb") as file:
-            response = client.audio.transcriptions.create(
-                model="whisper-1",
-                file=file,
-                response_format='srt' if include_timestamps else 'text'
-            )
+        def transcribe():
+            # Reopened on every attempt so a retried upload starts from the beginning of the file
+            with open(audio_file.name, "rb") as file:
+                return llm_clients.openai_client().audio.transcriptions.create(
+                    model="whisper-1",
+                    file=file,
+                    response_format='srt' if include_timestamps else 'text'
+                )
+
+        response = scheduler.run_sync(transcribe, priority=INTERACTIVE)
 
         if include_timestamps:
             formatted_transcript = ""
@@ -0,0 +1,171 @@
+import csv
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+from page2prompt.components.director_assistant import DirectorAssistant
+from page2prompt.components.meta_chain import MetaChain
+from page2prompt.components.script_prompt_generation import ScriptPromptGenerator
+from page2prompt.components.shot_list_meta_chain import ShotListMetaChain
+from page2prompt.utils.bulk_jobs import BulkJobStore
+from page2prompt.utils.context_selector import ContextSelector
+from page2prompt.utils.llm_cache import LLMCache
+from page2prompt.utils.llm_client import llm_clients
+from page2prompt.utils.project_journal import ProjectJournal
+from page2prompt.utils.project_store import ProjectStore
+from page2prompt.utils.script_manager import ScriptManager
+from page2prompt.utils.style_manager import StyleManager
+from page2prompt.utils.subject_manager import SubjectManager
+
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.dirname(__file__)
+
+def load_camera_settings(path: str) -> Dict[str, List[str]]:
+    """Camera setting display names grouped by type (shot, move, size, ...)."""
+    settings: Dict[str, List[str]] = {}
+    try:
+        with open(path, 'r') as file:
+            for row in csv.DictReader(file):
+                settings.setdefault(row['type'], []).append(row['display'])
+    except (OSError, csv.Error, KeyError) as e:
+        logger.error(f"Error loading camera settings from {path}: {str(e)}")
+    return settings
+
+def load_director_styles(path: str) -> List[Dict[str, str]]:
+    try:
+        with open(path, 'r') as file:
+            return list(csv.DictReader(file))
+    except (OSError, csv.Error) as e:
+        logger.error(f"Error loading director styles from {path}: {str(e)}")
+        return []
+
+class service:
+    """Marks a ServiceContainer method as a service: built on first access, then reused."""
+
+    def __init__(self, factory: Callable[["ServiceContainer"], Any]):
+        self.factory = factory
+        self.name = factory.__name__
+        self.__doc__ = factory.__doc__
+
+    def __get__(self, container: Optional["ServiceContainer"], owner=None) -> Any:
+        if container is None:
+            return self
+        return container._get(self.name, self.factory)
+
+class ServiceContainer:
+    """Builds the app's services lazily, each exactly once, and times how long each one took.
+
+    The CSV reference data (camera settings, director styles) is parsed once and shared by every
+    service that needs it. timings holds each service's own build time, excluding the services it
+    pulled in; startup_report() formats them.
+    """
+
+    def __init__(self, data_dir: str = DATA_DIR):
+        self.data_dir = data_dir
+        self.timings: Dict[str, float] = {}
+        self._services: Dict[str, Any] = {}
+        # Reentrant because building one service may build the ones it depends on
+        self._lock = threading.RLock()
+        self._nested: List[float] = []
+
+    def path(self, *parts: str) -> str:
+        return os.path.join(self.data_dir, *parts)
+
+    def _get(self, name: str, factory: Callable[["ServiceContainer"], Any]) -> Any:
+        if name in self._services:
+            return self._services[name]
+        with self._lock:
+            if name not in self._services:
+                start = time.perf_counter()
+                self._nested.append(0.0)
+                try:
+                    value = factory(self)
+                finally:
+                    dependencies = self._nested.pop()
+                elapsed = time.perf_counter() - start
+                self.timings[name] = elapsed - dependencies
+                if self._nested:
+                    self._nested[-1] += elapsed
+                self._services[name] = value
+                logger.debug(f"Built service {name} in {self.timings[name] * 1000:.1f} ms")
+            return self._services[name]
+
+    def is_built(self, name: str) -> bool:
+        return name in self._services
+
+    def startup_report(self) -> str:
+        """One line per service built so far, slowest first, with the total."""
+        lines = [f"{name:<24} {seconds * 1000:8.1f} ms"
+                 for name, seconds in sorted(self.timings.items(), key=lambda item: item[1], reverse=True)]
+        lines.append(f"{'total':<24} {sum(self.timings.values()) * 1000:8.1f} ms")
+        return "\n".join(lines)
+
+    @service
+    def camera_settings(self) -> Dict[str, List[str]]:
+        return load_camera_settings(self.path("camera_settings.csv"))
+
+    @service
+    def director_styles(self) -> List[Dict[str, str]]:
+        return load_director_styles(self.path("director_styles.csv"))
+
+    @service
+    def style_manager(self) -> Optional[StyleManager]:
+        try:
+            return StyleManager(self.path("styles.csv"))
+        except Exception as e:
+            logger.error(f"Error initializing StyleManager: {str(e)}")
+            return None
+
+    @service
+    def subject_manager(self) -> Optional[SubjectManager]:
+        try:
+            return SubjectManager(self.path("subjects.csv"))
+        except Exception as e:
+            logger.error(f"Error loading subjects: {str(e)}")
+            return None
+
+    @service
+    def director_assistant(self) -> DirectorAssistant:
+        return DirectorAssistant(self.path("director_styles.csv"), styles=self.director_styles)
+
+    @service
+    def llm_cache(self) -> LLMCache:
+        return LLMCache(self.path("llm_cache.db"))
+
+    @service
+    def meta_chain(self) -> MetaChain:
+        return MetaChain(cache=self.llm_cache)
+
+    @service
+    def shot_list_meta_chain(self) -> Optional[ShotListMetaChain]:
+        if not (self.style_manager and self.subject_manager and self.director_assistant):
+            logger.error("Unable to initialize ShotListMetaChain due to missing components.")
+            return None
+        return ShotListMetaChain(llm_clients.api_key, self.subject_manager, self.style_manager, self.director_assistant)
+
+    @service
+    def script_manager(self) -> ScriptManager:
+        return ScriptManager(self.meta_chain)
+
+    @service
+    def script_prompt_generator(self) -> ScriptPromptGenerator:
+        # Prompt context is picked from the same script index the shot list is aligned with
+        return ScriptPromptGenerator(self.style_manager, self.subject_manager, self.meta_chain,
+                                     ContextSelector(index=self.script_manager.alignment))
+
+    @service
+    def project_store(self) -> ProjectStore:
+        return ProjectStore(self.path("projects", "projects.db"))
+
+    @service
+    def project_journal(self) -> ProjectJournal:
+        return ProjectJournal(self.project_store, self.path("projects", "journal"))
+
+    @service
+    def bulk_job_store(self) -> BulkJobStore:
+        return BulkJobStore(self.path("projects", "bulk_jobs.db"))
+
+# The services of the running app
+services = ServiceContainer()
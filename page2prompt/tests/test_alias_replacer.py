@@ -0,0 +1,27 @@
+import unittest
+from page2prompt.utils.alias_replacer import AliasReplacer
+
+class TestAliasReplacer(unittest.TestCase):
+    def test_overlapping_names_do_not_corrupt_each_other(self):
+        replacer = AliasReplacer([("Sam", "S4M"), ("Samantha", "SMNTH")])
+
+        self.assertEqual(replacer.replace("Samantha waves at Sam."), "SMNTH waves at S4M.")
+
+    def test_only_whole_names_are_replaced(self):
+        replacer = AliasReplacer([("Sam", "S4M"), ("Dr. Lee", "DRL")])
+
+        self.assertEqual(replacer.replace("Samuel and Sams meet Dr. Lee"), "Samuel and Sams meet DRL")
+
+    def test_aliases_are_not_rescanned(self):
+        replacer = AliasReplacer([("Bob", "Alice"), ("Alice", "Carol")])
+
+        self.assertEqual(replacer.replace("Bob and Alice"), "Alice and Carol")
+
+    def test_subjects_without_alias_are_skipped(self):
+        replacer = AliasReplacer([("Sarah", ""), ("Mike", "Mike")])
+
+        self.assertIsNone(replacer.pattern)
+        self.assertEqual(replacer.replace("Sarah and Mike"), "Sarah and Mike")
+
+if __name__ == '__main__':
+    unittest.main()
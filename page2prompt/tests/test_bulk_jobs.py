@@ -0,0 +1,64 @@
+import os
+import tempfile
+import unittest
+from page2prompt.utils import bulk_jobs
+from page2prompt.utils.bulk_jobs import BulkJobStore
+
+class TestBulkJobStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "jobs", "bulk_jobs.db")
+        self.store = BulkJobStore(self.db_path)
+        self.rows = [{"Scene": "1", "Shot": str(shot), "Shot Description": f"Shot {shot}"} for shot in range(1, 4)]
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_checkpoints_are_merged_into_rows(self):
+        job_id = self.store.create_job(bulk_jobs.DIRECTORS_NOTES, self.rows, {"visual_style": "Noir"})
+        self.store.checkpoint(job_id, 1, {"Director's Notes": "Slow push in"})
+
+        rows = self.store.load_rows(job_id)
+        self.assertEqual(rows[1]["Director's Notes"], "Slow push in")
+        self.assertNotIn("Director's Notes", rows[0])
+        self.assertEqual(self.store.completed_positions(job_id), [1])
+
+        job = self.store.get_job(job_id)
+        self.assertEqual((job["kind"], job["status"], job["total"], job["completed"]), (bulk_jobs.DIRECTORS_NOTES, bulk_jobs.PENDING, 3, 1))
+        self.assertEqual(job["params"], {"visual_style": "Noir"})
+
+    def test_repeated_checkpoint_counts_once(self):
+        job_id = self.store.create_job(bulk_jobs.PROMPTS, self.rows, {})
+        self.store.checkpoint(job_id, 0, {"Concise Prompt": "a"})
+        self.store.checkpoint(job_id, 0, {"Concise Prompt": "b"})
+
+        self.assertEqual(self.store.get_job(job_id)["completed"], 1)
+        self.assertEqual(self.store.load_rows(job_id)[0]["Concise Prompt"], "a")
+
+    def test_running_jobs_are_interrupted_after_restart(self):
+        job_id = self.store.create_job(bulk_jobs.PROMPTS, self.rows, {})
+        self.store.set_status(job_id, bulk_jobs.RUNNING)
+        self.store.checkpoint(job_id, 0, {"Concise Prompt": "a"})
+        self.store.close()
+
+        self.store = BulkJobStore(self.db_path)
+        job = self.store.get_job(job_id)
+        self.assertEqual(job["status"], bulk_jobs.INTERRUPTED)
+        self.assertEqual(self.store.completed_positions(job_id), [0])
+
+    def test_list_and_delete_jobs(self):
+        first = self.store.create_job(bulk_jobs.PROMPTS, self.rows, {})
+        second = self.store.create_job(bulk_jobs.DIRECTORS_NOTES, self.rows, {})
+        self.store.set_status(first, bulk_jobs.FAILED, "rate limited")
+
+        jobs = self.store.list_jobs()
+        self.assertEqual([job["id"] for job in jobs], [first, second])
+        self.assertEqual(jobs[0]["error"], "rate limited")
+
+        self.assertTrue(self.store.delete_job(first))
+        self.assertIsNone(self.store.get_job(first))
+        self.assertEqual(self.store.load_rows(first), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,37 @@
+import unittest
+from unittest.mock import MagicMock
+from langchain.prompts import PromptTemplate
+from page2prompt.components.chain_registry import ChainRegistry
+
+class TestChainRegistry(unittest.TestCase):
+    def setUp(self):
+        self.registry = ChainRegistry()
+        self.template_factory = MagicMock(side_effect=lambda: PromptTemplate(template="{x}", input_variables=["x"]))
+        self.chain_factory = MagicMock(side_effect=lambda prompt, llm: (prompt, llm))
+
+    def _llm(self, model_name="gpt-4o-mini", temperature=0.7):
+        llm = MagicMock()
+        llm.model_name = model_name
+        llm.temperature = temperature
+        return llm
+
+    def test_chain_is_built_once_per_llm(self):
+        llm = self._llm()
+        first = self.registry.get_chain("test", llm, self.template_factory, self.chain_factory)
+        second = self.registry.get_chain("test", llm, self.template_factory, self.chain_factory)
+
+        self.assertIs(first, second)
+        self.template_factory.assert_called_once()
+        self.chain_factory.assert_called_once()
+        self.assertEqual((self.registry.builds, self.registry.hits), (1, 1))
+
+    def test_template_is_shared_across_models(self):
+        first = self.registry.get_chain("test", self._llm(), self.template_factory, self.chain_factory)
+        second = self.registry.get_chain("test", self._llm(temperature=0.2), self.template_factory, self.chain_factory)
+
+        self.assertIsNot(first, second)
+        self.assertIs(first[0], second[0])
+        self.template_factory.assert_called_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,54 @@
+import unittest
+from page2prompt.utils.context_selector import ContextSelector
+from page2prompt.utils.llm_scheduler import estimate_tokens
+
+def build_script(scenes: int, lines: int = 20) -> str:
+    return "\n".join(
+        f"INT. ROOM {number} - DAY\n" + "\n".join(f"Line {line} of scene {number}." for line in range(lines))
+        for number in range(1, scenes + 1)
+    )
+
+class TestContextSelector(unittest.TestCase):
+    def test_short_script_is_sent_whole(self):
+        script = build_script(2, lines=2)
+        self.assertEqual(ContextSelector(max_tokens=1000).select(script, "anything"), script)
+
+    def test_selects_anchor_scene_and_neighbours(self):
+        script = build_script(20)
+        context = ContextSelector(max_tokens=800, neighbour_scenes=1).select(script, "Line 3 of scene 10.")
+        self.assertIn("INT. ROOM 9 - DAY", context)
+        self.assertIn("INT. ROOM 10 - DAY", context)
+        self.assertIn("INT. ROOM 11 - DAY", context)
+        self.assertNotIn("INT. ROOM 12 - DAY", context)
+        self.assertLessEqual(estimate_tokens(context), 800)
+        self.assertLess(estimate_tokens(context), estimate_tokens(script) / 5)
+
+    def test_budget_limits_neighbours(self):
+        script = build_script(20)
+        scene_tokens = estimate_tokens(script) // 20
+        context = ContextSelector(max_tokens=scene_tokens + 10, neighbour_scenes=3).select(script, "Line 3 of scene 10.")
+        self.assertTrue(context.startswith("INT. ROOM 10 - DAY"))
+        self.assertNotIn("scene 9.", context)
+        self.assertNotIn("scene 11.", context)
+
+    def test_oversized_scene_is_windowed_around_anchor(self):
+        script = build_script(2, lines=400)
+        context = ContextSelector(max_tokens=100).select(script, "Line 200 of scene 1.")
+        self.assertIn("Line 200 of scene 1.", context)
+        self.assertEqual(len(context), 400)
+
+    def test_fallback_anchor_is_used_without_highlight(self):
+        script = build_script(20)
+        context = ContextSelector(max_tokens=800, neighbour_scenes=1).select(script, "", "Line 3 of scene 10.")
+        self.assertIn("INT. ROOM 10 - DAY", context)
+        self.assertNotIn("INT. ROOM 1 - DAY", context)
+
+    def test_no_anchor_sends_budget_capped_opening(self):
+        script = build_script(20)
+        for anchor in (None, "", "A spaceship lands on Mars"):
+            context = ContextSelector(max_tokens=100).select(script, anchor)
+            self.assertTrue(context.startswith("INT. ROOM 1 - DAY"))
+            self.assertEqual(len(context), 400)
+
+if __name__ == '__main__':
+    unittest.main()
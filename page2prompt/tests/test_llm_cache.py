@@ -0,0 +1,58 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+from page2prompt.utils.llm_cache import LLMCache
+
+class TestLLMCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.db_path = os.path.join(self.temp_dir.name, "llm_cache.db")
+        self.cache = LLMCache(self.db_path, max_entries=3, ttl_seconds=60)
+
+    def tearDown(self):
+        self.cache.close()
+        self.temp_dir.cleanup()
+
+    def test_hit_and_miss_counters(self):
+        self.assertIsNone(self.cache.get("prompt", "gpt-4o-mini", 0.7))
+        self.cache.set("prompt", "gpt-4o-mini", 0.7, "response")
+        self.assertEqual(self.cache.get("prompt", "gpt-4o-mini", 0.7), "response")
+
+        stats = self.cache.stats()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 1)
+        self.assertEqual(stats["entries"], 1)
+
+    def test_key_includes_model_and_temperature(self):
+        self.cache.set("prompt", "gpt-4o-mini", 0.7, "response")
+        self.assertIsNone(self.cache.get("prompt", "gpt-4o", 0.7))
+        self.assertIsNone(self.cache.get("prompt", "gpt-4o-mini", 0.2))
+
+    def test_survives_reopen(self):
+        self.cache.set("prompt", "gpt-4o-mini", 0.7, "response")
+        self.cache.close()
+        self.cache = LLMCache(self.db_path)
+        self.assertEqual(self.cache.get("prompt", "gpt-4o-mini", 0.7), "response")
+
+    def test_evicts_least_recently_used(self):
+        with patch('page2prompt.utils.llm_cache.time.time') as mock_time:
+            for i in range(3):
+                mock_time.return_value = 1000 + i
+                self.cache.set(f"prompt {i}", "gpt-4o-mini", 0.7, f"response {i}")
+            mock_time.return_value = 1010
+            self.cache.get("prompt 0", "gpt-4o-mini", 0.7)
+            mock_time.return_value = 1020
+            self.cache.set("prompt 3", "gpt-4o-mini", 0.7, "response 3")
+
+            self.assertEqual(self.cache.get("prompt 0", "gpt-4o-mini", 0.7), "response 0")
+            self.assertIsNone(self.cache.get("prompt 1", "gpt-4o-mini", 0.7))
+
+    def test_expired_entries_are_misses(self):
+        self.cache.set("prompt", "gpt-4o-mini", 0.7, "response")
+        with patch('page2prompt.utils.llm_cache.time.time', return_value=time.time() + 120):
+            self.assertIsNone(self.cache.get("prompt", "gpt-4o-mini", 0.7))
+
+if __name__ == '__main__':
+    unittest.main()
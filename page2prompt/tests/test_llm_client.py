@@ -0,0 +1,35 @@
+import os
+import unittest
+from unittest.mock import patch
+from page2prompt.utils.llm_client import LOCAL_API_KEY, LLMClientFactory
+
+class TestLLMClientFactory(unittest.TestCase):
+    def test_chat_models_are_shared_and_pooled(self):
+        clients = LLMClientFactory(api_key="test-key", max_connections=4, max_keepalive_connections=2)
+        with patch('page2prompt.utils.llm_client.ChatOpenAI') as chat_openai:
+            first = clients.chat_model("gpt-4o-mini")
+            self.assertIs(clients.chat_model("gpt-4o-mini"), first)
+            clients.chat_model("gpt-3.5-turbo")
+
+        self.assertEqual(chat_openai.call_count, 2)
+        kwargs = chat_openai.call_args.kwargs
+        self.assertIs(kwargs["http_client"], clients.http_client)
+        self.assertIs(kwargs["http_async_client"], clients.async_http_client)
+        self.assertEqual(kwargs["max_retries"], 0)
+        self.assertEqual(clients.limits().max_connections, 4)
+
+    def test_local_endpoint_needs_no_key(self):
+        # The key is read when used, so everything is checked while the environment is patched
+        with patch.dict(os.environ, {"OPENAI_BASE_URL": "http://localhost:8080/v1", "LLM_TIMEOUT": "5"}, clear=True):
+            clients = LLMClientFactory.from_env()
+            self.assertEqual(clients.base_url, "http://localhost:8080/v1")
+            self.assertEqual(clients.api_key, LOCAL_API_KEY)
+            self.assertEqual(clients.timeouts().read, 5)
+
+            with patch('page2prompt.utils.llm_client.OpenAI') as openai:
+                self.assertIs(clients.openai_client(), clients.openai_client())
+            self.assertEqual(openai.call_args.kwargs["base_url"], "http://localhost:8080/v1")
+            self.assertEqual(openai.call_args.kwargs["api_key"], LOCAL_API_KEY)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,165 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from page2prompt.utils.llm_scheduler import BULK, INTERACTIVE, CircuitOpenError, LLMScheduler, TokenBucket, is_retryable
+
+class StatusError(Exception):
+    def __init__(self, status_code, retry_after=None):
+        super().__init__(f"HTTP {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers={"retry-after": retry_after} if retry_after else {})
+
+def flaky(failures):
+    """Returns an async call that raises each of failures in turn, then succeeds."""
+    calls = []
+
+    async def call():
+        calls.append(1)
+        if len(calls) <= len(failures):
+            raise failures[len(calls) - 1]
+        return "ok"
+    return call, calls
+
+class TestLLMScheduler(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = LLMScheduler(requests_per_minute=60_000, tokens_per_minute=6_000_000, max_retries=3,
+                                      base_delay=0.001, max_delay=0.01, failure_threshold=5, reset_timeout=60)
+
+    def test_retries_rate_limits_and_server_errors(self):
+        call, calls = flaky([StatusError(429), StatusError(503)])
+        self.assertEqual(asyncio.run(self.scheduler.run(call)), "ok")
+        self.assertEqual(len(calls), 3)
+        self.assertEqual(self.scheduler.breaker.failures, 0)
+
+    def test_client_errors_are_not_retried(self):
+        call, calls = flaky([StatusError(400)])
+        with self.assertRaises(StatusError):
+            asyncio.run(self.scheduler.run(call))
+        self.assertEqual(len(calls), 1)
+
+    def test_gives_up_after_max_retries(self):
+        call, calls = flaky([StatusError(429)] * 10)
+        with self.assertRaises(StatusError):
+            asyncio.run(self.scheduler.run(call))
+        self.assertEqual(len(calls), self.scheduler.max_retries + 1)
+
+    def test_circuit_opens_and_fails_fast(self):
+        self.scheduler.max_retries = 10
+        call, calls = flaky([StatusError(500)] * 20)
+        with self.assertRaises(StatusError):
+            asyncio.run(self.scheduler.run(call))
+        self.assertEqual(len(calls), self.scheduler.breaker.failure_threshold)
+        self.assertEqual(self.scheduler.breaker.state, "open")
+
+        with self.assertRaises(CircuitOpenError):
+            self.scheduler.run_sync(lambda: "never called")
+        self.assertEqual(len(calls), self.scheduler.breaker.failure_threshold)
+
+    def test_half_open_trial_closes_circuit(self):
+        for _ in range(self.scheduler.breaker.failure_threshold):
+            self.scheduler.breaker.record_failure()
+        self.scheduler.breaker.opened_at -= self.scheduler.breaker.reset_timeout
+        self.assertEqual(self.scheduler.breaker.state, "half_open")
+
+        self.assertEqual(self.scheduler.run_sync(lambda: "ok"), "ok")
+        self.assertEqual(self.scheduler.breaker.state, "closed")
+
+    def open_half_way(self):
+        for _ in range(self.scheduler.breaker.failure_threshold):
+            self.scheduler.breaker.record_failure()
+        self.scheduler.breaker.opened_at -= self.scheduler.breaker.reset_timeout
+
+    def test_rejected_half_open_trial_closes_circuit(self):
+        self.open_half_way()
+        call, calls = flaky([StatusError(400)])
+        with self.assertRaises(StatusError):
+            asyncio.run(self.scheduler.run(call))
+        # The provider answered, so later calls go through
+        self.assertEqual(self.scheduler.breaker.state, "closed")
+        self.assertEqual(asyncio.run(self.scheduler.run(call)), "ok")
+
+    def test_cancelled_half_open_trial_frees_the_trial_slot(self):
+        self.open_half_way()
+
+        async def cancel_trial():
+            task = asyncio.ensure_future(self.scheduler.run(lambda: asyncio.sleep(10)))
+            await asyncio.sleep(0.01)
+            task.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await task
+
+        asyncio.run(cancel_trial())
+        self.assertEqual(self.scheduler.breaker.state, "half_open")
+        self.assertEqual(self.scheduler.run_sync(lambda: "ok"), "ok")
+        self.assertEqual(self.scheduler.breaker.state, "closed")
+
+    def test_run_sync_retries(self):
+        attempts = []
+
+        def call():
+            attempts.append(1)
+            if len(attempts) == 1:
+                raise StatusError(429)
+            return "ok"
+
+        self.assertEqual(self.scheduler.run_sync(call), "ok")
+        self.assertEqual(len(attempts), 2)
+
+    def test_is_retryable(self):
+        self.assertTrue(is_retryable(StatusError(429)))
+        self.assertTrue(is_retryable(StatusError(502)))
+        self.assertFalse(is_retryable(StatusError(401)))
+        self.assertTrue(is_retryable(type("RateLimitError", (Exception,), {})()))
+        self.assertTrue(is_retryable(asyncio.TimeoutError()))
+        self.assertFalse(is_retryable(ValueError("bad prompt")))
+
+class TestPriorityLanes(unittest.TestCase):
+    def setUp(self):
+        # One request per second, with a fifth of the budget held back for interactive calls
+        self.scheduler = LLMScheduler(requests_per_minute=60, tokens_per_minute=6_000_000, interactive_reserve=0.2)
+
+    def test_bulk_leaves_reserve_for_interactive(self):
+        self.assertEqual(sum(self.scheduler._take_bulk(0) == 0 for _ in range(60)), 48)
+        self.assertEqual(self.scheduler._reserve_interactive(0), 0.0)
+        self.scheduler._interactive_admitted()
+
+    def test_interactive_preempts_waiting_bulk(self):
+        order = []
+
+        async def call(name):
+            order.append(name)
+
+        async def scenario():
+            # Bulk has used up its share, so the next bulk call has to wait for the bucket to refill
+            while self.scheduler._take_bulk(0) == 0:
+                pass
+            bulk = asyncio.create_task(self.scheduler.run(lambda: call("bulk"), priority=BULK))
+            await asyncio.sleep(0)
+            await self.scheduler.run(lambda: call("interactive"), priority=INTERACTIVE)
+            bulk.cancel()
+
+        asyncio.run(scenario())
+        self.assertEqual(order, ["interactive"])
+
+    def test_bulk_waits_while_interactive_is_queued(self):
+        self.scheduler._reserve_interactive(0)
+        self.assertGreater(self.scheduler._take_bulk(0), 0)
+        self.scheduler._interactive_admitted()
+        self.assertEqual(self.scheduler._take_bulk(0), 0.0)
+
+class TestTokenBucket(unittest.TestCase):
+    def test_reserve_returns_wait_once_budget_is_spent(self):
+        bucket = TokenBucket(rate_per_minute=60)
+        self.assertEqual(bucket.reserve(60), 0.0)
+        # The bucket refills at one token per second
+        self.assertAlmostEqual(bucket.reserve(2), 2.0, places=1)
+        self.assertAlmostEqual(bucket.reserve(1), 3.0, places=1)
+
+    def test_take_keeps_headroom(self):
+        bucket = TokenBucket(rate_per_minute=60)
+        self.assertEqual(bucket.shortfall(50, headroom=10), 0.0)
+        bucket.take(50, headroom=10)
+        self.assertAlmostEqual(bucket.shortfall(1, headroom=10), 1.0, places=1)
+
+if __name__ == '__main__':
+    unittest.main()
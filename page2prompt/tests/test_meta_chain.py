@@ -6,7 +6,7 @@ class TestMetaChain(unittest.TestCase):
     def setUp(self):
         self.meta_chain = MetaChain()
 
-    @patch('page2prompt.components.meta_chain.ChatOpenAI')
+    @patch('page2prompt.utils.llm_client.ChatOpenAI')
     async def test_generate_prompt(self, mock_chat_openai):
         # Mock the LLM response
         mock_generation = MagicMock()
@@ -50,7 +50,7 @@ class TestMetaChain(unittest.TestCase):
         self.assertEqual(result["normal"], "Prefix Normal prompt Suffix")
         self.assertEqual(result["detailed"], "Prefix Detailed prompt Suffix")
 
-    @patch('page2prompt.components.meta_chain.ChatOpenAI')
+    @patch('page2prompt.utils.llm_client.ChatOpenAI')
     async def test_generate_prompt_without_prefix_suffix(self, mock_chat_openai):
         # Mock the LLM response
         mock_generation = MagicMock()
@@ -86,7 +86,7 @@ class TestMetaChain(unittest.TestCase):
         self.assertEqual(result["normal"], "Normal prompt")
         self.assertEqual(result["detailed"], "Detailed prompt")
 
-    @patch('page2prompt.components.meta_chain.ChatOpenAI')
+    @patch('page2prompt.utils.llm_client.ChatOpenAI')
     async def test_generate_prompt_error(self, mock_chat_openai):
         # Mock an error in LLM generation
         mock_chat_openai.return_value.agenerate.side_effect = Exception("Test error")
@@ -102,5 +102,17 @@ class TestMetaChain(unittest.TestCase):
         self.assertIn("Error generating detailed prompt", result["detailed"])
         self.assertIn("Error: Test error", result["structured"])
 
+    def test_prompt_templates_start_with_static_instructions(self):
+        # Providers cache identical prompt prefixes, so nothing variable may precede the instructions
+        templates = [
+            (self.meta_chain._build_prompt_template(), "Shot Details:"),
+            (self.meta_chain._build_shot_list_template(), "Script:\n        {script}"),
+            (self.meta_chain._build_subject_descriptions_template(), "Script:\n        {script_excerpt}")
+        ]
+        for template, details in templates:
+            static_prefix = template.template[:template.template.index(details)]
+            self.assertNotRegex(static_prefix, r"(?<!\{)\{[a-z_]+\}(?!\})")
+            self.assertGreater(len(static_prefix), len(template.template) // 2)
+
 if __name__ == '__main__':
     unittest.main()
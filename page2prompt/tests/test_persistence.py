@@ -0,0 +1,60 @@
+import os
+import tempfile
+import time
+import unittest
+from page2prompt.utils.persistence import DebouncedWriter, atomic_write
+
+class TestDebouncedWriter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "subjects.csv")
+        self.state = []
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def render(self):
+        return "\n".join(self.state)
+
+    def read(self):
+        with open(self.path, encoding='utf-8') as f:
+            return f.read()
+
+    def test_burst_of_edits_is_one_write(self):
+        writer = DebouncedWriter(self.path, self.render, delay=0.05)
+        for i in range(20):
+            self.state.append(f"row {i}")
+            writer.mark_dirty()
+        self.assertFalse(os.path.exists(self.path))
+
+        time.sleep(0.3)
+        self.assertEqual(writer.writes, 1)
+        self.assertEqual(self.read(), self.render())
+
+    def test_flush_writes_pending_changes_immediately(self):
+        writer = DebouncedWriter(self.path, self.render, delay=60)
+        self.state.append("row")
+        writer.mark_dirty()
+        writer.flush()
+        writer.flush()
+
+        self.assertEqual(writer.writes, 1)
+        self.assertFalse(writer.dirty)
+        self.assertEqual(self.read(), "row")
+
+    def test_failed_render_leaves_previous_file_intact(self):
+        atomic_write(self.path, "old contents")
+
+        def failing_render():
+            raise RuntimeError("boom")
+
+        writer = DebouncedWriter(self.path, failing_render, delay=60)
+        writer.mark_dirty()
+        writer.flush()
+
+        self.assertTrue(writer.dirty)
+        self.assertEqual(self.read(), "old contents")
+        self.assertEqual(os.listdir(self.temp_dir.name), ["subjects.csv"])
+
+if __name__ == '__main__':
+    unittest.main()
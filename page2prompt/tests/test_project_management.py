@@ -0,0 +1,137 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from page2prompt.utils.project_journal import ProjectJournal
+from page2prompt.utils.project_store import ProjectStore
+
+def make_shots(count):
+    return [{"Scene": "1", "Shot": str(i), "Shot Description": f"Shot {i}"} for i in range(1, count + 1)]
+
+class TestProjectStore(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = ProjectStore(os.path.join(self.temp_dir.name, "projects", "projects.db"))
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_save_and_load_round_trip(self):
+        subjects = [{"Name": "Sarah", "Description": "Lead", "Type": "person"}]
+        self.store.save_project("demo", "INT. ROOM - DAY", make_shots(3), subjects, ["prompt one", "prompt two"])
+
+        project = self.store.load_project("demo")
+        self.assertEqual(project["full_script"], "INT. ROOM - DAY")
+        self.assertEqual(project["shot_list"], make_shots(3))
+        self.assertEqual(list(project["shot_list"][0]), ["Scene", "Shot", "Shot Description"])
+        self.assertEqual(project["subjects"], subjects)
+        self.assertEqual(project["prompts"], ["prompt one", "prompt two"])
+        self.assertIsNone(self.store.load_project("missing"))
+
+    def test_resave_writes_only_changed_rows(self):
+        shots = make_shots(1000)
+        written = self.store.save_project("demo", "script", shots, [], [])
+        self.assertEqual(written, {"script": 1, "shots": 1000, "subjects": 0, "prompts": 0})
+
+        shots[10]["Shot Description"] = "Edited"
+        written = self.store.save_project("demo", "script", shots[:-2], [], [])
+        self.assertEqual(written, {"script": 0, "shots": 3, "subjects": 0, "prompts": 0})
+        self.assertEqual(self.store.load_project("demo")["shot_list"], shots[:-2])
+
+    def test_listing_reads_the_index(self):
+        self.store.save_project("first", "", make_shots(2), [], ["p"])
+        self.store.save_project("second", "", [], [], [])
+
+        projects = {project["name"]: project for project in self.store.list_projects()}
+        self.assertEqual(set(projects), {"first", "second"})
+        self.assertEqual(projects["first"]["shots"], 2)
+        self.assertEqual(projects["first"]["prompts"], 1)
+
+    def test_delete_removes_project_rows(self):
+        self.store.save_project("demo", "script", make_shots(2), [], [])
+
+        self.assertTrue(self.store.delete_project("demo"))
+        self.assertFalse(self.store.delete_project("demo"))
+        self.assertEqual(self.store.list_projects(), [])
+        self.store.save_project("demo", "", [], [], [])
+        self.assertEqual(self.store.load_project("demo")["shot_list"], [])
+
+class TestProjectJournal(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.store = ProjectStore(os.path.join(self.temp_dir.name, "projects.db"))
+        self.journal = ProjectJournal(self.store, os.path.join(self.temp_dir.name, "journal"), compact_every=50)
+
+    def tearDown(self):
+        self.store.close()
+        self.temp_dir.cleanup()
+
+    def test_autosave_appends_only_the_edit(self):
+        shots = make_shots(20)
+        self.journal.record("demo", "script", shots, [], [])
+        size = os.path.getsize(self.journal.journal_path("demo"))
+
+        shots[5]["Shot Description"] = "Edited"
+        self.assertEqual(self.journal.record("demo", "script", shots, [], ["new prompt"]), 2)
+        self.assertEqual(self.journal.record("demo", "script", shots, [], ["new prompt"]), 0)
+        self.assertLess(os.path.getsize(self.journal.journal_path("demo")) - size, 200)
+
+    def test_recover_replays_journal_over_snapshot(self):
+        shots = make_shots(3)
+        self.journal.record("demo", "v1", shots, [], [])
+        self.journal.compact("demo")
+        self.journal.record("demo", "v2", shots[:2], [{"Name": "Sarah"}], [])
+        with open(self.journal.journal_path("demo"), "a", encoding="utf-8") as f:
+            f.write('{"op": "row", "tab')  # torn write from a crash
+
+        recovered = ProjectJournal(self.store, self.journal.directory).recover("demo")
+        self.assertEqual(recovered["full_script"], "v2")
+        self.assertEqual(recovered["shot_list"], shots[:2])
+        self.assertEqual(recovered["subjects"], [{"Name": "Sarah"}])
+        self.assertEqual(self.store.load_project("demo")["full_script"], "v1")
+
+        self.journal.record("demo", "v3", shots[:2], [{"Name": "Sarah"}], [])
+        self.assertEqual(ProjectJournal(self.store, self.journal.directory).recover("demo")["full_script"], "v3")
+        self.assertIsNone(self.journal.recover("missing"))
+
+    def test_script_edits_are_journaled_as_splices(self):
+        script = "INT. ROOM - DAY\n" + "Sarah waits by the window.\n" * 5000
+        self.journal.record("demo", script, [], [], [])
+        size = os.path.getsize(self.journal.journal_path("demo"))
+
+        edited = script.replace("DAY", "NIGHT", 1)
+        self.journal.record("demo", edited, [], [], [])
+        self.assertLess(os.path.getsize(self.journal.journal_path("demo")) - size, 100)
+        self.assertEqual(ProjectJournal(self.store, self.journal.directory).recover("demo")["full_script"], edited)
+
+    def test_crash_between_snapshot_and_truncate_replays_nothing_twice(self):
+        self.journal.record("demo", "Hello world", [], [], [])
+        self.journal.record("demo", "Hello big world", [], [], [])
+        with patch('page2prompt.utils.project_journal.open', side_effect=OSError("crash"), create=True):
+            with self.assertRaises(OSError):
+                self.journal.compact("demo")
+        self.assertEqual(self.store.load_project("demo")["full_script"], "Hello big world")
+
+        journal = ProjectJournal(self.store, self.journal.directory)
+        self.assertEqual(journal.recover("demo")["full_script"], "Hello big world")
+        journal.record("demo", "Hello big bad world", [], [], [])
+        self.assertEqual(ProjectJournal(self.store, self.journal.directory).recover("demo")["full_script"], "Hello big bad world")
+
+    def test_compaction_on_journal_size(self):
+        journal = ProjectJournal(self.store, self.journal.directory, compact_bytes=10_000)
+        journal.record("demo", "x" * 5_000, [], [], [])
+        self.assertGreater(os.path.getsize(journal.journal_path("demo")), 0)
+        journal.record("demo", "y" * 6_000, [], [], [])
+
+        self.assertEqual(os.path.getsize(journal.journal_path("demo")), 0)
+        self.assertEqual(self.store.load_project("demo")["full_script"], "y" * 6_000)
+
+    def test_compaction_after_threshold(self):
+        self.journal.record("demo", "", make_shots(60), [], [])
+
+        self.assertEqual(os.path.getsize(self.journal.journal_path("demo")), 0)
+        self.assertEqual(len(self.store.load_project("demo")["shot_list"]), 60)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import unittest
+from page2prompt.utils.script_alignment import ScriptAlignmentIndex
+
+SCRIPT = """INT. COFFEE SHOP - DAY
+Sarah enters, looking around nervously.
+She sits down.
+
+EXT. CITY PARK - NIGHT
+Rain falls on the empty benches.
+She sits down.
+"""
+
+class TestScriptAlignmentIndex(unittest.TestCase):
+    def setUp(self):
+        self.index = ScriptAlignmentIndex(SCRIPT)
+
+    def span(self, alignment):
+        return SCRIPT[alignment.start:alignment.end]
+
+    def test_exact_references_resolve_in_shot_order(self):
+        alignments = self.index.set_references(["Sarah enters", "She sits down.", "Rain falls", "She sits down."])
+        self.assertEqual([self.span(alignment) for alignment in alignments], ["Sarah enters", "She sits down.", "Rain falls", "She sits down."])
+        # The repeated line maps to its second occurrence for the later shot
+        self.assertLess(alignments[1].start, alignments[2].start)
+        self.assertLess(alignments[2].start, alignments[3].start)
+        self.assertTrue(all(alignment.score == 1.0 for alignment in alignments))
+
+    def test_whitespace_differences_still_match_exactly(self):
+        alignment = self.index.locate("DAY Sarah   enters,")
+        self.assertEqual(self.span(alignment), "DAY\nSarah enters,")
+        self.assertEqual(alignment.score, 1.0)
+
+    def test_fuzzy_fallback(self):
+        alignment = self.index.locate("Rain falls on the empty bench")
+        self.assertGreaterEqual(alignment.score, 0.6)
+        self.assertIn("Rain falls", self.span(alignment))
+        self.assertIsNone(self.index.locate("A spaceship lands on Mars"))
+
+    def test_scene_and_shot_lookups(self):
+        self.index.set_references(["Sarah enters", "Rain falls"])
+        offset = SCRIPT.index("Rain falls") + 3
+        self.assertEqual(self.index.scene_at(offset).heading, "EXT. CITY PARK - NIGHT")
+        self.assertEqual(self.index.shot_at(offset), 1)
+        self.assertIsNone(self.index.shot_at(SCRIPT.index("She sits")))
+        self.assertEqual(self.index.scene_for_text("looking around").number, 1)
+
+    def test_edited_span_is_resolved_again(self):
+        self.index.set_references(["Sarah enters", "Rain falls on the empty benches."])
+        first = self.index.alignments[0]
+        edited = SCRIPT.replace("empty benches", "wet benches")
+        self.index.update_script(edited)
+
+        self.assertEqual(self.index.alignments[0], first)
+        second = self.index.alignments[1]
+        self.assertLess(second.score, 1.0)
+        self.assertTrue(edited[second.start:second.end].startswith("Rain falls on the wet benches"))
+
+    def test_insert_before_spans_shifts_them(self):
+        self.index.set_references(["Sarah enters", "Rain falls"])
+        edited = "FADE IN:\n" + SCRIPT
+        self.index.update_script(edited)
+        self.assertEqual([edited[alignment.start:alignment.end] for alignment in self.index.alignments], ["Sarah enters", "Rain falls"])
+        self.assertEqual(self.index.scene_at(self.index.alignments[1].start).number, 2)
+
+    def test_edit_after_spans_keeps_them(self):
+        self.index.set_references(["Sarah enters"])
+        before = self.index.alignments[0]
+        self.index.update_script(SCRIPT + "FADE OUT.\n")
+        self.assertEqual(self.index.alignments[0], before)
+
+if __name__ == '__main__':
+    unittest.main()
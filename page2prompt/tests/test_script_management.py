@@ -0,0 +1,118 @@
+import unittest
+import pandas as pd
+from page2prompt.utils.scene_splitter import split_scenes
+from page2prompt.utils.script_manager import ScriptManager
+
+SCRIPT = """FADE IN:
+
+INT. COFFEE SHOP - DAY
+Sarah enters, looking around nervously.
+
+EXT. CITY PARK - NIGHT
+Rain falls on the empty benches.
+
+12 INT./EXT. SARAH'S CAR - MOVING
+She drives in silence.
+"""
+
+class TestSplitScenes(unittest.TestCase):
+    def test_splits_at_scene_headings(self):
+        scenes = split_scenes(SCRIPT)
+
+        self.assertEqual([scene.number for scene in scenes], [1, 2, 3])
+        self.assertEqual(
+            [scene.heading for scene in scenes],
+            ["INT. COFFEE SHOP - DAY", "EXT. CITY PARK - NIGHT", "12 INT./EXT. SARAH'S CAR - MOVING"]
+        )
+
+    def test_scenes_cover_the_whole_script(self):
+        scenes = split_scenes(SCRIPT)
+
+        self.assertEqual("".join(scene.text for scene in scenes), SCRIPT)
+        for scene in scenes:
+            self.assertEqual(SCRIPT[scene.start:scene.end], scene.text)
+        self.assertTrue(scenes[0].text.startswith("FADE IN:"))
+
+    def test_script_without_headings_is_one_scene(self):
+        scenes = split_scenes("Verse one\nChorus")
+
+        self.assertEqual(len(scenes), 1)
+        self.assertEqual(scenes[0].heading, "")
+
+    def test_empty_script(self):
+        self.assertEqual(split_scenes("   \n"), [])
+
+class FakeMetaChain:
+    """Returns one shot per scene and records which scenes were prompted."""
+
+    def __init__(self):
+        self.prompted = []
+
+    def _scene_rows(self, scene):
+        self.prompted.append(scene.heading)
+        return pd.DataFrame([["00:00", str(scene.number), "1", scene.heading, f"Shot of {scene.heading}", "Wide Shot", "Sarah", "N/A"]],
+                            columns=["Timestamp", "Scene", "Shot", "Script Reference", "Shot Description", "Shot Size", "People", "Places"])
+
+    async def generate_proposed_shot_list(self, script, by_scene=False):
+        return pd.concat([self._scene_rows(scene) for scene in split_scenes(script)], ignore_index=True)
+
+    async def generate_scene_shot_lists(self, scenes):
+        return [self._scene_rows(scene) for scene in scenes]
+
+class TestIncrementalShotList(unittest.IsolatedAsyncioTestCase):
+    async def test_only_changed_scenes_are_regenerated(self):
+        meta_chain = FakeMetaChain()
+        script_manager = ScriptManager(meta_chain)
+        shot_list = await script_manager.generate_proposed_shot_list(SCRIPT, by_scene=True)
+        shot_list.loc[0, "Shot Description"] = "Edited by hand"
+        meta_chain.prompted = []
+
+        edited_script = SCRIPT.replace("Rain falls on the empty benches.", "Snow covers the benches.")
+        result = await script_manager.regenerate_proposed_shot_list(edited_script, shot_list)
+
+        self.assertEqual(meta_chain.prompted, ["EXT. CITY PARK - NIGHT"])
+        self.assertEqual(list(result["Scene"]), ["1", "2", "3"])
+        self.assertEqual(result.loc[0, "Shot Description"], "Edited by hand")
+
+    async def test_inserted_scene_renumbers_following_scenes(self):
+        meta_chain = FakeMetaChain()
+        script_manager = ScriptManager(meta_chain)
+        await script_manager.generate_proposed_shot_list(SCRIPT, by_scene=True)
+        meta_chain.prompted = []
+
+        edited_script = SCRIPT.replace("EXT. CITY PARK - NIGHT", "INT. HALLWAY - DAY\nSarah waits.\n\nEXT. CITY PARK - NIGHT")
+        result = await script_manager.regenerate_proposed_shot_list(edited_script)
+
+        self.assertEqual(meta_chain.prompted, ["INT. HALLWAY - DAY"])
+        self.assertEqual(list(result["Script Reference"]), ["INT. COFFEE SHOP - DAY", "INT. HALLWAY - DAY", "EXT. CITY PARK - NIGHT", "12 INT./EXT. SARAH'S CAR - MOVING"])
+        self.assertEqual(list(result["Scene"]), ["1", "2", "3", "4"])
+
+class TestShotListTables(unittest.TestCase):
+    def setUp(self):
+        self.script_manager = ScriptManager(FakeMetaChain())
+
+    def test_shots_are_numbered_within_consecutive_scene_runs(self):
+        df = pd.DataFrame({"Scene": ["1", "1", "2", "2", "2", "1"], "Shot": ["9"] * 6})
+        result = self.script_manager._normalize_shot_list(df)
+        self.assertEqual(list(result["Shot"]), ["1", "2", "1", "2", "3", "1"])
+        self.assertEqual(list(result.columns)[:3], ["Timestamp", "Scene", "Shot"])
+
+    def test_unique_names_and_places(self):
+        shot_list = pd.DataFrame({"People": ["Sarah, Mike", "Mike", None], "Places": ["Cafe", "Park, Cafe", "Cafe"]})
+        self.assertEqual(self.script_manager.extract_unique_names(shot_list), ["Sarah", "Mike"])
+        self.assertEqual(self.script_manager.extract_unique_places(shot_list), ["Cafe", "Park"])
+
+    def test_missing_names_and_places_are_added_once(self):
+        subjects_df = pd.DataFrame({"Name": ["Sarah", "Park"], "Description": ["Lead", "Green"], "Type": ["person", "place"]})
+        result = self.script_manager.ensure_all_names_and_places_included(subjects_df, ["Sarah", "Mike", "Mike"], ["Park", "Cafe"])
+        self.assertEqual(list(result["Name"]), ["Sarah", "Park", "Mike", "Cafe"])
+        self.assertEqual(list(result["Type"]), ["person", "place", "person", "place"])
+
+    def test_approve_adds_people_missing_from_proposed_subjects(self):
+        self.script_manager.shot_list = pd.DataFrame({"People": ["Sarah, Mike", " Mike ,", "Ana"]})
+        self.script_manager.proposed_subjects = pd.DataFrame({"Name": ["Mike"], "Description": ["Friend"], "Type": ["person"]})
+        result = self.script_manager.approve_proposed_subjects()
+        self.assertEqual(list(result["Name"]), ["Mike", "Sarah", "Ana"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from page2prompt.services import ServiceContainer
+
+class TestServiceContainer(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        with open(os.path.join(self.temp_dir.name, "camera_settings.csv"), "w") as f:
+            f.write("type,display\nshot,Wide Shot\nshot,Close-up\nmove,Static\n")
+        with open(os.path.join(self.temp_dir.name, "director_styles.csv"), "w") as f:
+            f.write("name,visual_style,narrative_approach,cinematography,thematic_elements\nKubrick,Symmetry,Cold,Wide,Control\n")
+        self.services = ServiceContainer(self.temp_dir.name)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_services_are_built_once_on_first_use(self):
+        self.assertFalse(self.services.is_built("camera_settings"))
+        settings = self.services.camera_settings
+        self.assertEqual(settings, {"shot": ["Wide Shot", "Close-up"], "move": ["Static"]})
+        self.assertIs(self.services.camera_settings, settings)
+        self.assertEqual(list(self.services.timings), ["camera_settings"])
+
+    def test_director_styles_csv_is_parsed_once(self):
+        with patch('page2prompt.services.load_director_styles', wraps=lambda path: [{"name": "Kubrick", "visual_style": "Symmetry"}]) as load:
+            assistant = self.services.director_assistant
+            self.assertEqual([style["name"] for style in self.services.director_styles], ["Kubrick"])
+        load.assert_called_once()
+        self.assertIn("Symmetry", assistant.get_director_style("Kubrick")["notes"])
+
+    def test_startup_report_excludes_dependency_time(self):
+        self.services.director_assistant
+        self.assertEqual(set(self.services.timings), {"director_styles", "director_assistant"})
+        report = self.services.startup_report()
+        self.assertIn("director_assistant", report)
+        self.assertTrue(report.splitlines()[-1].startswith("total"))
+
+if __name__ == '__main__':
+    unittest.main()
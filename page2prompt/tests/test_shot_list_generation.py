@@ -0,0 +1,119 @@
+import asyncio
+import os
+import tempfile
+import unittest
+from unittest.mock import patch, MagicMock, AsyncMock
+import pandas as pd
+from page2prompt.components.chain_registry import chain_registry
+from page2prompt.components.shot_list_meta_chain import ShotListMetaChain
+from page2prompt.utils import bulk_jobs
+from page2prompt.utils.bulk_jobs import BulkJobStore
+
+class TestShotListMetaChain(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        chain_registry.clear()
+        with patch('page2prompt.utils.llm_client.ChatOpenAI'):
+            self.subject_manager = MagicMock()
+            self.subject_manager.get_subjects_for_shot.return_value = ""
+            self.style_manager = MagicMock()
+            self.style_manager.get_full_style_description.return_value = "Test Style"
+            self.director_assistant = MagicMock()
+            self.director_assistant.get_director_style.return_value = {"name": "Test", "notes": "Test Notes"}
+            self.chain = ShotListMetaChain("test-key", self.subject_manager, self.style_manager, self.director_assistant)
+        self.shot_list_df = pd.DataFrame({
+            "Scene": ["1"] * 6,
+            "Shot": [str(i) for i in range(1, 7)],
+            "Script Reference": [f"Reference {i}" for i in range(1, 7)],
+            "Shot Description": [f"Description {i}" for i in range(1, 7)],
+            "Shot Size": ["Wide Shot"] * 6,
+            "People": ["Sarah"] * 6
+        })
+
+    async def test_bulk_directors_notes_keeps_row_order(self):
+        async def fake_notes(script_excerpt, *args):
+            # Later rows finish first to force out-of-order completion
+            await asyncio.sleep(0.01 * (7 - int(script_excerpt.split()[-1])))
+            return f"Notes for {script_excerpt}"
+
+        self.chain.generate_directors_notes = fake_notes
+        result = await self.chain.generate_bulk_directors_notes("", self.shot_list_df, "Test Style", "Test", max_concurrency=3)
+
+        self.assertEqual(list(result["Director's Notes"]), [f"Notes for Reference {i}" for i in range(1, 7)])
+
+    async def test_bulk_directors_notes_respects_concurrency_limit(self):
+        in_flight = 0
+        peak = 0
+
+        async def fake_notes(*args):
+            nonlocal in_flight, peak
+            in_flight += 1
+            peak = max(peak, in_flight)
+            await asyncio.sleep(0.01)
+            in_flight -= 1
+            return "Notes"
+
+        self.chain.generate_directors_notes = fake_notes
+        progress = []
+        await self.chain.generate_bulk_directors_notes("", self.shot_list_df, "Test Style", "Test", progress_callback=progress.append, max_concurrency=2)
+
+        self.assertEqual(peak, 2)
+        self.assertEqual(progress, sorted(progress))
+        self.assertEqual(progress[-1], 1.0)
+
+    async def test_batched_prompts_retry_only_unparsed_shots(self):
+        self.shot_list_df["Director's Notes"] = ["Notes"] * 6
+        self.style_manager.get_style_prefix_suffix.return_value = ("Prefix", "Suffix")
+        response = "\n".join(
+            f"### Shot ID: {i}\nConcise Prompt: Concise {i}\nMedium Prompt: Medium {i}\nDetailed Prompt: Detailed {i}"
+            for i in (1, 2, 4, 5, 6)
+        )
+        chain = MagicMock()
+        chain.arun = AsyncMock(return_value=response)
+        retried = []
+
+        async def fake_prompts(script_reference, *args):
+            retried.append(script_reference)
+            return {"concise": "Retried", "medium": "Retried", "detailed": "Retried"}
+
+        self.chain.generate_prompts = fake_prompts
+        with patch('page2prompt.components.shot_list_meta_chain.LLMChain', return_value=chain):
+            result = await self.chain.generate_bulk_prompts(self.shot_list_df, "Test Style", batch_size=6)
+
+        chain.arun.assert_awaited_once()
+        self.assertEqual(retried, ["Reference 3"])
+        self.assertEqual(result.loc[0, "Concise Prompt"], "Prefix Concise 1 Suffix")
+        self.assertEqual(result.loc[2, "Medium Prompt"], "Retried")
+        self.assertEqual(result.loc[5, "Detailed Prompt"], "Prefix Detailed 6 Suffix")
+
+    async def test_bulk_job_resumes_only_unfinished_rows(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            jobs = BulkJobStore(os.path.join(temp_dir, "bulk_jobs.db"))
+            job_id = jobs.create_job(bulk_jobs.DIRECTORS_NOTES, self.shot_list_df.to_dict('records'),
+                                     {"visual_style": "Test Style", "director_style": "Test"})
+            calls = []
+
+            async def failing_notes(script_excerpt, *args):
+                calls.append(script_excerpt)
+                if script_excerpt == "Reference 4":
+                    raise RuntimeError("connection dropped")
+                return f"Notes for {script_excerpt}"
+
+            self.chain.generate_directors_notes = failing_notes
+            self.chain.max_concurrency = 1
+            with self.assertRaises(RuntimeError):
+                await self.chain.run_bulk_job(jobs, job_id)
+            self.assertEqual(jobs.get_job(job_id)["status"], bulk_jobs.FAILED)
+            self.assertEqual(jobs.completed_positions(job_id), [0, 1, 2])
+
+            calls.clear()
+            self.chain.generate_directors_notes = lambda script_excerpt, *args: failing_notes(script_excerpt.replace("4", "4 again"))
+            result = await self.chain.run_bulk_job(jobs, job_id)
+
+            self.assertEqual(calls, ["Reference 4 again", "Reference 5", "Reference 6"])
+            self.assertEqual(jobs.get_job(job_id)["status"], bulk_jobs.COMPLETED)
+            self.assertEqual(result.loc[0, "Director's Notes"], "Notes for Reference 1")
+            self.assertEqual(result.loc[3, "Director's Notes"], "Notes for Reference 4 again")
+            jobs.close()
+
+if __name__ == '__main__':
+    unittest.main()
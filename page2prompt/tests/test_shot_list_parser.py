@@ -0,0 +1,50 @@
+import unittest
+from page2prompt.utils.shot_list_parser import ShotListParser, split_fields
+
+ROW = "00:00|1|1|INT. CAFE - DAY|Sarah enters.|Wide Shot|Sarah|Cafe"
+
+class TestShotListParser(unittest.TestCase):
+    def test_rows_are_emitted_as_lines_complete(self):
+        parser = ShotListParser()
+        self.assertEqual(parser.feed(ROW[:20]), [])
+        self.assertEqual(parser.feed(ROW[20:] + "\n00:05|1|2|Ref"), [ROW.split("|")])
+        self.assertEqual(parser.feed("|Desc|Close-up|Sarah|Cafe"), [])
+        self.assertEqual(parser.close(), [["00:05", "1", "2", "Ref", "Desc", "Close-up", "Sarah", "Cafe"]])
+        self.assertEqual(len(parser.rows), 2)
+
+    def test_fences_headers_and_table_borders_are_skipped(self):
+        content = "\n".join([
+            "```text",
+            "| Timestamp | Scene | Shot | Reference | Shot Description | Shot Size | People | Places |",
+            "|---|---|---|---|---|---|---|---|",
+            f"| {ROW} |",
+            "```"
+        ])
+        parser = ShotListParser()
+        self.assertEqual(parser.parse(content), [ROW.split("|")])
+        self.assertEqual(parser.quarantined, [])
+
+    def test_surplus_pipes_are_folded_into_the_description(self):
+        parser = ShotListParser()
+        rows = parser.parse("00:00|1|1|Ref|She reads the sign|OPEN|late|Wide Shot|Sarah|Cafe")
+        self.assertEqual(rows[0][4], "She reads the sign|OPEN|late")
+        self.assertEqual(rows[0][5:], ["Wide Shot", "Sarah", "Cafe"])
+        self.assertEqual(parser.repaired, 1)
+
+    def test_pipes_inside_quotes_are_kept(self):
+        parser = ShotListParser()
+        rows = parser.parse('00:00|1|1|"Ref | with pipe"|Desc|Wide Shot|Sarah|Cafe')
+        self.assertEqual(rows[0][3], "Ref | with pipe")
+        self.assertEqual(parser.repaired, 0)
+
+    def test_short_rows_are_padded_or_quarantined(self):
+        parser = ShotListParser()
+        rows = parser.parse("00:00|1|1|Ref|Desc|Wide Shot\nHere is your shot list:\n00:05|1|2|Ref")
+        self.assertEqual(rows, [["00:00", "1", "1", "Ref", "Desc", "Wide Shot", "N/A", "N/A"]])
+        self.assertEqual([entry.reason for entry in parser.quarantined], ["no fields", "4 of 8 fields"])
+
+    def test_split_fields_falls_back_on_unbalanced_quotes(self):
+        self.assertEqual(split_fields('a|"b|c'), ["a", '"b', "c"])
+
+if __name__ == '__main__':
+    unittest.main()
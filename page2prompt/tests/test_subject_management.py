@@ -0,0 +1,75 @@
+import os
+import tempfile
+import unittest
+from page2prompt.utils.subject_manager import Subject, SubjectManager
+
+class TestSubjectManager(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.subject_manager = SubjectManager(os.path.join(self.temp_dir.name, "subjects.csv"))
+        self.subject_manager.add_subject(Subject("Sarah", "Lead", "S4R4H", "person", "SP", "SS"))
+        self.subject_manager.add_subject(Subject("Coffee Shop", "Cafe", "Cafe", "place"))
+        self.subject_manager.add_subject(Subject("Mike", "Friend", "Mike", "person", "MP", "", active=False))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def test_lookups_by_name_type_and_alias(self):
+        self.assertEqual(self.subject_manager.get_subject_details("Sarah")["alias"], "S4R4H")
+        self.assertEqual(self.subject_manager.get_subject_details("Nobody"), {})
+        self.assertEqual(self.subject_manager.get_people(), ["Sarah", "Mike"])
+        self.assertEqual(self.subject_manager.get_places(), ["Coffee Shop"])
+        self.assertEqual([s.name for s in self.subject_manager.get_subjects_by_alias("Cafe")], ["Coffee Shop"])
+        self.assertEqual([s.name for s in self.subject_manager.get_active_subjects()], ["Sarah", "Coffee Shop"])
+
+    def test_duplicate_names_are_ignored(self):
+        self.subject_manager.add_subject(Subject("Sarah", "Other", "Other", "prop"))
+
+        self.assertEqual(len(self.subject_manager.get_subjects()), 3)
+        self.assertEqual(self.subject_manager.get_props(), [])
+
+    def test_update_and_delete_keep_indexes_in_sync(self):
+        self.subject_manager.update_subject(Subject("Sarah", "Lead", "Sal", "place", "SP", "SS", active=False))
+
+        self.assertEqual(self.subject_manager.get_people(), ["Mike"])
+        self.assertEqual(self.subject_manager.get_places(), ["Sarah", "Coffee Shop"])
+        self.assertEqual(self.subject_manager.get_subjects_by_alias("S4R4H"), [])
+        self.assertEqual(self.subject_manager.get_subject_prefix_suffix(["Sarah", "Mike"]), ("", ""))
+
+        self.subject_manager.delete_subject("Coffee Shop")
+        self.assertEqual(self.subject_manager.get_places(), ["Sarah"])
+        self.assertEqual(self.subject_manager.get_subjects_by_alias("Cafe"), [])
+
+    def test_update_keeps_library_order(self):
+        self.subject_manager.add_subject(Subject("Tom", "Barista", "T0M", "person", "TP", ""))
+        self.subject_manager.update_subject(Subject("Mike", "Friend", "M1K3", "person", "MP", "", active=True))
+        self.subject_manager.update_subject(Subject("Coffee Shop", "Diner", "Cafe", "place"))
+
+        self.assertEqual([s.name for s in self.subject_manager.get_subjects()], ["Sarah", "Coffee Shop", "Mike", "Tom"])
+        self.assertEqual(self.subject_manager.get_people(), ["Sarah", "Mike", "Tom"])
+        self.assertEqual([s.name for s in self.subject_manager.get_active_subjects()], ["Sarah", "Coffee Shop", "Mike", "Tom"])
+        # The Prompt tab passes the checkbox lists, so prefixes follow the listing order
+        self.assertEqual(self.subject_manager.get_subject_prefix_suffix(self.subject_manager.get_people())[0], "SP MP TP")
+
+    def test_shot_subjects_and_prefix_suffix_use_active_subjects(self):
+        self.assertEqual(self.subject_manager.get_subjects_for_shot("Sarah, Mike, Sarah"), "Sarah")
+        self.assertEqual(self.subject_manager.get_subject_prefix_suffix(["Sarah", "Mike"]), ("SP", "SS"))
+
+    def test_alias_replacer_is_rebuilt_only_after_changes(self):
+        replacer = self.subject_manager.get_alias_replacer()
+        self.assertIs(self.subject_manager.get_alias_replacer(), replacer)
+        self.assertEqual(self.subject_manager.apply_alias("Sarah at the Coffee Shop with Mike"), "S4R4H at the Cafe with Mike")
+
+        self.subject_manager.update_subject(Subject("Mike", "Friend", "M1K3", "person"))
+        self.assertIsNot(self.subject_manager.get_alias_replacer(), replacer)
+        self.assertEqual(self.subject_manager.apply_alias("Mike"), "M1K3")
+
+    def test_subjects_survive_reload(self):
+        self.subject_manager.flush()
+        reloaded = SubjectManager(self.subject_manager.subjects_file)
+
+        self.assertEqual([s.name for s in reloaded.get_subjects()], ["Sarah", "Coffee Shop", "Mike"])
+        self.assertFalse(reloaded.get_subject_details("Mike")["active"])
+
+if __name__ == '__main__':
+    unittest.main()
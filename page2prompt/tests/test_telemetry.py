@@ -0,0 +1,60 @@
+import unittest
+from types import SimpleNamespace
+from page2prompt.utils.telemetry import Telemetry
+
+class TestTelemetry(unittest.TestCase):
+    def setUp(self):
+        self.telemetry = Telemetry()
+
+    def test_track_records_usage_and_latency(self):
+        with self.telemetry.track("generate_prompt", "gpt-4o-mini") as tracker:
+            tracker.set_usage(SimpleNamespace(prompt_tokens=120, completion_tokens=80, total_cost=0.002))
+
+        record = self.telemetry.records[-1]
+        self.assertEqual((record.call_site, record.prompt_tokens, record.completion_tokens), ("generate_prompt", 120, 80))
+        self.assertGreaterEqual(record.latency, 0)
+        self.assertFalse(record.cache_hit)
+
+    def test_cached_prompt_tokens_are_reported(self):
+        with self.telemetry.track("generate_prompt", "gpt-4o-mini") as tracker:
+            tracker.set_usage(SimpleNamespace(prompt_tokens=2000, prompt_tokens_cached=1536, completion_tokens=80, total_cost=0.002))
+        self.telemetry.record("generate_prompt", "gpt-4o-mini", 2000, 80, 0.002, 1.0)
+
+        self.assertEqual(self.telemetry.records[0].cached_tokens, 1536)
+        row = self.telemetry.summary()[0]
+        self.assertEqual(row["cached_tokens"], 1536)
+        self.assertAlmostEqual(row["cached_ratio"], 0.384)
+        self.assertIn("page2prompt_llm_cached_prompt_tokens_total{", self.telemetry.to_prometheus())
+
+    def test_failed_calls_are_recorded_as_errors(self):
+        with self.assertRaises(RuntimeError):
+            with self.telemetry.track("shot_list", "gpt-4o-mini"):
+                raise RuntimeError("rate limited")
+
+        self.assertTrue(self.telemetry.records[-1].error)
+
+    def test_summary_groups_by_project_and_call_site(self):
+        self.telemetry.set_project("demo")
+        self.telemetry.record("bulk_notes", "gpt-3.5-turbo", 100, 50, 0.001, 1.0)
+        self.telemetry.record("bulk_notes", "gpt-3.5-turbo", 100, 50, 0.001, 3.0)
+        self.telemetry.record("bulk_notes", "gpt-3.5-turbo", cache_hit=True)
+        self.telemetry.set_project("other")
+        self.telemetry.record("generate_prompt", "gpt-4o-mini", 10, 10, 0.0001, 0.5)
+
+        by_project = {row["project"]: row for row in self.telemetry.summary(("project",))}
+        self.assertEqual(by_project["demo"]["calls"], 3)
+        self.assertEqual(by_project["demo"]["cache_hits"], 1)
+        self.assertEqual(by_project["demo"]["prompt_tokens"], 200)
+        self.assertAlmostEqual(by_project["demo"]["avg_latency"], 2.0)
+        self.assertEqual(self.telemetry.summary(("session",))[0]["calls"], 4)
+
+    def test_prometheus_export(self):
+        self.telemetry.set_project('say "hi"')
+        self.telemetry.record("shot_list", "gpt-4o-mini", 10, 5, 0.01, 0.2)
+
+        text = self.telemetry.to_prometheus()
+        self.assertIn("# TYPE page2prompt_llm_calls_total counter", text)
+        self.assertIn('project="say \\"hi\\"",call_site="shot_list",model="gpt-4o-mini"} 1', text)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,26 @@
+import re
+from typing import Dict, Iterable, Tuple
+
+class AliasReplacer:
+    """Replaces subject names with their aliases in a single regex pass.
+
+    All names go into one alternation, longest first, so "Samantha" wins over "Sam". Matches must not
+    touch a word character on either side, so "Sam" is left alone inside "Samuel" and "Sams".
+    Replaced text is never rescanned, so an alias that contains another subject's name stays as written.
+    """
+
+    def __init__(self, name_alias_pairs: Iterable[Tuple[str, str]]):
+        self.aliases: Dict[str, str] = {}
+        for name, alias in name_alias_pairs:
+            if name and alias and name != alias:
+                self.aliases.setdefault(name, alias)
+        if self.aliases:
+            names = sorted(self.aliases, key=len, reverse=True)
+            self.pattern = re.compile(r'(?<!\w)(?:' + '|'.join(map(re.escape, names)) + r')(?!\w)')
+        else:
+            self.pattern = None
+
+    def replace(self, text: str) -> str:
+        if not self.pattern or not text:
+            return text
+        return self.pattern.sub(lambda match: self.aliases[match.group(0)], text)
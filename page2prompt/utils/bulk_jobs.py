@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Job kinds
+DIRECTORS_NOTES = "directors_notes"
+PROMPTS = "prompts"
+
+# Job statuses
+PENDING = "pending"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+INTERRUPTED = "interrupted"
+
+def _encode(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, default=str)
+
+class BulkJobStore:
+    """SQLite store for bulk generation jobs and their per-row checkpoints.
+
+    A job keeps its input shot list and parameters, so it can be resumed after a crash or a closed
+    browser. Each finished row is committed as soon as it comes back from the LLM; resuming only
+    regenerates the rows that have no result yet. Jobs that were running when the process stopped
+    are marked interrupted on startup.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "id TEXT PRIMARY KEY, kind TEXT NOT NULL, status TEXT NOT NULL, params TEXT NOT NULL, "
+            "total INTEGER NOT NULL, completed INTEGER NOT NULL DEFAULT 0, error TEXT, "
+            "created TEXT NOT NULL, updated TEXT NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS job_rows ("
+            "job_id TEXT NOT NULL REFERENCES jobs(id) ON DELETE CASCADE, position INTEGER NOT NULL, "
+            "input TEXT NOT NULL, result TEXT, PRIMARY KEY (job_id, position))"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_updated ON jobs (updated)")
+        with self._conn:
+            self._conn.execute("UPDATE jobs SET status = ? WHERE status = ?", (INTERRUPTED, RUNNING))
+
+    def create_job(self, kind: str, rows: List[Dict[str, Any]], params: Dict[str, Any]) -> str:
+        """Stores a new pending job over rows and returns its ID."""
+        job_id = uuid.uuid4().hex[:12]
+        now = datetime.now().isoformat()
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO jobs (id, kind, status, params, total, created, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (job_id, kind, PENDING, _encode(params), len(rows), now, now)
+            )
+            self._conn.executemany(
+                "INSERT INTO job_rows (job_id, position, input) VALUES (?, ?, ?)",
+                [(job_id, position, _encode(row)) for position, row in enumerate(rows)]
+            )
+        return job_id
+
+    def checkpoint(self, job_id: str, position: int, result: Dict[str, Any]) -> None:
+        """Durably records the generated columns for one row."""
+        with self._lock, self._conn:
+            updated = self._conn.execute(
+                "UPDATE job_rows SET result = ? WHERE job_id = ? AND position = ? AND result IS NULL",
+                (_encode(result), job_id, position)
+            ).rowcount
+            self._conn.execute(
+                "UPDATE jobs SET completed = completed + ?, updated = ? WHERE id = ?",
+                (updated, datetime.now().isoformat(), job_id)
+            )
+
+    def set_status(self, job_id: str, status: str, error: Optional[str] = None) -> None:
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET status = ?, error = ?, updated = ? WHERE id = ?",
+                (status, error, datetime.now().isoformat(), job_id)
+            )
+
+    def get_job(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, kind, status, params, total, completed, error, created, updated FROM jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+        return self._job(row) if row else None
+
+    def list_jobs(self, limit: int = 20) -> List[Dict[str, Any]]:
+        """Returns the most recently updated jobs first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT id, kind, status, params, total, completed, error, created, updated "
+                "FROM jobs ORDER BY updated DESC LIMIT ?",
+                (limit,)
+            ).fetchall()
+        return [self._job(row) for row in rows]
+
+    def load_rows(self, job_id: str) -> List[Dict[str, Any]]:
+        """Returns the input rows with every checkpointed result merged in, in their original order."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT input, result FROM job_rows WHERE job_id = ? ORDER BY position", (job_id,)
+            ).fetchall()
+        merged = []
+        for data, result in rows:
+            row = json.loads(data)
+            if result is not None:
+                row.update(json.loads(result))
+            merged.append(row)
+        return merged
+
+    def completed_positions(self, job_id: str) -> List[int]:
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT position FROM job_rows WHERE job_id = ? AND result IS NOT NULL ORDER BY position", (job_id,)
+            ).fetchall()
+        return [position for position, in rows]
+
+    def delete_job(self, job_id: str) -> bool:
+        with self._lock, self._conn:
+            return self._conn.execute("DELETE FROM jobs WHERE id = ?", (job_id,)).rowcount > 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+    @staticmethod
+    def _job(row: tuple) -> Dict[str, Any]:
+        job_id, kind, status, params, total, completed, error, created, updated = row
+        return {
+            "id": job_id, "kind": kind, "status": status, "params": json.loads(params), "total": total,
+            "completed": completed, "error": error, "created": created, "updated": updated
+        }
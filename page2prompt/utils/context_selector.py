@@ -0,0 +1,65 @@
+import logging
+from typing import Optional
+from .llm_scheduler import estimate_tokens
+from .script_alignment import ScriptAlignmentIndex
+
+logger = logging.getLogger(__name__)
+
+class ContextSelector:
+    """Chooses the part of the script sent with a prompt instead of the whole script.
+
+    The scene containing the anchor (the highlighted text, else the fallback such as the shot's script
+    reference) is always included, then up to neighbour_scenes scenes on either side, nearest first,
+    while the total stays within max_tokens. A scene that alone exceeds the budget is cut down to a
+    window around the anchor. Scripts that already fit the budget are sent whole, and when no anchor
+    is found in the script the opening of the script is sent, cut to the budget.
+    """
+
+    def __init__(self, max_tokens: int = 800, neighbour_scenes: int = 1, index: Optional[ScriptAlignmentIndex] = None):
+        self.max_tokens = max_tokens
+        self.neighbour_scenes = neighbour_scenes
+        self.index = index or ScriptAlignmentIndex()
+
+    def select(self, full_script: Optional[str], anchor_text: Optional[str], fallback_anchor: Optional[str] = None) -> str:
+        full_script = full_script or ""
+        if estimate_tokens(full_script) <= self.max_tokens:
+            return full_script
+
+        self.index.update_script(full_script)
+        alignment = None
+        for anchor in (anchor_text, fallback_anchor):
+            if anchor and anchor.strip():
+                alignment = self.index.locate(anchor)
+                if alignment is not None:
+                    break
+        if alignment is None:
+            # Nothing tells which scene matters, so send as much of the script as the budget allows
+            logger.debug("No script anchor found; sending the opening of the script")
+            return self._window(full_script, 0, 0)
+
+        scenes = self.index.scenes
+        position = self.index.scene_at(alignment.start).number - 1
+        scene = scenes[position]
+        if estimate_tokens(scene.text) > self.max_tokens:
+            return self._window(full_script, alignment.start, alignment.end)
+
+        first = last = position
+        used = estimate_tokens(scene.text)
+        for distance in range(1, self.neighbour_scenes + 1):
+            for neighbour in (position - distance, position + distance):
+                if not 0 <= neighbour < len(scenes):
+                    continue
+                cost = estimate_tokens(scenes[neighbour].text)
+                # Only extend while the selection stays one contiguous block
+                if used + cost > self.max_tokens or neighbour not in (first - 1, last + 1):
+                    continue
+                used += cost
+                first, last = min(first, neighbour), max(last, neighbour)
+        return full_script[scenes[first].start:scenes[last].end]
+
+    def _window(self, full_script: str, start: int, end: int) -> str:
+        # About four characters per token, centred on the anchor
+        width = self.max_tokens * 4
+        middle = (start + end) // 2
+        begin = max(0, min(middle - width // 2, len(full_script) - width))
+        return full_script[begin:begin + width]
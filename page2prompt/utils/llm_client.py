@@ -0,0 +1,108 @@
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional, Tuple
+import httpx
+from langchain_openai import ChatOpenAI
+from openai import OpenAI
+
+logger = logging.getLogger(__name__)
+
+# Placeholder key for a local OpenAI-compatible server, which usually doesn't check it
+LOCAL_API_KEY = "not-needed"
+
+class LLMClientFactory:
+    """Builds every OpenAI and langchain chat client in the process on one pair of pooled HTTP clients.
+
+    Connections are kept alive and shared, so calls from different components reuse them instead of
+    setting up a new TLS connection each time, and the pool size and timeouts are tuned here only.
+    base_url points all clients at another OpenAI-compatible endpoint, such as a local stand-in server.
+    The clients don't retry on their own; the shared LLMScheduler does that.
+    """
+
+    def __init__(self, api_key: Optional[str] = None, base_url: Optional[str] = None, max_connections: int = 20,
+                 max_keepalive_connections: int = 10, keepalive_expiry: float = 60.0, timeout: float = 120.0,
+                 connect_timeout: float = 10.0):
+        self._api_key = api_key
+        self.base_url = base_url or None
+        self.max_connections = max_connections
+        self.max_keepalive_connections = max_keepalive_connections
+        self.keepalive_expiry = keepalive_expiry
+        self.timeout = timeout
+        self.connect_timeout = connect_timeout
+        self._http_client: Optional[httpx.Client] = None
+        self._async_http_client: Optional[httpx.AsyncClient] = None
+        self._chat_models: Dict[Tuple[str, float, str], Any] = {}
+        self._openai_client: Optional[OpenAI] = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "LLMClientFactory":
+        return cls(
+            base_url=os.environ.get("OPENAI_BASE_URL"),
+            max_connections=int(os.environ.get("LLM_MAX_CONNECTIONS", 20)),
+            max_keepalive_connections=int(os.environ.get("LLM_MAX_KEEPALIVE_CONNECTIONS", 10)),
+            timeout=float(os.environ.get("LLM_TIMEOUT", 120)),
+            connect_timeout=float(os.environ.get("LLM_CONNECT_TIMEOUT", 10))
+        )
+
+    @property
+    def api_key(self) -> Optional[str]:
+        # Read at use time so a key set after import (e.g. by the UI or a test) is picked up
+        api_key = self._api_key or os.environ.get("OPENAI_API_KEY")
+        if not api_key and self.base_url:
+            return LOCAL_API_KEY
+        return api_key
+
+    def limits(self) -> httpx.Limits:
+        return httpx.Limits(max_connections=self.max_connections, max_keepalive_connections=self.max_keepalive_connections,
+                            keepalive_expiry=self.keepalive_expiry)
+
+    def timeouts(self) -> httpx.Timeout:
+        return httpx.Timeout(self.timeout, connect=self.connect_timeout)
+
+    @property
+    def http_client(self) -> httpx.Client:
+        with self._lock:
+            if self._http_client is None:
+                self._http_client = httpx.Client(limits=self.limits(), timeout=self.timeouts())
+            return self._http_client
+
+    @property
+    def async_http_client(self) -> httpx.AsyncClient:
+        with self._lock:
+            if self._async_http_client is None:
+                self._async_http_client = httpx.AsyncClient(limits=self.limits(), timeout=self.timeouts())
+            return self._async_http_client
+
+    def chat_model(self, model_name: str, temperature: float = 0.7, api_key: Optional[str] = None) -> ChatOpenAI:
+        """The shared langchain chat model for model_name and temperature, created on first use."""
+        api_key = api_key or self.api_key
+        key = (model_name, temperature, api_key or "")
+        http_client, async_http_client = self.http_client, self.async_http_client
+        with self._lock:
+            if key not in self._chat_models:
+                logger.info(f"Creating chat model {model_name} (temperature {temperature}){f' at {self.base_url}' if self.base_url else ''}")
+                self._chat_models[key] = ChatOpenAI(
+                    model_name=model_name,
+                    temperature=temperature,
+                    openai_api_key=api_key,
+                    base_url=self.base_url,
+                    http_client=http_client,
+                    http_async_client=async_http_client,
+                    timeout=self.timeouts(),
+                    max_retries=0
+                )
+            return self._chat_models[key]
+
+    def openai_client(self) -> OpenAI:
+        """The shared OpenAI SDK client, e.g. for audio transcription."""
+        http_client = self.http_client
+        with self._lock:
+            if self._openai_client is None:
+                self._openai_client = OpenAI(api_key=self.api_key, base_url=self.base_url, http_client=http_client,
+                                             timeout=self.timeouts(), max_retries=0)
+            return self._openai_client
+
+# Shared by every LLM caller in the process; OPENAI_BASE_URL and the LLM_* variables tune it without code changes
+llm_clients = LLMClientFactory.from_env()
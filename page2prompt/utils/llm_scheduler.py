@@ -0,0 +1,286 @@
+import asyncio
+import logging
+import os
+import random
+import threading
+import time
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Iterator, Optional, TypeVar
+
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Exception class names (openai, httpx, langchain) that mean "try again later" rather than "bad request"
+RETRYABLE_ERROR_NAMES = {
+    "RateLimitError", "APIConnectionError", "APITimeoutError", "InternalServerError",
+    "ServiceUnavailableError", "Timeout", "TimeoutException", "ConnectError", "ReadTimeout"
+}
+
+# Priority lanes: interactive calls preempt bulk work for rate-limit budget
+INTERACTIVE = "interactive"
+BULK = "bulk"
+
+# How often a bulk call waiting behind interactive calls checks again
+BULK_POLL_INTERVAL = 0.05
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while the circuit breaker is open."""
+
+def estimate_tokens(*texts: Optional[str]) -> int:
+    """Rough token count (about four characters per token) used to charge the tokens-per-minute budget."""
+    return sum(len(text) for text in texts if text) // 4 + 1
+
+def _status_code(error: BaseException) -> Optional[int]:
+    status = getattr(error, "status_code", None)
+    if status is None:
+        status = getattr(getattr(error, "response", None), "status_code", None)
+    return status if isinstance(status, int) else None
+
+def is_retryable(error: BaseException) -> bool:
+    """True for rate limits (429), server errors (5xx), timeouts and connection failures."""
+    status = _status_code(error)
+    if status is not None:
+        return status == 429 or status >= 500
+    return type(error).__name__ in RETRYABLE_ERROR_NAMES or isinstance(error, (asyncio.TimeoutError, ConnectionError))
+
+def _retry_after(error: BaseException) -> Optional[float]:
+    headers = getattr(getattr(error, "response", None), "headers", None) or {}
+    try:
+        return float(headers.get("retry-after"))
+    except (TypeError, ValueError):
+        return None
+
+class TokenBucket:
+    """Refills at rate_per_minute / 60 per second up to capacity.
+
+    reserve() always takes the tokens and returns how long the caller must wait before using them, so
+    concurrent callers queue up behind each other instead of all waking at once. take() only succeeds
+    while headroom tokens stay available, which keeps that headroom free for reserve() callers.
+    """
+
+    def __init__(self, rate_per_minute: float, capacity: Optional[float] = None):
+        self.rate = rate_per_minute / 60.0
+        self.capacity = capacity or rate_per_minute
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, amount: float) -> float:
+        with self._lock:
+            self._refill()
+            self.tokens -= min(amount, self.capacity)
+            return 0.0 if self.tokens >= 0 else -self.tokens / self.rate
+
+    def shortfall(self, amount: float, headroom: float = 0.0) -> float:
+        """Seconds until amount can be taken while leaving headroom; 0 if it can be taken now."""
+        with self._lock:
+            self._refill()
+            missing = min(amount, self.capacity - headroom) + headroom - self.tokens
+            return max(missing, 0.0) / self.rate
+
+    def take(self, amount: float, headroom: float = 0.0) -> None:
+        with self._lock:
+            self.tokens -= min(amount, self.capacity - headroom)
+
+class CircuitBreaker:
+    """Opens after failure_threshold consecutive retryable failures and fails fast for reset_timeout seconds.
+
+    After the timeout one trial call is let through (half-open); its outcome closes or re-opens the circuit.
+    """
+
+    def __init__(self, failure_threshold: int = 5, reset_timeout: float = 30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        if self.opened_at is None:
+            return "closed"
+        return "half_open" if time.monotonic() - self.opened_at >= self.reset_timeout else "open"
+
+    def before_call(self) -> None:
+        with self._lock:
+            state = self.state
+            if state == "open" or (state == "half_open" and self._trial_in_flight):
+                raise CircuitOpenError("LLM provider unavailable; circuit breaker is open")
+            if state == "half_open":
+                self._trial_in_flight = True
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self._trial_in_flight = False
+            if self.failures >= self.failure_threshold or self.opened_at is not None:
+                if self.opened_at is None:
+                    logger.warning(f"Opening LLM circuit breaker after {self.failures} consecutive failures")
+                self.opened_at = time.monotonic()
+
+    def release_trial(self) -> None:
+        """Frees the half-open trial slot without a verdict, e.g. when the trial call was cancelled."""
+        with self._lock:
+            self._trial_in_flight = False
+
+class LLMScheduler:
+    """Shared gate in front of every LLM call: RPM/TPM budgets, retries with jittered backoff, circuit breaker.
+
+    Calls come in two priority lanes. INTERACTIVE calls (a user waiting on a prompt) reserve budget
+    immediately and may use all of it. BULK calls only take budget while interactive_reserve of each
+    bucket stays free and no interactive call is waiting, so a running bulk job never queues ahead of
+    an interactive request.
+    """
+
+    def __init__(self, requests_per_minute: float = 500, tokens_per_minute: float = 200_000, max_retries: int = 5,
+                 base_delay: float = 1.0, max_delay: float = 60.0, failure_threshold: int = 5, reset_timeout: float = 30.0,
+                 interactive_reserve: float = 0.2):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.breaker = CircuitBreaker(failure_threshold, reset_timeout)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.interactive_reserve = interactive_reserve
+        self.interactive_waiting = 0
+        self._lock = threading.Lock()
+
+    def _reserve_interactive(self, estimated_tokens: int) -> float:
+        with self._lock:
+            self.interactive_waiting += 1
+            return max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+
+    def _interactive_admitted(self) -> None:
+        with self._lock:
+            self.interactive_waiting -= 1
+
+    def _take_bulk(self, estimated_tokens: int) -> float:
+        """Takes budget for a bulk call and returns 0, or returns how long to wait before asking again."""
+        with self._lock:
+            if self.interactive_waiting:
+                return BULK_POLL_INTERVAL
+            request_headroom = self.requests.capacity * self.interactive_reserve
+            token_headroom = self.tokens.capacity * self.interactive_reserve
+            delay = max(self.requests.shortfall(1, request_headroom), self.tokens.shortfall(estimated_tokens, token_headroom))
+            if delay:
+                return max(delay, BULK_POLL_INTERVAL)
+            self.requests.take(1, request_headroom)
+            self.tokens.take(estimated_tokens, token_headroom)
+            return 0.0
+
+    def _backoff(self, attempt: int, error: BaseException) -> float:
+        # Full jitter keeps a burst of failed requests from retrying in lockstep
+        delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        return max(delay, _retry_after(error) or 0.0)
+
+    def _should_retry(self, error: BaseException, attempt: int) -> bool:
+        return is_retryable(error) and attempt < self.max_retries and self.breaker.state == "closed"
+
+    async def throttle(self, estimated_tokens: int = 0, priority: str = BULK) -> None:
+        """Waits for budget without retrying; for streaming calls, which then run inside outcome()."""
+        if priority == INTERACTIVE:
+            delay = self._reserve_interactive(estimated_tokens)
+            try:
+                if delay:
+                    await asyncio.sleep(delay)
+            finally:
+                self._interactive_admitted()
+        else:
+            delay = self._take_bulk(estimated_tokens)
+            while delay:
+                await asyncio.sleep(delay)
+                delay = self._take_bulk(estimated_tokens)
+        self.breaker.before_call()
+
+    def _throttle_sync(self, estimated_tokens: int, priority: str) -> None:
+        if priority == INTERACTIVE:
+            delay = self._reserve_interactive(estimated_tokens)
+            try:
+                if delay:
+                    time.sleep(delay)
+            finally:
+                self._interactive_admitted()
+        else:
+            delay = self._take_bulk(estimated_tokens)
+            while delay:
+                time.sleep(delay)
+                delay = self._take_bulk(estimated_tokens)
+        self.breaker.before_call()
+
+    def record_success(self) -> None:
+        self.breaker.record_success()
+
+    def record_failure(self, error: BaseException) -> None:
+        if is_retryable(error):
+            self.breaker.record_failure()
+        elif not isinstance(error, CircuitOpenError):
+            # A request the provider rejected (e.g. a 400) still shows the provider is reachable
+            self.breaker.record_success()
+
+    @contextmanager
+    def outcome(self) -> Iterator[None]:
+        """Reports the enclosed call's outcome to the circuit breaker.
+
+        Used around every call admitted by throttle(). The half-open trial slot is always freed on the
+        way out, so a cancelled or abandoned trial can't leave the circuit stuck open.
+        """
+        try:
+            yield
+        except Exception as e:
+            self.record_failure(e)
+            raise
+        else:
+            self.record_success()
+        finally:
+            self.breaker.release_trial()
+
+    async def run(self, call: Callable[[], Awaitable[T]], estimated_tokens: int = 0, priority: str = BULK) -> T:
+        """Awaits call() within the rate budgets, retrying rate limits and server errors."""
+        attempt = 0
+        while True:
+            await self.throttle(estimated_tokens, priority)
+            try:
+                with self.outcome():
+                    return await call()
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                delay = self._backoff(attempt, e)
+                attempt += 1
+                logger.warning(f"LLM call failed ({type(e).__name__}: {e}); retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                await asyncio.sleep(delay)
+
+    def run_sync(self, call: Callable[[], T], estimated_tokens: int = 0, priority: str = BULK) -> T:
+        """Blocking variant of run() for synchronous clients."""
+        attempt = 0
+        while True:
+            self._throttle_sync(estimated_tokens, priority)
+            try:
+                with self.outcome():
+                    return call()
+            except Exception as e:
+                if not self._should_retry(e, attempt):
+                    raise
+                delay = self._backoff(attempt, e)
+                attempt += 1
+                logger.warning(f"LLM call failed ({type(e).__name__}: {e}); retry {attempt}/{self.max_retries} in {delay:.1f}s")
+                time.sleep(delay)
+
+# Budgets can be tuned per account tier without code changes
+scheduler = LLMScheduler(
+    requests_per_minute=float(os.environ.get("LLM_REQUESTS_PER_MINUTE", 500)),
+    tokens_per_minute=float(os.environ.get("LLM_TOKENS_PER_MINUTE", 200_000))
+)
@@ -0,0 +1,91 @@
+import atexit
+import logging
+import os
+import tempfile
+import threading
+import weakref
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Writers that still need a final flush when the interpreter exits
+_open_writers: "weakref.WeakSet[DebouncedWriter]" = weakref.WeakSet()
+
+def atomic_write(path: str, content: str, encoding: str = 'utf-8') -> None:
+    """Writes content to a temp file next to path and renames it over path.
+
+    Readers see either the old file or the new one, never a truncated file.
+    """
+    directory = os.path.dirname(path) or "."
+    os.makedirs(directory, exist_ok=True)
+    fd, temp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, 'w', newline='', encoding=encoding) as f:
+            f.write(content)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.remove(temp_path)
+        except OSError:
+            pass
+        raise
+
+class DebouncedWriter:
+    """Coalesces bursts of saves into one atomic write of the latest state.
+
+    mark_dirty() (re)starts a short timer; when it fires, render() is called for the full file
+    contents. flush() writes immediately, and every writer is flushed at interpreter exit.
+    """
+
+    def __init__(self, path: str, render: Callable[[], str], delay: float = 0.5):
+        self.path = path
+        self.render = render
+        self.delay = delay
+        self.writes = 0
+        self._dirty = False
+        self._timer: Optional[threading.Timer] = None
+        self._lock = threading.RLock()
+        _open_writers.add(self)
+
+    def mark_dirty(self) -> None:
+        """Schedules a write; calls within the debounce window share it."""
+        with self._lock:
+            self._dirty = True
+            if self._timer is not None:
+                self._timer.cancel()
+            if self.delay <= 0:
+                self._timer = None
+                self._write()
+                return
+            self._timer = threading.Timer(self.delay, self.flush)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def flush(self) -> None:
+        """Writes pending changes now, if there are any."""
+        with self._lock:
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._dirty:
+                self._write()
+
+    def _write(self) -> None:
+        try:
+            atomic_write(self.path, self.render())
+            self._dirty = False
+            self.writes += 1
+        except Exception as e:
+            logger.error(f"Error saving {self.path}: {str(e)}")
+
+    @property
+    def dirty(self) -> bool:
+        return self._dirty
+
+@atexit.register
+def flush_all() -> None:
+    """Flushes every live writer; runs automatically on shutdown."""
+    for writer in list(_open_writers):
+        writer.flush()
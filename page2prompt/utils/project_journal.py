@@ -0,0 +1,184 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from typing import Any, Dict, List, Optional
+from .project_store import ProjectStore
+from .script_alignment import common_affixes
+
+logger = logging.getLogger(__name__)
+
+TABLES = ("shot_list", "subjects", "prompts")
+
+def _encode(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+class ProjectJournal:
+    """Append-only change log for project autosave, compacted into the ProjectStore snapshot.
+
+    record() diffs the project against the last recorded state and appends one numbered JSON line per
+    change (a splice of the edited part of the script, a changed row, or a shortened table) and fsyncs,
+    so a crash loses at most the autosave being written. After compact_every deltas, or once the
+    journal reaches compact_bytes, the replayed state is saved to the store and the journal is
+    truncated. The snapshot stores the number of the last entry it includes, so entries left behind
+    by a crash before the truncate are skipped on replay instead of being applied twice. recover()
+    loads the snapshot and replays the journal entries newer than it.
+    """
+
+    def __init__(self, store: ProjectStore, directory: str, compact_every: int = 500, compact_bytes: int = 1_000_000):
+        self.store = store
+        self.directory = directory
+        self.compact_every = compact_every
+        self.compact_bytes = compact_bytes
+        self._states: Dict[str, Dict[str, Any]] = {}
+        self._pending: Dict[str, int] = {}
+        self._sizes: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        os.makedirs(directory, exist_ok=True)
+
+    def journal_path(self, name: str) -> str:
+        slug = re.sub(r'[^\w\-]', '_', name)[:50]
+        digest = hashlib.sha1(name.encode('utf-8')).hexdigest()[:8]
+        return os.path.join(self.directory, f"{slug}-{digest}.jsonl")
+
+    def record(self, name: str, full_script: str, shot_list: List[Dict[str, Any]],
+               subjects: List[Dict[str, Any]], prompts: List[str]) -> int:
+        """Appends the changes since the last recorded state; returns the number of deltas written."""
+        with self._lock:
+            state = self._state(name)
+            deltas = []
+            full_script = full_script or ""
+            if full_script != state["full_script"]:
+                # Only the edited span is written, so a keystroke in a long script stays a small entry
+                old = state["full_script"]
+                prefix, suffix = common_affixes(old, full_script)
+                deltas.append({"op": "splice", "start": prefix, "end": len(old) - suffix,
+                               "value": full_script[prefix:len(full_script) - suffix]})
+            for table, rows in (("shot_list", shot_list), ("subjects", subjects), ("prompts", prompts)):
+                current = state[table]
+                for position, row in enumerate(rows):
+                    encoded = _encode(row)
+                    if position >= len(current) or current[position] != encoded:
+                        deltas.append({"op": "row", "table": table, "position": position, "data": row})
+                if len(rows) < len(current):
+                    deltas.append({"op": "truncate", "table": table, "length": len(rows)})
+
+            if deltas:
+                for delta in deltas:
+                    state["seq"] += 1
+                    delta["seq"] = state["seq"]
+                self._append(name, deltas)
+                for delta in deltas:
+                    self._apply(state, delta)
+                self._pending[name] = self._pending.get(name, 0) + len(deltas)
+                if self._pending[name] >= self.compact_every or self._sizes.get(name, 0) >= self.compact_bytes:
+                    self._compact(name)
+            return len(deltas)
+
+    def compact(self, name: str) -> None:
+        """Saves the current state as the store snapshot and truncates the journal."""
+        with self._lock:
+            self._compact(name)
+
+    def recover(self, name: str) -> Optional[Dict[str, Any]]:
+        """Returns the snapshot with journaled changes replayed, or None if the project is unknown."""
+        with self._lock:
+            self._states.pop(name, None)
+            if self.store.load_project(name) is None and not os.path.exists(self.journal_path(name)):
+                return None
+            state = self._state(name)
+            return {
+                "name": name,
+                "full_script": state["full_script"],
+                "shot_list": [json.loads(row) for row in state["shot_list"]],
+                "subjects": [json.loads(row) for row in state["subjects"]],
+                "prompts": [json.loads(row) for row in state["prompts"]]
+            }
+
+    def discard(self, name: str) -> None:
+        """Forgets a project's journal, e.g. after the project was deleted."""
+        with self._lock:
+            self._states.pop(name, None)
+            self._pending.pop(name, None)
+            self._sizes.pop(name, None)
+            try:
+                os.remove(self.journal_path(name))
+            except FileNotFoundError:
+                pass
+
+    def _state(self, name: str) -> Dict[str, Any]:
+        state = self._states.get(name)
+        if state is not None:
+            return state
+        snapshot = self.store.load_project(name) or {}
+        state = {"full_script": snapshot.get("full_script", ""), "seq": snapshot.get("journal_seq", 0)}
+        snapshot_seq = state["seq"]
+        for table in TABLES:
+            state[table] = [_encode(row) for row in snapshot.get(table, [])]
+        replayed = 0
+        path = self.journal_path(name)
+        self._sizes[name] = os.path.getsize(path) if os.path.exists(path) else 0
+        if os.path.exists(path):
+            with open(path, 'r', encoding='utf-8') as f:
+                for line in f:
+                    try:
+                        delta = json.loads(line)
+                    except json.JSONDecodeError:
+                        # A crash can leave the last line half written; everything before it is intact
+                        logger.warning(f"Skipping unreadable journal entry for project '{name}'")
+                        continue
+                    if delta["seq"] <= snapshot_seq:
+                        # Already in the snapshot; compaction was interrupted before truncating
+                        continue
+                    self._apply(state, delta)
+                    state["seq"] = delta["seq"]
+                    replayed += 1
+        self._states[name] = state
+        self._pending[name] = replayed
+        return state
+
+    @staticmethod
+    def _apply(state: Dict[str, Any], delta: Dict[str, Any]) -> None:
+        if delta["op"] == "splice":
+            script = state["full_script"]
+            state["full_script"] = script[:delta["start"]] + delta["value"] + script[delta["end"]:]
+        elif delta["op"] == "row":
+            rows = state[delta["table"]]
+            encoded = _encode(delta["data"])
+            if delta["position"] < len(rows):
+                rows[delta["position"]] = encoded
+            else:
+                rows.append(encoded)
+        elif delta["op"] == "truncate":
+            del state[delta["table"]][delta["length"]:]
+
+    def _append(self, name: str, deltas: List[Dict[str, Any]]) -> None:
+        data = "".join(_encode(delta) + "\n" for delta in deltas).encode('utf-8')
+        with open(self.journal_path(name), 'ab+') as f:
+            # Start on a fresh line if the previous write was cut short
+            if f.seek(0, os.SEEK_END) > 0:
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b"\n":
+                    data = b"\n" + data
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        self._sizes[name] = self._sizes.get(name, 0) + len(data)
+
+    def _compact(self, name: str) -> None:
+        state = self._state(name)
+        self.store.save_project(
+            name,
+            state["full_script"],
+            [json.loads(row) for row in state["shot_list"]],
+            [json.loads(row) for row in state["subjects"]],
+            [json.loads(row) for row in state["prompts"]],
+            journal_seq=state["seq"]
+        )
+        # The snapshot now holds everything, so the journal can start over
+        open(self.journal_path(name), 'w').close()
+        self._pending[name] = 0
+        self._sizes[name] = 0
+        logger.debug(f"Compacted journal for project '{name}'")
@@ -0,0 +1,160 @@
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Tables that hold one row per list entry, keyed by (project_id, position)
+ROW_TABLES = ("shots", "subjects", "prompts")
+
+class ProjectStore:
+    """SQLite store for projects: a metadata index plus script, shot, subject and prompt tables.
+
+    Listing reads only the projects table. Saving compares per-row hashes and writes only the rows
+    that were added, changed or removed, so re-saving a large shot list after a small edit is cheap.
+    journal_seq records the last ProjectJournal entry a snapshot includes, in the same transaction.
+    """
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        self._lock = threading.Lock()
+
+        directory = os.path.dirname(db_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(db_path, check_same_thread=False)
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.execute("PRAGMA journal_mode = WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS projects ("
+            "id INTEGER PRIMARY KEY, name TEXT NOT NULL UNIQUE, last_modified TEXT NOT NULL, "
+            "shot_count INTEGER NOT NULL DEFAULT 0, subject_count INTEGER NOT NULL DEFAULT 0, "
+            "prompt_count INTEGER NOT NULL DEFAULT 0, journal_seq INTEGER NOT NULL DEFAULT 0)"
+        )
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS scripts ("
+            "project_id INTEGER PRIMARY KEY REFERENCES projects(id) ON DELETE CASCADE, "
+            "content TEXT NOT NULL, content_hash TEXT NOT NULL)"
+        )
+        for table in ROW_TABLES:
+            self._conn.execute(
+                f"CREATE TABLE IF NOT EXISTS {table} ("
+                "project_id INTEGER NOT NULL REFERENCES projects(id) ON DELETE CASCADE, "
+                "position INTEGER NOT NULL, row_hash TEXT NOT NULL, data TEXT NOT NULL, "
+                "PRIMARY KEY (project_id, position))"
+            )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_projects_last_modified ON projects (last_modified)")
+        self._conn.commit()
+
+    @staticmethod
+    def _hash(data: str) -> str:
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+    def list_projects(self) -> List[Dict[str, Any]]:
+        """Returns name, last-modified time and row counts for every project, newest first."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT name, last_modified, shot_count, subject_count, prompt_count "
+                "FROM projects ORDER BY last_modified DESC"
+            ).fetchall()
+        return [
+            {"name": name, "last_modified": last_modified, "shots": shots, "subjects": subjects, "prompts": prompts}
+            for name, last_modified, shots, subjects, prompts in rows
+        ]
+
+    def save_project(self, name: str, full_script: str, shot_list: List[Dict[str, Any]],
+                     subjects: List[Dict[str, Any]], prompts: List[str], journal_seq: Optional[int] = None) -> Dict[str, int]:
+        """Creates or updates a project and returns how many rows were written per table.
+
+        journal_seq, if given, is stored with the snapshot; otherwise the stored value is kept.
+        """
+        rows = {
+            "shots": [json.dumps(row, ensure_ascii=False, default=str) for row in shot_list],
+            "subjects": [json.dumps(row, ensure_ascii=False, default=str) for row in subjects],
+            "prompts": [json.dumps(prompt, ensure_ascii=False) for prompt in prompts]
+        }
+        full_script = full_script or ""
+        script_hash = self._hash(full_script)
+        now = datetime.now().isoformat()
+
+        with self._lock, self._conn:
+            self._conn.execute(
+                "INSERT INTO projects (name, last_modified, shot_count, subject_count, prompt_count) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET last_modified = excluded.last_modified, shot_count = excluded.shot_count, "
+                "subject_count = excluded.subject_count, prompt_count = excluded.prompt_count",
+                (name, now, len(rows["shots"]), len(rows["subjects"]), len(rows["prompts"]))
+            )
+            project_id = self._conn.execute("SELECT id FROM projects WHERE name = ?", (name,)).fetchone()[0]
+            if journal_seq is not None:
+                self._conn.execute("UPDATE projects SET journal_seq = ? WHERE id = ?", (journal_seq, project_id))
+
+            written = {"script": 0}
+            current = self._conn.execute("SELECT content_hash FROM scripts WHERE project_id = ?", (project_id,)).fetchone()
+            if current is None or current[0] != script_hash:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO scripts (project_id, content, content_hash) VALUES (?, ?, ?)",
+                    (project_id, full_script, script_hash)
+                )
+                written["script"] = 1
+            for table in ROW_TABLES:
+                written[table] = self._sync_rows(table, project_id, rows[table])
+
+        logger.debug(f"Saved project '{name}': {written}")
+        return written
+
+    def _sync_rows(self, table: str, project_id: int, rows: List[str]) -> int:
+        existing = dict(self._conn.execute(f"SELECT position, row_hash FROM {table} WHERE project_id = ?", (project_id,)))
+        changed = []
+        for position, data in enumerate(rows):
+            row_hash = self._hash(data)
+            if existing.get(position) != row_hash:
+                changed.append((project_id, position, row_hash, data))
+        if changed:
+            self._conn.executemany(
+                f"INSERT OR REPLACE INTO {table} (project_id, position, row_hash, data) VALUES (?, ?, ?, ?)", changed
+            )
+        removed = sum(1 for position in existing if position >= len(rows))
+        if removed:
+            self._conn.execute(f"DELETE FROM {table} WHERE project_id = ? AND position >= ?", (project_id, len(rows)))
+        return len(changed) + removed
+
+    def load_project(self, name: str) -> Optional[Dict[str, Any]]:
+        """Returns the project's script, shot list, subjects and prompts, or None if it doesn't exist."""
+        with self._lock:
+            project = self._conn.execute(
+                "SELECT id, last_modified, journal_seq FROM projects WHERE name = ?", (name,)
+            ).fetchone()
+            if project is None:
+                return None
+            project_id, last_modified, journal_seq = project
+            script = self._conn.execute("SELECT content FROM scripts WHERE project_id = ?", (project_id,)).fetchone()
+            data = {
+                table: [json.loads(row[0]) for row in self._conn.execute(
+                    f"SELECT data FROM {table} WHERE project_id = ? ORDER BY position", (project_id,)
+                )]
+                for table in ROW_TABLES
+            }
+        return {
+            "name": name,
+            "full_script": script[0] if script else "",
+            "shot_list": data["shots"],
+            "subjects": data["subjects"],
+            "prompts": data["prompts"],
+            "last_modified": last_modified,
+            "journal_seq": journal_seq
+        }
+
+    def delete_project(self, name: str) -> bool:
+        """Deletes a project and all of its rows; returns False if it didn't exist."""
+        with self._lock, self._conn:
+            cursor = self._conn.execute("DELETE FROM projects WHERE name = ?", (name,))
+        return cursor.rowcount > 0
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
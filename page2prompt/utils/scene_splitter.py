@@ -0,0 +1,42 @@
+import hashlib
+import re
+from typing import List, NamedTuple
+
+# Scene headings start a line: "INT. KITCHEN - DAY", "EXT. PARK", "INT./EXT. CAR", "I/E. CAR", optionally numbered ("12 INT. ...")
+SCENE_HEADING_PATTERN = re.compile(
+    r'^[ \t]*(?:\d+[A-Z]?[.)]?[ \t]+)?(?:INT\.?/EXT\.|EXT\.?/INT\.|I/E\.|INT\.|EXT\.)',
+    re.MULTILINE
+)
+
+class Scene(NamedTuple):
+    number: int
+    heading: str
+    text: str
+    start: int
+    end: int
+
+def split_scenes(script: str) -> List[Scene]:
+    """Splits a script at INT./EXT. scene headings.
+
+    Scenes are numbered from 1 and carry their character offsets in the script, so together they
+    always cover the whole script. Text before the first heading (e.g. "FADE IN:") belongs to the
+    first scene; a script without headings is a single scene with an empty heading.
+    """
+    if not script or not script.strip():
+        return []
+
+    starts = [match.start() for match in SCENE_HEADING_PATTERN.finditer(script)] or [0]
+    starts[0] = 0
+
+    scenes = []
+    for number, (start, end) in enumerate(zip(starts, starts[1:] + [len(script)]), start=1):
+        text = script[start:end]
+        heading_match = SCENE_HEADING_PATTERN.search(text)
+        heading = text[heading_match.start():].split('\n', 1)[0].strip() if heading_match else ""
+        scenes.append(Scene(number, heading, text, start, end))
+    return scenes
+
+def scene_fingerprint(text: str) -> str:
+    """Returns a hash of the scene text that ignores whitespace-only edits."""
+    normalized = " ".join(text.split())
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
@@ -0,0 +1,182 @@
+import bisect
+import difflib
+import logging
+import re
+from typing import Iterable, List, NamedTuple, Optional, Tuple
+from .scene_splitter import Scene, split_scenes
+
+logger = logging.getLogger(__name__)
+
+_WHITESPACE = re.compile(r'\s+')
+
+class Alignment(NamedTuple):
+    start: int
+    end: int
+    # 1.0 for an exact or whitespace-insensitive match, otherwise the fuzzy similarity ratio
+    score: float
+
+def _common_length(old: str, new: str, limit: int, from_end: bool = False) -> int:
+    # Binary search over slice comparisons, which run in C, instead of a character-by-character loop
+    low, high = 0, limit
+    while low < high:
+        middle = (low + high + 1) // 2
+        if (old[len(old) - middle:] == new[len(new) - middle:]) if from_end else (old[:middle] == new[:middle]):
+            low = middle
+        else:
+            high = middle - 1
+    return low
+
+def common_affixes(old: str, new: str) -> Tuple[int, int]:
+    """Lengths of the common prefix and (non-overlapping) common suffix of old and new."""
+    limit = min(len(old), len(new))
+    prefix = _common_length(old, new, limit)
+    return prefix, _common_length(old, new, limit - prefix, from_end=True)
+
+class ScriptAlignmentIndex:
+    """Resolves shot Script References to character offsets in the full script.
+
+    A reference is looked up verbatim first, then ignoring whitespace differences, then fuzzily with
+    difflib (accepted at min_ratio similarity or better). Shots are aligned in order, each search
+    starting after the previous shot, so repeated lines map to successive occurrences.
+
+    update_script() keeps the index current while the script is edited: spans before or after the
+    edited region are kept (shifted if needed) and only spans overlapping the edit are resolved again.
+    """
+
+    def __init__(self, script: str = "", min_ratio: float = 0.6):
+        self.min_ratio = min_ratio
+        self.script = ""
+        self.scenes: List[Scene] = []
+        self.references: List[str] = []
+        self.alignments: List[Optional[Alignment]] = []
+        self._scene_starts: List[int] = []
+        self._normalized = ""
+        self._normalized_offsets: List[int] = []
+        self._spans: Optional[List[Tuple[int, int, int]]] = None
+        self.update_script(script)
+
+    def update_script(self, script: str) -> None:
+        script = script or ""
+        if script == self.script and self.scenes:
+            return
+        old_length = len(self.script)
+        prefix, suffix = common_affixes(self.script, script)
+        delta = len(script) - old_length
+        self.script = script
+        self.scenes = split_scenes(script)
+        self._scene_starts = [scene.start for scene in self.scenes]
+        self._normalized = None
+        self._spans = None
+
+        stale = []
+        for position, alignment in enumerate(self.alignments):
+            if alignment is None:
+                stale.append(position)
+            elif alignment.end <= prefix:
+                continue
+            elif alignment.start >= old_length - suffix:
+                self.alignments[position] = alignment._replace(start=alignment.start + delta, end=alignment.end + delta)
+            else:
+                stale.append(position)
+        for position in stale:
+            self.alignments[position] = self._resolve(self.references[position], self._search_start(position))
+
+    def set_references(self, references: Iterable[str]) -> List[Optional[Alignment]]:
+        """Aligns a shot list's references (in shot order); unchanged references keep their spans."""
+        references = ["" if reference is None else str(reference) for reference in references]
+        if references == self.references:
+            return self.alignments
+        old = dict(zip(self.references, self.alignments))
+        self.references = references
+        self._spans = None
+        self.alignments = []
+        for position, reference in enumerate(references):
+            alignment = old.get(reference)
+            if alignment is None or alignment.start < self._search_start(position):
+                alignment = self._resolve(reference, self._search_start(position))
+            self.alignments.append(alignment)
+        return self.alignments
+
+    def locate(self, text: str, start: int = 0) -> Optional[Alignment]:
+        """Finds text in the script, preferring a match at or after start."""
+        return self._resolve(text, start)
+
+    def shot_span(self, position: int) -> Optional[Alignment]:
+        if 0 <= position < len(self.alignments):
+            return self.alignments[position]
+        return None
+
+    def shot_at(self, offset: int) -> Optional[int]:
+        """Index of the shot whose span contains offset (the latest-starting one if spans overlap)."""
+        if self._spans is None:
+            self._spans = sorted((alignment.start, alignment.end, position)
+                                 for position, alignment in enumerate(self.alignments) if alignment)
+        index = bisect.bisect_right(self._spans, (offset, float("inf"), 0)) - 1
+        if index >= 0 and offset < self._spans[index][1]:
+            return self._spans[index][2]
+        return None
+
+    def scene_at(self, offset: int) -> Optional[Scene]:
+        if not self.scenes or offset < 0 or offset >= len(self.script):
+            return None
+        return self.scenes[bisect.bisect_right(self._scene_starts, offset) - 1]
+
+    def scene_for_text(self, text: str) -> Optional[Scene]:
+        """The scene containing text (e.g. the highlighted text), or None if it isn't in the script."""
+        alignment = self.locate(text)
+        return self.scene_at(alignment.start) if alignment else None
+
+    def _search_start(self, position: int) -> int:
+        for previous in reversed(self.alignments[:position]):
+            if previous is not None:
+                return previous.end
+        return 0
+
+    def _resolve(self, text: str, start: int = 0) -> Optional[Alignment]:
+        text = (text or "").strip()
+        if not text or not self.script or text.upper() == "N/A":
+            return None
+        for begin in (start, 0):
+            index = self.script.find(text, begin)
+            if index >= 0:
+                return Alignment(index, index + len(text), 1.0)
+        return self._normalized_match(text, start) or self._fuzzy_match(text)
+
+    def _normalized_match(self, text: str, start: int) -> Optional[Alignment]:
+        if self._normalized is None:
+            self._build_normalized()
+        needle = _WHITESPACE.sub(' ', text)
+        normalized_start = bisect.bisect_left(self._normalized_offsets, start)
+        for begin in (normalized_start, 0):
+            index = self._normalized.find(needle, begin)
+            if index >= 0:
+                end = index + len(needle) - 1
+                return Alignment(self._normalized_offsets[index], self._normalized_offsets[end] + 1, 1.0)
+        return None
+
+    def _build_normalized(self) -> None:
+        # Whitespace runs collapse to one space; offsets map each normalized character back to the script
+        characters, offsets = [], []
+        for match in re.finditer(r'\s+|\S+', self.script):
+            if match.group().isspace():
+                characters.append(' ')
+                offsets.append(match.start())
+            else:
+                characters.append(match.group())
+                offsets.extend(range(match.start(), match.end()))
+        self._normalized = "".join(characters)
+        self._normalized_offsets = offsets
+
+    def _fuzzy_match(self, text: str) -> Optional[Alignment]:
+        matcher = difflib.SequenceMatcher(None, self.script, text, autojunk=False)
+        anchor = matcher.find_longest_match(0, len(self.script), 0, len(text))
+        if not anchor.size:
+            return None
+        # Place the reference where its longest common run lines up, then score that window
+        start = max(0, anchor.a - anchor.b)
+        end = min(len(self.script), start + len(text))
+        score = difflib.SequenceMatcher(None, self.script[start:end], text, autojunk=False).ratio()
+        if score < self.min_ratio:
+            logger.debug(f"No alignment for script reference: {text[:80]}")
+            return None
+        return Alignment(start, end, score)
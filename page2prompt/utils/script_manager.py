@@ -1,25 +1,41 @@
-from typing import List, Dict, Optional
+from typing import AsyncIterator, List, Dict, Optional, Tuple
 import pandas as pd
 import json
 import logging
 from ..components.meta_chain import MetaChain
+from .scene_splitter import split_scenes, scene_fingerprint
+from .script_alignment import ScriptAlignmentIndex
+from .shot_list_parser import SHOT_LIST_COLUMNS, ShotListParser
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+def split_unique(values: pd.Series) -> List[str]:
+    """Unique comma-separated entries of values, stripped, in order of first appearance."""
+    values = values.dropna().astype(str)
+    if values.empty:
+        return []
+    # One join/split over the whole column is far cheaper than splitting and exploding row by row
+    return pd.Series(",".join(values).split(",")).str.strip().unique().tolist()
+
+def _new_subjects(names: List[str], description: str, subject_type: str) -> pd.DataFrame:
+    return pd.DataFrame({'Name': names, 'Description': description, 'Type': subject_type}, columns=['Name', 'Description', 'Type'])
+
 class ScriptManager:
     def __init__(self, meta_chain: MetaChain):
         self.meta_chain = meta_chain
         self.shot_list = pd.DataFrame(columns=["Timestamp", "Scene", "Shot", "Script Reference", "Shot Description", "Shot Size", "People", "Places"])
         self.proposed_subjects = pd.DataFrame(columns=["Name", "Description", "Type"])
+        # Per-scene fingerprints of the script self.shot_list was generated from (empty when unknown)
+        self.scene_fingerprints: List[str] = []
+        # Maps each row's Script Reference in self.shot_list to its offsets in the script
+        self.alignment = ScriptAlignmentIndex()
 
     def parse_llm_output(self, llm_output: str) -> pd.DataFrame:
-        rows = [row.split('|') for row in llm_output.strip().split('\n')]
-        df = pd.DataFrame(rows, columns=["Timestamp", "Scene", "Shot", "Script Reference", "Shot Description", "Shot Size", "People", "Places"])
-        return df
+        return pd.DataFrame(ShotListParser().parse(llm_output), columns=SHOT_LIST_COLUMNS)
 
-    async def generate_proposed_shot_list(self, full_script: str) -> pd.DataFrame:
-        response = await self.meta_chain.generate_proposed_shot_list(full_script)
+    async def generate_proposed_shot_list(self, full_script: str, by_scene: bool = False) -> pd.DataFrame:
+        response = await self.meta_chain.generate_proposed_shot_list(full_script, by_scene=by_scene)
         
         if isinstance(response, str):
             df = self.parse_llm_output(response)
@@ -27,7 +43,72 @@ class ScriptManager:
             df = response
         else:
             raise ValueError("Unexpected response type from MetaChain")
-        
+
+        df = self._normalize_shot_list(df)
+        self.shot_list = df
+        # Scene numbers only line up with split_scenes() when the list was generated scene by scene
+        self.scene_fingerprints = [scene_fingerprint(scene.text) for scene in split_scenes(full_script)] if by_scene else []
+        self.align_shot_list(full_script, df)
+        return df
+
+    async def stream_proposed_shot_list(self, full_script: str) -> AsyncIterator[Tuple[pd.DataFrame, ShotListParser]]:
+        """Yields the normalized shot list as rows stream in; the last yield is the complete list."""
+        df = self._normalize_shot_list(pd.DataFrame(columns=SHOT_LIST_COLUMNS))
+        async for rows, parser in self.meta_chain.stream_proposed_shot_list(full_script):
+            df = self._normalize_shot_list(rows)
+            yield df, parser
+        self.shot_list = df
+        self.scene_fingerprints = []
+        self.align_shot_list(full_script, df)
+
+    async def regenerate_proposed_shot_list(self, full_script: str, current_shot_list: Optional[pd.DataFrame] = None) -> pd.DataFrame:
+        """Re-prompts only the scenes whose text changed since the shot list was generated.
+
+        Rows of unchanged scenes are taken from current_shot_list (or the last generated list), so edits
+        made to them are kept; they are only renumbered if scenes were inserted or removed before them.
+        """
+        shot_list = self.shot_list if current_shot_list is None else current_shot_list
+        if not self.scene_fingerprints or shot_list is None or shot_list.empty:
+            return await self.generate_proposed_shot_list(full_script, by_scene=True)
+
+        scenes = split_scenes(full_script)
+        fingerprints = [scene_fingerprint(scene.text) for scene in scenes]
+        previous_scene_numbers = {}
+        for number, fingerprint in enumerate(self.scene_fingerprints, start=1):
+            previous_scene_numbers.setdefault(fingerprint, str(number))
+
+        changed_scenes = [scene for scene, fingerprint in zip(scenes, fingerprints) if fingerprint not in previous_scene_numbers]
+        logger.info(f"Regenerating {len(changed_scenes)} of {len(scenes)} scenes")
+        regenerated = dict(zip(
+            [scene.number for scene in changed_scenes],
+            await self.meta_chain.generate_scene_shot_lists(changed_scenes)
+        ))
+
+        previous_scenes = shot_list["Scene"].astype(str)
+        frames = []
+        for scene, fingerprint in zip(scenes, fingerprints):
+            if scene.number in regenerated:
+                frames.append(regenerated[scene.number])
+            else:
+                rows = shot_list[previous_scenes == previous_scene_numbers[fingerprint]].copy()
+                rows["Scene"] = str(scene.number)
+                frames.append(rows)
+
+        frames = [frame for frame in frames if not frame.empty]
+        df = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+        df = self._normalize_shot_list(df)
+        self.shot_list = df
+        self.scene_fingerprints = fingerprints
+        self.align_shot_list(full_script, df)
+        return df
+
+    def align_shot_list(self, full_script: str, shot_list: Optional[pd.DataFrame] = None) -> None:
+        """Brings the alignment index up to date with the script and the shot list's references."""
+        self.alignment.update_script(full_script)
+        if shot_list is not None and "Script Reference" in shot_list.columns:
+            self.alignment.set_references(shot_list["Script Reference"])
+
+    def _normalize_shot_list(self, df: pd.DataFrame) -> pd.DataFrame:
         # Ensure all required columns exist and are in the correct order
         required_columns = ["Timestamp", "Scene", "Shot", "Script Reference", "Shot Description", "Shot Size", "People", "Places"]
         for col in required_columns:
@@ -35,18 +116,12 @@ class ScriptManager:
                 df[col] = ""
         
         # Reorder columns to match the required order
-        df = df[required_columns]
+        df = df[required_columns].copy()
         
-        # Reset shot numbers for each scene
+        # Number shots from 1 within each run of consecutive rows sharing a scene
         if not df.empty:
-            shot_number = 1
-            current_scene = df.iloc[0]["Scene"]
-            for i, row in df.iterrows():
-                if row["Scene"] != current_scene:
-                    shot_number = 1
-                    current_scene = row["Scene"]
-                df.at[i, "Shot"] = shot_number
-                shot_number += 1
+            scene_blocks = (df["Scene"] != df["Scene"].shift()).cumsum()
+            df["Shot"] = df.groupby(scene_blocks).cumcount().to_numpy() + 1
         
         # Convert all columns to strings to ensure compatibility with gr.DataFrame
         df = df.astype(str)
@@ -58,35 +133,25 @@ class ScriptManager:
         self.proposed_shot_list.to_csv(file_path, index=False)
 
     def extract_unique_names(self, shot_list: pd.DataFrame) -> List[str]:
-        people = shot_list['People'].dropna().str.split(',').explode().str.strip()
-        return list(set(people))
+        return split_unique(shot_list['People'])
 
     def extract_unique_places(self, shot_list: pd.DataFrame) -> List[str]:
-        places = shot_list['Places'].dropna().str.split(',').explode().str.strip()
-        return list(set(places))
+        return split_unique(shot_list['Places'])
 
     def ensure_all_names_and_places_included(self, subjects_df: pd.DataFrame, unique_names: List[str], unique_places: List[str]) -> pd.DataFrame:
-        existing_names = set(subjects_df[subjects_df['Type'] == 'person']['Name'])
-        missing_names = set(unique_names) - existing_names
-        
-        for name in missing_names:
-            subjects_df = pd.concat([subjects_df, pd.DataFrame({
-                'Name': [name],
-                'Description': ['Character mentioned in the shot list'],
-                'Type': ['person']
-            })], ignore_index=True)
-        
-        existing_places = set(subjects_df[subjects_df['Type'] == 'place']['Name'])
-        missing_places = set(unique_places) - existing_places
-        
-        for place in missing_places:
-            subjects_df = pd.concat([subjects_df, pd.DataFrame({
-                'Name': [place],
-                'Description': ['Location mentioned in the shot list'],
-                'Type': ['place']
-            })], ignore_index=True)
-        
-        return subjects_df
+        existing_names = set(subjects_df.loc[subjects_df['Type'] == 'person', 'Name'])
+        existing_places = set(subjects_df.loc[subjects_df['Type'] == 'place', 'Name'])
+        missing_names = [name for name in dict.fromkeys(unique_names) if name not in existing_names]
+        missing_places = [place for place in dict.fromkeys(unique_places) if place not in existing_places]
+
+        # Build the missing rows once and append them in a single concat
+        missing = [
+            frame for frame in (
+                _new_subjects(missing_names, 'Character mentioned in the shot list', 'person'),
+                _new_subjects(missing_places, 'Location mentioned in the shot list', 'place')
+            ) if not frame.empty
+        ]
+        return pd.concat([subjects_df, *missing], ignore_index=True) if missing else subjects_df
 
     async def extract_proposed_subjects(self, full_script: str, shot_list: Optional[pd.DataFrame] = None) -> Dict[str, pd.DataFrame]:
         logger.info("Starting subject extraction process in ScriptManager")
@@ -104,8 +169,8 @@ class ScriptManager:
                     shot_list[col] = ""
         
             # Extract unique people and places
-            people = set(shot_list['People'].str.split(',').explode().str.strip().unique())
-            places = set(shot_list['Places'].str.split(',').explode().str.strip().unique())
+            people = split_unique(shot_list['People'])
+            places = split_unique(shot_list['Places'])
         
             # Create subjects list
             subjects = [{"Name": name, "Type": "person", "Description": ""} for name in people if name and name != 'N/A']
@@ -130,20 +195,14 @@ class ScriptManager:
             return {"subjects": pd.DataFrame(columns=["Name", "Description", "Type"])}
 
     def approve_proposed_subjects(self):
-        # Create a set of all unique people from the shot list
-        all_people = set()
-        for _, row in self.shot_list.iterrows():
-            people = [person.strip() for person in row['People'].split(',') if person.strip()]
-            all_people.update(people)
-        
-        # Add all subjects from the shot list to the proposed subjects
-        for person in all_people:
-            if person not in self.proposed_subjects['Name'].values:
-                self.proposed_subjects = pd.concat([self.proposed_subjects, pd.DataFrame({
-                    'Name': [person],
-                    'Description': ['Description pending based on script analysis.'],
-                    'Type': ['person']
-                })], ignore_index=True)
+        # Add every person from the shot list that isn't proposed yet, in one concat
+        existing = set(self.proposed_subjects['Name'])
+        missing = [person for person in split_unique(self.shot_list['People']) if person and person not in existing]
+        if missing:
+            self.proposed_subjects = pd.concat([
+                self.proposed_subjects,
+                _new_subjects(missing, 'Description pending based on script analysis.', 'person')
+            ], ignore_index=True)
         
         return self.proposed_subjects
 
@@ -1,10 +1,20 @@
 import pandas as pd
 import io
-from typing import List, Dict
+from typing import List, Dict, Optional
 from page2prompt.components.meta_chain import MetaChain
 
-async def generate_shot_list(concept: str, genre: str, descriptors: str, lyrics: str, chat_history: List[List[str]], approved_treatment: str, characters: pd.DataFrame) -> pd.DataFrame:
-    meta_chain = MetaChain()
+_shared_meta_chain: Optional[MetaChain] = None
+
+def _default_meta_chain() -> MetaChain:
+    # Built once on first use, so callers that don't pass a MetaChain still share one client
+    global _shared_meta_chain
+    if _shared_meta_chain is None:
+        _shared_meta_chain = MetaChain()
+    return _shared_meta_chain
+
+async def generate_shot_list(concept: str, genre: str, descriptors: str, lyrics: str, chat_history: List[List[str]], approved_treatment: str, characters: pd.DataFrame, meta_chain: Optional[MetaChain] = None) -> pd.DataFrame:
+    # Reuse the app's MetaChain (and its LLM client and cache) instead of building one per click
+    meta_chain = meta_chain or _default_meta_chain()
     
     # Combine all inputs into a single prompt
     prompt = f"""
@@ -0,0 +1,112 @@
+import logging
+import re
+from typing import List, NamedTuple, Optional
+
+logger = logging.getLogger(__name__)
+
+SHOT_LIST_COLUMNS = ["Timestamp", "Scene", "Shot", "Script Reference", "Shot Description", "Shot Size", "People", "Places"]
+
+# Lines the model wraps around the rows rather than rows themselves
+_FENCE = re.compile(r'^\s*```')
+_TABLE_SEPARATOR = re.compile(r'^[\s|:\-]+$')
+_BULLET = re.compile(r'^\s*(?:[-*•]\s+)')
+_HEADER_WORDS = {"timestamp", "time", "scene", "shot", "reference", "script reference", "shot description",
+                 "description", "shot size", "size", "people", "places", "place", "location", "#"}
+
+# Rows with fewer fields than this are too damaged to guess at; shorter rows are missing trailing fields
+MIN_FIELDS = 6
+
+class QuarantinedLine(NamedTuple):
+    line: str
+    reason: str
+
+def split_fields(line: str) -> List[str]:
+    """Splits on pipes outside double quotes; falls back to a plain split if the quotes don't pair up."""
+    if line.count('"') % 2:
+        return line.split('|')
+    fields, current, quoted = [], [], False
+    for char in line:
+        if char == '"':
+            quoted = not quoted
+        if char == '|' and not quoted:
+            fields.append("".join(current))
+            current = []
+        else:
+            current.append(char)
+    fields.append("".join(current))
+    return fields
+
+class ShotListParser:
+    """Incremental parser for the pipe-delimited shot lists the LLM returns.
+
+    feed() takes text as it streams in and returns the rows completed by it; close() flushes the last
+    line. Code fences, markdown table borders and header rows are skipped. Rows with the wrong number
+    of fields are repaired when the intent is clear (surplus pipes are folded back into the description,
+    missing trailing fields become N/A); anything else is kept in quarantined instead of failing the list.
+    """
+
+    def __init__(self, columns: Optional[List[str]] = None):
+        self.columns = columns or SHOT_LIST_COLUMNS
+        self.rows: List[List[str]] = []
+        self.quarantined: List[QuarantinedLine] = []
+        self.repaired = 0
+        self._buffer = ""
+
+    def feed(self, chunk: str) -> List[List[str]]:
+        self._buffer += chunk
+        *lines, self._buffer = self._buffer.split('\n')
+        return self._parse_lines(lines)
+
+    def close(self) -> List[List[str]]:
+        lines, self._buffer = [self._buffer], ""
+        return self._parse_lines(lines)
+
+    def parse(self, content: str) -> List[List[str]]:
+        """Parses a complete response and returns all its rows."""
+        self.feed(content)
+        self.close()
+        return self.rows
+
+    def _parse_lines(self, lines: List[str]) -> List[List[str]]:
+        parsed = []
+        for line in lines:
+            row = self.parse_line(line)
+            if row is not None:
+                parsed.append(row)
+        self.rows.extend(parsed)
+        return parsed
+
+    def parse_line(self, line: str) -> Optional[List[str]]:
+        text = line.strip()
+        if not text or _FENCE.match(text) or _TABLE_SEPARATOR.match(text):
+            return None
+        if '|' not in text:
+            self._quarantine(line, "no fields")
+            return None
+
+        text = _BULLET.sub('', text)
+        # Markdown tables wrap each row in outer pipes
+        if text.startswith('|') and text.endswith('|'):
+            text = text[1:-1]
+        fields = [field.strip() for field in split_fields(text)]
+        if all(field.strip('*# ').lower() in _HEADER_WORDS for field in fields if field):
+            return None
+
+        expected = len(self.columns)
+        if len(fields) > expected:
+            # Surplus pipes almost always come from the free-text description
+            surplus = len(fields) - expected
+            description = self.columns.index("Shot Description") if "Shot Description" in self.columns else expected - 1
+            fields[description:description + surplus + 1] = ["|".join(fields[description:description + surplus + 1])]
+            self.repaired += 1
+        elif len(fields) < expected:
+            if len(fields) < MIN_FIELDS:
+                self._quarantine(line, f"{len(fields)} of {expected} fields")
+                return None
+            fields += ["N/A"] * (expected - len(fields))
+            self.repaired += 1
+        return [field[1:-1] if len(field) > 1 and field[0] == field[-1] == '"' else field for field in fields]
+
+    def _quarantine(self, line: str, reason: str) -> None:
+        logger.warning(f"Quarantined shot list line ({reason}): {line[:120]}")
+        self.quarantined.append(QuarantinedLine(line, reason))
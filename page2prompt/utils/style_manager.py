@@ -1,12 +1,17 @@
 import csv
+import io
 import os
 from typing import Dict, List, Tuple
 from langchain.prompts import PromptTemplate
+from .persistence import DebouncedWriter
+
+STYLE_FIELDNAMES = ["Style Name", "Prefix", "Suffix", "Genre", "Descriptors"]
 
 class StyleManager:
-    def __init__(self, styles_file: str):
+    def __init__(self, styles_file: str, save_delay: float = 0.5):
         self.styles_file = styles_file
         self.styles = self._load_styles()
+        self._writer = DebouncedWriter(styles_file, self._render_styles_csv, delay=save_delay)
 
     def _load_styles(self) -> List[Dict]:
         """Loads styles from the CSV file."""
@@ -91,11 +96,19 @@ class StyleManager:
         self._save_styles()
 
     def _save_styles(self) -> None:
-        """Saves the styles to the CSV file."""
-        with open(self.styles_file, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=["Style Name", "Prefix", "Suffix", "Genre", "Descriptors"])
-            writer.writeheader()
-            writer.writerows(self.styles)
+        """Marks the styles dirty; the CSV is rewritten once the burst of edits settles."""
+        self._writer.mark_dirty()
+
+    def flush(self) -> None:
+        """Writes pending style changes to the CSV file now."""
+        self._writer.flush()
+
+    def _render_styles_csv(self) -> str:
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=STYLE_FIELDNAMES)
+        writer.writeheader()
+        writer.writerows(list(self.styles))
+        return output.getvalue()
 
     def print_styles(self):
         """Prints the contents of the styles for debugging."""
@@ -1,7 +1,9 @@
 import csv
-import os
+import io
 import pandas as pd
-from typing import Dict, List, Optional, Tuple
+from typing import Dict, Iterable, List, Optional, Tuple
+from .alias_replacer import AliasReplacer
+from .persistence import DebouncedWriter, atomic_write
 
 class Subject:
     def __init__(self, name: str, description: str, alias: str, type: str, prefix: str = "", suffix: str = "", active: bool = True):
@@ -17,11 +19,139 @@ import logging
 
 logger = logging.getLogger(__name__)
 
+SUBJECT_FIELDNAMES = ["Name", "Description", "Alias", "Type", "Prefix", "Suffix", "Active"]
+
+class SubjectStore:
+    """Subjects keyed by name, with incrementally maintained alias, type and active-set indexes.
+
+    Names are unique; the first subject added under a name wins, as with the old list scans.
+    Each index keeps its names in insertion order, so listings follow the library order.
+    version increases on every change so derived data (e.g. the alias replacer) knows when to rebuild.
+    """
+
+    def __init__(self, subjects: Optional[List[Subject]] = None):
+        self.version = 0
+        self._by_name: Dict[str, Subject] = {}
+        self._by_alias: Dict[str, Dict[str, None]] = {}
+        self._by_type: Dict[str, Dict[str, None]] = {}
+        self._active: Dict[str, None] = {}
+        for subject in subjects or []:
+            self.add(subject)
+
+    def __len__(self) -> int:
+        return len(self._by_name)
+
+    def __contains__(self, name: str) -> bool:
+        return name in self._by_name
+
+    def __iter__(self):
+        return iter(self._by_name.values())
+
+    def get(self, name: str) -> Optional[Subject]:
+        return self._by_name.get(name)
+
+    def by_alias(self, alias: str) -> List[Subject]:
+        return [self._by_name[name] for name in self._by_alias.get(alias, ())]
+
+    def names_of_type(self, subject_type: str) -> List[str]:
+        return list(self._by_type.get(subject_type.lower(), ()))
+
+    def active(self) -> List[Subject]:
+        return [self._by_name[name] for name in self._active]
+
+    def is_active(self, name: str) -> bool:
+        return name in self._active
+
+    def add(self, subject: Subject) -> bool:
+        """Indexes a new subject; returns False if the name is already taken."""
+        if subject.name in self._by_name:
+            return False
+        self._by_name[subject.name] = subject
+        self._index(subject)
+        self.version += 1
+        return True
+
+    def replace(self, subject: Subject) -> bool:
+        """Swaps in a new version of an existing subject in place; returns False if the name is unknown.
+
+        Only the index entries whose key changed are moved, so listings keep the library order.
+        """
+        previous = self._by_name.get(subject.name)
+        if previous is None:
+            return False
+        self._by_name[subject.name] = subject
+        for index, old_key, new_key in ((self._by_alias, previous.alias, subject.alias),
+                                        (self._by_type, self._type_key(previous), self._type_key(subject))):
+            if old_key == new_key:
+                continue
+            if old_key:
+                self._discard(index, old_key, subject.name)
+            if new_key:
+                index[new_key] = self._ordered(index.get(new_key, {}), subject.name)
+        if subject.active != previous.active:
+            if subject.active:
+                self._active = self._ordered(self._active, subject.name)
+            else:
+                self._active.pop(subject.name, None)
+        self.version += 1
+        return True
+
+    def remove(self, name: str) -> Optional[Subject]:
+        subject = self._by_name.pop(name, None)
+        if subject is not None:
+            self._unindex(subject)
+            self.version += 1
+        return subject
+
+    def clear(self) -> None:
+        self._by_name.clear()
+        self._by_alias.clear()
+        self._by_type.clear()
+        self._active.clear()
+        self.version += 1
+
+    def _index(self, subject: Subject) -> None:
+        if subject.alias:
+            self._by_alias.setdefault(subject.alias, {})[subject.name] = None
+        if subject.type:
+            self._by_type.setdefault(subject.type.lower(), {})[subject.name] = None
+        if subject.active:
+            self._active[subject.name] = None
+
+    def _unindex(self, subject: Subject) -> None:
+        for index, key in ((self._by_alias, subject.alias), (self._by_type, self._type_key(subject))):
+            self._discard(index, key, subject.name)
+        self._active.pop(subject.name, None)
+
+    @staticmethod
+    def _type_key(subject: Subject) -> Optional[str]:
+        return subject.type.lower() if subject.type else None
+
+    @staticmethod
+    def _discard(index: Dict[str, Dict[str, None]], key: Optional[str], name: str) -> None:
+        names = index.get(key)
+        if names is not None:
+            names.pop(name, None)
+            if not names:
+                del index[key]
+
+    def _ordered(self, names: Dict[str, None], name: str) -> Dict[str, None]:
+        # Adds name to an index set at its library position rather than at the end
+        names = {**names, name: None}
+        return {other: None for other in self._by_name if other in names}
+
 class SubjectManager:
-    def __init__(self, subjects_file: str):
+    def __init__(self, subjects_file: str, save_delay: float = 0.5):
         self.subjects_file = subjects_file
-        self.subjects: List[Subject] = self._load_subjects()
-        logger.debug(f"Loaded subjects: {self.subjects}")
+        self.store = SubjectStore(self._load_subjects())
+        self._writer = DebouncedWriter(subjects_file, self._render_subjects_csv, delay=save_delay)
+        self._alias_replacers: Dict[Optional[frozenset], AliasReplacer] = {}
+        self._alias_replacers_version = self.store.version
+        logger.debug(f"Loaded {len(self.store)} subjects")
+
+    @property
+    def subjects(self) -> List[Subject]:
+        return list(self.store)
 
     def _load_subjects(self) -> List[Subject]:
         subjects = []
@@ -40,10 +170,7 @@ class SubjectManager:
                     ))
         except FileNotFoundError:
             # Create the file if it doesn't exist
-            os.makedirs(os.path.dirname(self.subjects_file), exist_ok=True)
-            with open(self.subjects_file, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=["Name", "Description", "Alias", "Type", "Prefix", "Suffix", "Active"])
-                writer.writeheader()
+            atomic_write(self.subjects_file, ",".join(SUBJECT_FIELDNAMES) + "\r\n")
         return subjects
 
     def get_subjects(self) -> List[Subject]:
@@ -52,66 +179,71 @@ class SubjectManager:
 
     def get_active_subjects(self) -> List[Subject]:
         """Returns a list of active subjects."""
-        return [s for s in self.subjects if s.active]
+        return self.store.active()
 
     def get_people(self) -> List[str]:
         """Returns a list of names of subjects with type 'person'."""
-        return [s.name for s in self.subjects if s.type and s.type.lower() == 'person']
+        return self.store.names_of_type('person')
 
     def get_places(self) -> List[str]:
         """Returns a list of names of subjects with type 'place'."""
-        return [s.name for s in self.subjects if s.type and s.type.lower() == 'place']
+        return self.store.names_of_type('place')
 
     def get_props(self) -> List[str]:
         """Returns a list of names of subjects with type 'prop'."""
-        return [s.name for s in self.subjects if s.type and s.type.lower() == 'prop']
+        return self.store.names_of_type('prop')
 
     def get_subject_details(self, name: str) -> Dict:
         """Returns the details of a subject by name."""
-        for subject in self.subjects:
-            if subject.name == name:
-                return vars(subject)
-        return {}
+        subject = self.store.get(name)
+        return vars(subject) if subject else {}
+
+    def get_subjects_by_alias(self, alias: str) -> List[Subject]:
+        """Returns the subjects that use the given alias."""
+        return self.store.by_alias(alias)
 
     def add_subject(self, subject: Subject) -> None:
         """Adds a new subject to the list and saves to the CSV file."""
-        if not any(s.name == subject.name for s in self.subjects):
-            self.subjects.append(subject)
+        if self.store.add(subject):
             self._save_subjects()
 
     def update_subject(self, subject: Subject) -> None:
         """Updates an existing subject in the list and saves to the CSV file."""
-        for i, s in enumerate(self.subjects):
-            if s.name == subject.name:
-                self.subjects[i] = subject
-                break
+        self.store.replace(subject)
         self._save_subjects()
 
     def delete_subject(self, name: str) -> None:
         """Deletes a subject from the list and saves to the CSV file."""
-        self.subjects = [s for s in self.subjects if s.name != name]
+        self.store.remove(name)
         self._save_subjects()
 
     def _save_subjects(self) -> None:
-        """Saves the subjects to the CSV file."""
-        with open(self.subjects_file, 'w', newline='', encoding='utf-8') as csvfile:
-            writer = csv.DictWriter(csvfile, fieldnames=["Name", "Description", "Alias", "Type", "Prefix", "Suffix", "Active"])
-            writer.writeheader()
-            for subject in self.subjects:
-                writer.writerow({
-                    "Name": subject.name,
-                    "Description": subject.description,
-                    "Alias": subject.alias,
-                    "Type": subject.type,
-                    "Prefix": subject.prefix,
-                    "Suffix": subject.suffix,
-                    "Active": str(subject.active)
-                })
+        """Marks the subjects dirty; the CSV is rewritten once the burst of edits settles."""
+        self._writer.mark_dirty()
+
+    def flush(self) -> None:
+        """Writes pending subject changes to the CSV file now."""
+        self._writer.flush()
+
+    def _render_subjects_csv(self) -> str:
+        output = io.StringIO()
+        writer = csv.DictWriter(output, fieldnames=SUBJECT_FIELDNAMES)
+        writer.writeheader()
+        for subject in self.subjects:
+            writer.writerow({
+                "Name": subject.name,
+                "Description": subject.description,
+                "Alias": subject.alias,
+                "Type": subject.type,
+                "Prefix": subject.prefix,
+                "Suffix": subject.suffix,
+                "Active": str(subject.active)
+            })
+        return output.getvalue()
 
     def get_subjects_for_shot(self, people: str) -> str:
-        active_subjects = self.get_active_subjects()
         shot_subjects = [p.strip() for p in people.split(',')] if people else []
-        return ", ".join([s.name for s in active_subjects if s.name in shot_subjects])
+        return ", ".join(dict.fromkeys(name for name in shot_subjects if self.store.is_active(name)))
 
     def get_subjects_dataframe(self) -> pd.DataFrame:
         """Returns the subjects as a pandas DataFrame."""
@@ -119,17 +251,33 @@ class SubjectManager:
 
     def apply_alias(self, text: str) -> str:
         """Replaces subject names with their aliases in the given text."""
-        for subject in self.get_active_subjects():
-            if subject.name != subject.alias:
-                text = text.replace(subject.name, subject.alias)
-        return text
+        return self.get_alias_replacer().replace(text)
+
+    def get_alias_replacer(self, names: Optional[Iterable[str]] = None) -> AliasReplacer:
+        """Returns the compiled replacer for the active subjects, or only those in names.
+
+        Replacers are rebuilt only after the subjects change.
+        """
+        if self._alias_replacers_version != self.store.version:
+            self._alias_replacers = {}
+            self._alias_replacers_version = self.store.version
+        key = None if names is None else frozenset(names)
+        replacer = self._alias_replacers.get(key)
+        if replacer is None:
+            subjects = self.store.active()
+            if key is not None:
+                subjects = [s for s in subjects if s.name in key]
+            replacer = AliasReplacer((s.name, s.alias) for s in subjects)
+            self._alias_replacers[key] = replacer
+        return replacer
 
     def get_subject_prefix_suffix(self, active_subjects: List[str]) -> Tuple[str, str]:
         """Returns the combined prefix and suffix for all active subjects."""
         prefixes = []
         suffixes = []
-        for subject in self.get_active_subjects():
-            if subject.name in active_subjects:
+        for name in dict.fromkeys(active_subjects):
+            subject = self.store.get(name)
+            if subject and subject.active:
                 if subject.prefix:
                     prefixes.append(subject.prefix)
                 if subject.suffix:
@@ -141,6 +289,7 @@ class SubjectManager:
         try:
             with open(file_path, 'r', newline='', encoding='utf-8') as csvfile:
                 reader = csv.DictReader(csvfile)
+                added = 0
                 for row in reader:
                     subject = Subject(
                         name=row['Name'],
@@ -151,31 +300,21 @@ class SubjectManager:
                         suffix=row.get('Suffix', ''),
                         active=row.get('Active', 'True').lower() == 'true'
                     )
-                    self.add_subject(subject)
+                    added += self.store.add(subject)
+            if added:
+                self._save_subjects()
         except Exception as e:
             print(f"Error importing subjects: {str(e)}")
 
     def export_subjects(self, file_path: str) -> None:
         """Exports subjects to a CSV file."""
         try:
-            with open(file_path, 'w', newline='', encoding='utf-8') as csvfile:
-                writer = csv.DictWriter(csvfile, fieldnames=["Name", "Description", "Alias", "Type", "Prefix", "Suffix", "Active"])
-                writer.writeheader()
-                for subject in self.subjects:
-                    writer.writerow({
-                        "Name": subject.name,
-                        "Description": subject.description,
-                        "Alias": subject.alias,
-                        "Type": subject.type,
-                        "Prefix": subject.prefix,
-                        "Suffix": subject.suffix,
-                        "Active": str(subject.active)
-                    })
+            atomic_write(file_path, self._render_subjects_csv())
         except Exception as e:
             print(f"Error exporting subjects: {str(e)}")
 
     def set_subjects(self, subjects_df: pd.DataFrame):
-        self.subjects = []
+        self.store.clear()
         for _, row in subjects_df.iterrows():
             subject = Subject(
                 name=row['Name'],
@@ -186,7 +325,7 @@ class SubjectManager:
                 suffix=row.get('Suffix', ''),
                 active=row.get('Active', True)
             )
-            self.subjects.append(subject)
+            self.store.add(subject)
         self._save_subjects()
 
     def get_all_subjects(self) -> List[Subject]:
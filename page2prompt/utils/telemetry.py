@@ -0,0 +1,160 @@
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import deque
+from contextlib import contextmanager
+from typing import Any, Deque, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+class LLMCallRecord(NamedTuple):
+    call_site: str
+    model: str
+    prompt_tokens: int
+    completion_tokens: int
+    cost: float
+    latency: float
+    cache_hit: bool
+    error: bool
+    project: str
+    session: str
+    timestamp: float
+    # Prompt tokens the provider served from its prefix cache (a subset of prompt_tokens)
+    cached_tokens: int = 0
+
+class CallTracker:
+    """Filled in by the caller inside Telemetry.track() with whatever usage the LLM reported."""
+
+    def __init__(self):
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.cached_tokens = 0
+
+    def set_usage(self, callback: Any) -> None:
+        """Copies token counts and cost from a langchain OpenAI callback handler."""
+        self.prompt_tokens = getattr(callback, "prompt_tokens", 0) or 0
+        self.completion_tokens = getattr(callback, "completion_tokens", 0) or 0
+        self.cost = getattr(callback, "total_cost", 0.0) or 0.0
+        self.cached_tokens = getattr(callback, "prompt_tokens_cached", 0) or 0
+
+class Telemetry:
+    """Collects per-call LLM usage and keeps running totals per session, project, call site and model.
+
+    The most recent records are kept for inspection; the totals are what the JSON and Prometheus
+    exports and the UI summary are built from.
+    """
+
+    def __init__(self, max_records: int = 5000):
+        self.session = uuid.uuid4().hex[:12]
+        self.project = ""
+        self.records: Deque[LLMCallRecord] = deque(maxlen=max_records)
+        self._totals: Dict[Tuple[str, str, str, str], Dict[str, float]] = {}
+        self._lock = threading.Lock()
+
+    def set_project(self, project: Optional[str]) -> None:
+        """Attributes subsequent calls to project (the project currently open in the UI)."""
+        self.project = project or ""
+
+    def record(self, call_site: str, model: str, prompt_tokens: int = 0, completion_tokens: int = 0, cost: float = 0.0,
+               latency: float = 0.0, cache_hit: bool = False, error: bool = False, cached_tokens: int = 0) -> LLMCallRecord:
+        record = LLMCallRecord(call_site, model, prompt_tokens, completion_tokens, cost, latency, cache_hit, error,
+                               self.project, self.session, time.time(), cached_tokens)
+        key = (record.session, record.project, call_site, model)
+        with self._lock:
+            self.records.append(record)
+            totals = self._totals.setdefault(key, {
+                "calls": 0, "cache_hits": 0, "errors": 0, "prompt_tokens": 0, "cached_tokens": 0,
+                "completion_tokens": 0, "cost": 0.0, "latency": 0.0
+            })
+            totals["calls"] += 1
+            totals["cache_hits"] += int(cache_hit)
+            totals["errors"] += int(error)
+            totals["prompt_tokens"] += prompt_tokens
+            totals["cached_tokens"] += cached_tokens
+            totals["completion_tokens"] += completion_tokens
+            totals["cost"] += cost
+            totals["latency"] += latency
+        logger.debug(f"LLM call {call_site} ({model}): {prompt_tokens}+{completion_tokens} tokens "
+                     f"({cached_tokens} cached), ${cost:.5f}, {latency:.2f}s{' (cache hit)' if cache_hit else ''}")
+        return record
+
+    @contextmanager
+    def track(self, call_site: str, model: str) -> Iterator[CallTracker]:
+        """Times the enclosed LLM call and records it, including calls that raise."""
+        tracker = CallTracker()
+        start = time.perf_counter()
+        error = False
+        try:
+            yield tracker
+        except BaseException:
+            error = True
+            raise
+        finally:
+            self.record(call_site, model, tracker.prompt_tokens, tracker.completion_tokens, tracker.cost,
+                        time.perf_counter() - start, error=error, cached_tokens=tracker.cached_tokens)
+
+    def summary(self, group_by: Tuple[str, ...] = ("call_site",)) -> List[Dict[str, Any]]:
+        """Returns the totals grouped by any of session, project, call_site and model."""
+        fields = ("session", "project", "call_site", "model")
+        grouped: Dict[Tuple, Dict[str, float]] = {}
+        with self._lock:
+            for key, totals in self._totals.items():
+                labels = dict(zip(fields, key))
+                group = tuple(labels[field] for field in group_by)
+                merged = grouped.setdefault(group, dict.fromkeys(totals, 0))
+                for name, value in totals.items():
+                    merged[name] += value
+        rows = []
+        for group, totals in sorted(grouped.items()):
+            row = dict(zip(group_by, group))
+            row.update(totals)
+            live_calls = totals["calls"] - totals["cache_hits"]
+            row["avg_latency"] = totals["latency"] / live_calls if live_calls else 0.0
+            row["cached_ratio"] = totals["cached_tokens"] / totals["prompt_tokens"] if totals["prompt_tokens"] else 0.0
+            rows.append(row)
+        return rows
+
+    def to_json(self) -> str:
+        return json.dumps({
+            "session": self.session,
+            "project": self.project,
+            "by_call_site": self.summary(("call_site", "model")),
+            "by_project": self.summary(("project",)),
+            "by_session": self.summary(("session",))
+        }, indent=2)
+
+    def to_prometheus(self) -> str:
+        """Renders the totals in the Prometheus text exposition format."""
+        metrics = [
+            ("llm_calls_total", "calls", "LLM calls, including cache hits"),
+            ("llm_cache_hits_total", "cache_hits", "LLM calls served from the response cache"),
+            ("llm_errors_total", "errors", "LLM calls that raised"),
+            ("llm_prompt_tokens_total", "prompt_tokens", "Prompt tokens sent"),
+            ("llm_cached_prompt_tokens_total", "cached_tokens", "Prompt tokens served from the provider's prefix cache"),
+            ("llm_completion_tokens_total", "completion_tokens", "Completion tokens received"),
+            ("llm_cost_usd_total", "cost", "Estimated spend in USD"),
+            ("llm_latency_seconds_total", "latency", "Wall-clock time spent waiting on LLM calls")
+        ]
+        rows = self.summary(("session", "project", "call_site", "model"))
+        lines = []
+        for name, field, help_text in metrics:
+            lines.append(f"# HELP page2prompt_{name} {help_text}")
+            lines.append(f"# TYPE page2prompt_{name} counter")
+            for row in rows:
+                labels = ",".join(f'{label}="{_escape_label(row[label])}"' for label in ("session", "project", "call_site", "model"))
+                lines.append(f"page2prompt_{name}{{{labels}}} {row[field]}")
+        return "\n".join(lines) + "\n"
+
+    def reset(self) -> None:
+        with self._lock:
+            self.records.clear()
+            self._totals.clear()
+
+def _escape_label(value: Any) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+# Shared by every LLM caller in the process
+telemetry = Telemetry()